@@ -1,4 +1,5 @@
 from tdda.constraints.pd.constraints import discover_df, verify_df, detect_df
 from tdda.constraints.db.constraints import (discover_db_table,
                                              verify_db_table,
+                                             verify_db_tables,
                                              detect_db_table)
@@ -16,6 +16,7 @@ import socket
 import sys
 
 from collections import OrderedDict
+from multiprocessing.pool import ThreadPool
 
 from tdda.version import version
 
@@ -37,6 +38,8 @@ RDT = re.compile(r'^(\d{4})[-/](\d{1,2})[-/](\d{1,2})[ T]'
 RDTM = re.compile(r'^(\d{4})[-/](\d{1,2})[-/](\d{1,2})[ T]'
                   r'(\d{1,2}):(\d{2}):(\d{2})'
                   r'\.(\d+)$')
+BACKREFERENCE_RE = re.compile(r'\\[1-9]|\(\?P=')
+INLINE_FLAGS_RE = re.compile(r'\(\?[aiLmsux-]+[:)]')
 
 UNICODE_TYPE = str if sys.version_info[0] >= 3 else unicode
 
@@ -763,7 +766,7 @@ def strip_lines(s, side='r'):
 
 
 def verify(constraints, fieldnames, verifiers, VerificationClass=None,
-           detected_records_writer=None, **kwargs):
+           detected_records_writer=None, n_jobs=None, **kwargs):
     """
     Perform a verification of a set of constraints.
     This is primarily an internal function, intended to be used by
@@ -793,6 +796,16 @@ def verify(constraints, fieldnames, verifiers, VerificationClass=None,
                             DataFrame. If not provided, Verification
                             is used.
 
+        n_jobs              If provided, and greater than 1, the fields
+                            are verified in parallel, using a pool of
+                            this many worker threads. The verifier
+                            callables must then be safe to call
+                            concurrently for different fields. The
+                            results (and their field order) are the same
+                            as for serial verification. Detection always
+                            runs serially, since it accumulates its
+                            results in a single shared output.
+
         kwargs              Any keyword arguments provided are passed to
                             the VerificationClass chosen.
 
@@ -818,7 +831,7 @@ def verify(constraints, fieldnames, verifiers, VerificationClass=None,
             pass
         os.remove(detect_outpath)
 
-    for name in allfields:
+    def verify_field(name):
         field_results = TDDAObject()
         failures = passes = 0
         for c in constraints.fields[name]:
@@ -833,9 +846,22 @@ def verify(constraints, fieldnames, verifiers, VerificationClass=None,
                 satisfied = None
             field_results[c.kind] = satisfied
         field_results.failures = failures
-        results.failures += failures
         field_results.passes = passes
-        results.passes += passes
+        return field_results
+
+    if n_jobs and n_jobs > 1 and len(allfields) > 1 and not detect:
+        pool = ThreadPool(min(n_jobs, len(allfields)))
+        try:
+            all_field_results = pool.map(verify_field, allfields)
+        finally:
+            pool.close()
+            pool.join()
+    else:
+        all_field_results = [verify_field(name) for name in allfields]
+
+    for name, field_results in zip(allfields, all_field_results):
+        results.failures += field_results.failures
+        results.passes += field_results.passes
         results.fields[name] = field_results
 
     if detect and detected_records_writer and results.failures > 0:
@@ -894,6 +920,29 @@ def plural(n, s, pl=None):
         return '%s %s%s' % (n, s, pl)
 
 
+def combine_rexes(rexes):
+    """
+    Combine a list of regular expressions into a single alternation,
+    which matches (at the start of a string) exactly when at least one
+    of the original regular expressions does.
+
+    Returns None if the regular expressions cannot safely be combined,
+    either because they use backreferences (whose group numbers would
+    change) or inline flags (which, before Python 3.11, would apply to
+    the whole combination), or because the combination does not compile
+    (for example, because of repeated group names).
+    """
+    if any(BACKREFERENCE_RE.search(r) or INLINE_FLAGS_RE.search(r)
+           for r in rexes):
+        return None
+    combined = '|'.join('(?:%s)' % r for r in rexes)
+    try:
+        re.compile(combined)
+    except re.error:
+        return None
+    return combined
+
+
 def native_definite(o):
     return (UnicodeDefinite(o) if sys.version_info[0] >= 3
                                else UTF8DefiniteObject(o))
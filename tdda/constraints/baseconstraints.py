@@ -9,10 +9,12 @@ from __future__ import print_function
 from __future__ import absolute_import
 
 import datetime
+import math
 import re
 import sys
 
 from collections import OrderedDict
+from multiprocessing.pool import ThreadPool
 
 from tdda.constraints.base import (
     PRECISIONS,
@@ -52,6 +54,99 @@ DEFAULT_TYPE_CHECKING = 'sloppy'
 MAX_CATEGORIES = 20     # String fields with up to 20 categories will
                         # generate AllowedValues constraints
 
+HLL_PRECISION = 14      # HyperLogLog sketches use 2**14 registers, giving
+                        # a standard error of about 0.8%
+
+HLL_ERROR_MARGIN = 4    # Number of standard errors within which an
+                        # approximate distinct count is treated as being
+                        # "near" a threshold, requiring an exact count
+
+
+DETECTION_FIELD_SUFFIXES = {    # Suffixes of the names of per-constraint
+    'type': '_type_ok',         # detection fields
+    'min': '_min_ok',
+    'max': '_max_ok',
+    'min_length': '_min_length_ok',
+    'max_length': '_max_length_ok',
+    'sign': '_sign_ok',
+    'max_nulls': '_nonnull_ok',
+    'no_duplicates': '_nodups_ok',
+    'allowed_values': '_values_ok',
+    'rex': '_rex_ok',
+}
+
+
+class HyperLogLog(object):
+    """
+    A HyperLogLog sketch, for estimating the number of distinct values
+    in a column from 64-bit hashes of its values, in a fixed amount of
+    memory (one byte per register).
+
+    Sketches built (with the same precision and hash function) from
+    separate chunks or partitions of a column can be combined with
+    :py:meth:`merge`, giving the same sketch as for the whole column.
+    """
+    def __init__(self, precision=HLL_PRECISION, registers=None):
+        self.precision = precision
+        self.m = 1 << precision
+        if registers is None:
+            self.registers = bytearray(self.m)
+        else:
+            assert len(registers) == self.m
+            self.registers = bytearray(registers)
+
+    def add_hash(self, h):
+        """
+        Adds a value to the sketch, given a 64-bit (unsigned) hash of it.
+        """
+        nbits = 64 - self.precision
+        index = h >> nbits
+        rank = nbits - (h & ((1 << nbits) - 1)).bit_length() + 1
+        if rank > self.registers[index]:
+            self.registers[index] = rank
+
+    def update(self, hashes):
+        for h in hashes:
+            self.add_hash(h)
+
+    def merge(self, other):
+        """
+        Combines another sketch into this one, so that this one then
+        describes the union of the values in the two.
+        """
+        if other.precision != self.precision:
+            raise Exception('Cannot merge HyperLogLog sketches with '
+                            'different precisions (%d and %d)'
+                            % (self.precision, other.precision))
+        self.registers = bytearray(max(a, b) for (a, b)
+                                   in zip(self.registers, other.registers))
+        return self
+
+    def estimate(self):
+        """
+        Returns the estimated number of distinct values added to the sketch.
+        """
+        m = self.m
+        alpha = 0.7213 / (1 + 1.079 / m)
+        raw = alpha * m * m / sum(2.0 ** -r for r in self.registers)
+        zeros = self.registers.count(0)
+        if raw <= 2.5 * m and zeros > 0:
+            return m * math.log(m / zeros)   # linear counting for small counts
+        return raw
+
+    def relative_error(self):
+        return 1.04 / math.sqrt(self.m)
+
+    def bounds(self, estimate=None):
+        """
+        Returns a (low, high) pair within which the true number of
+        distinct values is all but certain to lie.
+        """
+        if estimate is None:
+            estimate = self.estimate()
+        margin = HLL_ERROR_MARGIN * self.relative_error() * estimate
+        return (estimate - margin - 1, estimate + margin + 1)
+
 
 class BaseConstraintVerifier(BaseConstraintCalculator, BaseConstraintDetector):
     """
@@ -509,20 +604,58 @@ class BaseConstraintDiscoverer(BaseConstraintCalculator):
     a mix-in subclass which inherits both from :py:mod:`BaseConstraintDiscover`
     and from a specific implementation of :py:mod:`BaseConstraintCalculator`.
     """
-    def __init__(self, inc_rex=False, **kwargs):
+    def __init__(self, inc_rex=False, approx_distinct=False, **kwargs):
         self.inc_rex = inc_rex
-
-    def discover(self):
-        field_constraints = []
-        for col in self.get_column_names():
-            constraints = self.discover_field_constraints(col)
-            if constraints:
-                field_constraints.append(constraints)
+        self.approx_distinct = approx_distinct
+
+    def discover(self, n_jobs=None):
+        """
+        Discover constraints for every column.
+
+        If *n_jobs* is greater than 1, the columns are examined in
+        parallel, using a pool of this many worker threads, so the
+        calculator methods must then be safe to call concurrently for
+        different columns. The results are the same either way.
+        """
+        colnames = self.get_column_names()
+        if n_jobs and n_jobs > 1 and len(colnames) > 1:
+            pool = ThreadPool(min(n_jobs, len(colnames)))
+            try:
+                all_constraints = pool.map(self.discover_field_constraints,
+                                           colnames)
+            finally:
+                pool.close()
+                pool.join()
+        else:
+            all_constraints = [self.discover_field_constraints(col)
+                               for col in colnames]
+        field_constraints = [c for c in all_constraints if c]
         if field_constraints:
             return DatasetConstraints(field_constraints)
         else:
             return None
 
+    def approximate_nunique(self, fieldname, type_):
+        """
+        Returns an estimate of the number of distinct non-null values in
+        a field, from a HyperLogLog sketch, or ``None`` if the exact number
+        is needed, either because the estimate is near one of the
+        thresholds that affect the constraints discovered (i.e.
+        :py:const:`MAX_CATEGORIES` for strings, or the number of
+        non-null values, for ``no_duplicates``), or because the
+        calculator does not support sketches.
+        """
+        sketch = self.calc_distinct_sketch(fieldname)
+        if sketch is None:
+            return None
+        estimate = sketch.estimate()
+        low, high = sketch.bounds(estimate)
+        if type_ == 'string' and low <= MAX_CATEGORIES:
+            return None
+        if high >= self.calc_non_null_count(fieldname):
+            return None
+        return int(round(estimate))
+
     def discover_field_constraints(self, fieldname):
         min_constraint = max_constraint = None
         min_length_constraint = max_length_constraint = None
@@ -538,48 +671,45 @@ class BaseConstraintDiscoverer(BaseConstraintCalculator):
         length = self.get_nrecords()
 
         if length > 0:  # Things are not very interesting when there is no data
-            nNull = self.calc_null_count(fieldname)
-            nNonNull = self.calc_non_null_count(fieldname)
+            estimate = None
+            if self.approx_distinct and type_ in ('string', 'int'):
+                estimate = self.approximate_nunique(fieldname, type_)
+            # Rex discovery uses all the distinct values; otherwise
+            # they are only wanted if there are few enough to be
+            # allowed values.
+            max_uniques = None if self.inc_rex else MAX_CATEGORIES
+            profile = self.calc_field_profile(fieldname, type_,
+                                              distinct=estimate is None,
+                                              max_uniques=max_uniques)
+            if estimate is not None:
+                profile['nunique'] = estimate
+            nNull = profile['null_count']
+            nNonNull = profile['non_null_count']
             assert nNull + nNonNull == length
             if nNull < 2:
                 max_nulls_constraint = MaxNullsConstraint(nNull)
 
             # Useful info:
-            uniqs = None
-            n_unique = -1   # won't equal number of non-nulls later on
-            if type_ in ('string', 'int'):
-                n_unique = self.calc_nunique(fieldname)
-                if type_ == 'string':
-                    if n_unique <= MAX_CATEGORIES:
-                        uniqs = self.calc_unique_values(fieldname,
-                                                        include_nulls=False)
-                    if uniqs:
-                        avc = AllowedValuesConstraint(uniqs)
-                        allowed_values_constraint = avc
+            uniqs = profile.get('uniques')
+            n_unique = profile.get('nunique', -1)  # -1 won't equal number
+                                                   # of non-nulls later on
+            if type_ == 'string' and n_unique <= MAX_CATEGORIES and uniqs:
+                allowed_values_constraint = AllowedValuesConstraint(uniqs)
 
             if nNonNull > 0:
                 if type_ == 'string':
                     # We don't generate a min, max or sign constraints for
                     # strings. But we do generate min and max length
                     # constraints
-                    if (uniqs is None and n_unique > 0):
-                        # There were too many for us to have bothered getting
-                        # them all before, but we need them now.
-                        uniqs = self.calc_unique_values(fieldname,
-                                                        include_nulls=False)
-                    if uniqs:
-                        if type(uniqs[0]) is unicode_string:
-                            L = [len(v) for v in uniqs]
-                        else:
-                            L = [len(v.decode('UTF-8')) for v in uniqs]
-                        m = min(L)
-                        M = max(L)
+                    if 'min_length' in profile:
+                        m = profile['min_length']
+                        M = profile['max_length']
                         min_length_constraint = MinLengthConstraint(m)
                         max_length_constraint = MaxLengthConstraint(M)
                 else:
                     # Non-string fields all potentially get min and max values
-                    m = self.calc_min(fieldname)
-                    M = self.calc_max(fieldname)
+                    m = profile['min']
+                    M = profile['max']
                     if not self.is_null(m):
                         min_constraint = MinConstraint(m)
                     if not self.is_null(M):
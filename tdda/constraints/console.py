@@ -43,8 +43,11 @@ HELP="""Use
 
 
 STANDARD_EXTENSIONS = [
-    'tdda.constraints.pd.extension.TDDAPandasExtension',
+    # The database extension is checked first, because a database table
+    # can be checked with a .csv detection output file, which would
+    # otherwise make the command look like one for the Pandas extension.
     'tdda.constraints.db.extension.TDDADatabaseExtension',
+    'tdda.constraints.pd.extension.TDDAPandasExtension',
 ]
 
 
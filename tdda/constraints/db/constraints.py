@@ -13,39 +13,89 @@ The top-level functions are:
         Verify (check) a single database table, against a set of previously
         discovered constraints.
 
+    :py:func:`verify_db_tables`:
+        Verify (check) several database tables, each against its own set
+        of previously discovered constraints, producing a single report.
+
     :py:func:`detect_db_table`:
         Verify (check) a single database table, against a set of previously
-        discovered constraints.
+        discovered constraints, and write out the records that fail them.
 """
 from __future__ import division
 from __future__ import print_function
 from __future__ import absolute_import
 
+import datetime
+import decimal
+import hashlib
+import json
+import math
+import os
 import sys
 
+from collections import OrderedDict
+from multiprocessing.pool import ThreadPool
+
+try:
+    import pandas as pd
+    from tdda.constraints.pd.constraints import (convert_output_types,
+                                                 detection_field,
+                                                 file_format, save_df)
+    from tdda.referencetest.checkpandas import default_csv_writer
+except ImportError:
+    pd = None
+
 from tdda.constraints.base import (
     DatasetConstraints,
+    Detection,
     Verification,
+    fuzz_down, fuzz_up,
 )
 from tdda.constraints.baseconstraints import (
     BaseConstraintCalculator,
     BaseConstraintDetector,
     BaseConstraintVerifier,
     BaseConstraintDiscoverer,
-    MAX_CATEGORIES,
+    MAX_CATEGORIES, DETECTION_FIELD_SUFFIXES,
 )
 
-from tdda.constraints.db.drivers import DatabaseHandler
+from tdda.constraints.db.drivers import DatabaseHandler, SQLSubquery
 from tdda import rexpy
 
 if sys.version_info[0] >= 3:
     long = int
 
 
+VERIFICATION_STATISTICS = {     # Statistics (verifier cache keys) used
+    'min': ['min'],             # for verifying each kind of constraint,
+    'max': ['max'],             # which can be calculated together by
+    'sign': ['min', 'max'],     # a single aggregate query
+    'min_length': ['min_length'],
+    'max_length': ['max_length'],
+    'max_nulls': ['null_count'],
+    'no_duplicates': ['nunique', 'non_null_count'],
+    'allowed_values': ['nunique'],
+}
+
+SAMPLE_WIDENING = 0.1           # Proportion of the range of values in a
+                                # sample by which sampled min and max
+                                # constraints are widened at each end
+
+STATE_SUFFIX = '.state'         # Suffix added to the constraints path to
+                                # give the default incremental state file
+
+STATE_DATE_FORMATS = ('%Y-%m-%d %H:%M:%S.%f', '%Y-%m-%d %H:%M:%S')
+
+
 class DatabaseConstraintCalculator(BaseConstraintCalculator):
     def __init__(self, tablename, testing=False):
         self.tablename = tablename
         self.testing = testing
+        self.table_profile = None
+        self.sample = None
+        self.sample_table = None
+        self.sample_nrows = None
+        self.exact_distinct = set()
 
     def is_null(self, value):
         return self.db_value_is_null(value)
@@ -99,23 +149,385 @@ class DatabaseConstraintCalculator(BaseConstraintCalculator):
     def calc_all_non_nulls_boolean(self, colname):
         raise Exception('database should not require all_non_nulls_boolean')
 
+    def calc_field_profile(self, colname, type_, distinct=True,
+                           max_uniques=None):
+        if not hasattr(self.instance, 'get_database_profile'):
+            return BaseConstraintCalculator.calc_field_profile(
+                self, colname, type_, distinct=distinct,
+                max_uniques=max_uniques)
+        if self.table_profile is None:
+            self.profile_table()
+        stats = self.table_profile.get(colname, {})
+        nNonNull = stats['non_null_count']
+        profile = {
+            'null_count': stats['null_count'],
+            'non_null_count': nNonNull,
+        }
+        if type_ in ('string', 'int') and distinct:
+            profile['nunique'] = stats['nunique']
+        if type_ == 'string':
+            if distinct and (max_uniques is None
+                             or profile['nunique'] <= max_uniques):
+                if self.sample_table and colname not in self.exact_distinct:
+                    profile['uniques'] = self.get_database_unique_values(
+                        self.sample_table, colname)
+                else:
+                    profile['uniques'] = self.calc_unique_values(
+                        colname, include_nulls=False)
+            if nNonNull > 0:
+                profile['min_length'] = stats['min_length']
+                profile['max_length'] = stats['max_length']
+        elif nNonNull > 0:
+            profile['min'] = stats['min']
+            profile['max'] = stats['max']
+        return profile
+
+    def profile_table(self, n_jobs=None):
+        """
+        Calculates the statistics needed for discovery for every column
+        at once, in a single scan of the table (or one per batch of
+        columns, with the batches being run in parallel if *n_jobs* is
+        specified).
+        """
+        statistics = []
+        for name in self.get_column_names():
+            ctype = self.calc_tdda_type(name)
+            names = ['null_count', 'non_null_count']
+            if ctype in ('string', 'int'):
+                names.append('nunique')
+            if ctype == 'string':
+                names.extend(['min_length', 'max_length'])
+            elif ctype is not None:
+                names.extend(['min', 'max'])
+            statistics.append((name, ctype, names))
+        if self.sample:
+            self.table_profile = self.sampled_profile(statistics,
+                                                      n_jobs=n_jobs)
+        else:
+            self.table_profile = self.get_database_profile(self.tablename,
+                                                           statistics,
+                                                           n_jobs=n_jobs)
+
+    def sampled_profile(self, statistics, n_jobs=None):
+        """
+        Calculates the statistics needed for discovery from a sample
+        of the table, followed by a single exact pass over the table
+        for just those statistics for which the sample is not conclusive.
+
+        These are the null counts for columns with fewer than two nulls
+        in the sample (which would give a max_nulls constraint), the
+        distinct counts for columns with no duplicates in the sample or
+        (for strings) few enough distinct values to give an allowed_values
+        constraint (in which case the string lengths are also found
+        exactly), and everything for columns with no values in the
+        sample. The minimum and maximum values (and lengths) found
+        in the sample are widened (see :py:func:`widen`), and the
+        remaining null counts are scaled up to the size of the table.
+        """
+        nrows = self.get_nrecords()
+        self.sample_table = self.sample_source(self.tablename, self.sample,
+                                               nrows)
+        if self.sample_table is None:
+            return self.get_database_profile(self.tablename, statistics,
+                                             n_jobs=n_jobs)
+        sampled = self.get_database_profile(self.sample_table, statistics,
+                                            n_jobs=n_jobs)
+        self.sample_nrows = sum(sampled[statistics[0][0]][name]
+                                for name in ('null_count', 'non_null_count')
+                                ) if statistics else 0
+        exact = []
+        for (name, ctype, names) in statistics:
+            stats = sampled[name]
+            wanted = set()
+            if stats['null_count'] < 2:
+                wanted.update(['null_count', 'non_null_count'])
+            if stats['non_null_count'] == 0:
+                wanted.update(names)
+            if 'nunique' in stats and (
+                    stats['nunique'] == stats['non_null_count']
+                    or (ctype == 'string'
+                        and stats['nunique'] <= MAX_CATEGORIES)):
+                wanted.update(['null_count', 'non_null_count', 'nunique'])
+                if ctype == 'string':
+                    # lengths must agree with any allowed values
+                    wanted.update(['min_length', 'max_length'])
+            if wanted:
+                exact.append((name, ctype, [n for n in names if n in wanted]))
+        exact_profile = (self.get_database_profile(self.tablename, exact,
+                                                   n_jobs=n_jobs)
+                         if exact else {})
+
+        profile = {}
+        for (name, ctype, names) in statistics:
+            stats = dict(sampled[name])
+            exact_stats = exact_profile.get(name, {})
+            if 'nunique' in exact_stats:
+                self.exact_distinct.add(name)
+            if stats['non_null_count'] > 0:
+                if 'min' in stats:
+                    (stats['min'], stats['max']) = widen(stats['min'],
+                                                         stats['max'], ctype)
+                if 'min_length' in stats:
+                    (stats['min_length'],
+                     stats['max_length']) = widen(stats['min_length'],
+                                                  stats['max_length'], 'int')
+            if 'null_count' not in exact_stats:
+                # at least two nulls in the sample, so at least two
+                # in the table too
+                nsample = stats['null_count'] + stats['non_null_count']
+                nNull = max(2, int(round(stats['null_count'] * nrows
+                                         / nsample)))
+                nNull = min(nNull, nrows - stats['non_null_count'])
+                stats['null_count'] = nNull
+                stats['non_null_count'] = nrows - nNull
+            stats.update(exact_stats)
+            profile[name] = stats
+        return profile
+
     def find_rexes(self, colname, values=None):
         if not values:
             values = self.get_database_unique_values(self.tablename, colname)
         return rexpy.extract(values)
 
     def calc_rex_constraint(self, colname, constraint, detect=False):
-        return not self.get_database_rex_match(self.tablename, colname,
-                                               constraint.value)
+        # On failure, with detect set, this returns the regular expressions
+        # themselves (rather than the non-matching values), so that the
+        # detector can select the failing records in the database.
+        if self.get_database_rex_match(self.tablename, colname,
+                                       constraint.value):
+            return False
+        return list(constraint.value) if detect else True
 
 
 class DatabaseConstraintDetector(BaseConstraintDetector):
     """
-    No-op implementation of the Constraint Detector methods for
-    databases.
+    Implementation of the Constraint Detector methods for SQL databases.
+
+    Each failing constraint is recorded as a SQL condition that is true
+    for exactly the records that fail it, so that the failing records
+    (and their detection fields) can be selected by the database itself,
+    rather than by fetching the whole table.
     """
     def __init__(self, tablename):
-        pass
+        self.detections = OrderedDict()  # detection field name -> (failure
+                                         # condition, ok value expression,
+                                         # parameters for the placeholders
+                                         # in each of them)
+
+    def add_detection(self, colname, kind, condition, params=(),
+                      nulls_fail=False, masked=True):
+        """
+        Record the SQL *condition* under which records fail the constraint
+        of the given kind on a column, with *params* as the values for
+        any placeholders in it.
+
+        Null values never fail the constraint unless *nulls_fail* is set;
+        if *masked* is set, the detection field is null for them
+        (as with :py:func:`~tdda.constraints.pd.constraints.detection_field`).
+        """
+        col = self.quoted(colname)
+        if not nulls_fail:
+            condition = '(%s IS NOT NULL AND (%s))' % (col, condition)
+        if masked:
+            ok = ('CASE WHEN %s THEN 0 WHEN %s IS NULL THEN NULL ELSE 1 END'
+                  % (condition, col))
+        else:
+            ok = 'CASE WHEN %s THEN 0 ELSE 1 END' % condition
+        name = colname + DETECTION_FIELD_SUFFIXES[kind]
+        self.detections[name] = (condition, ok, list(params))
+
+    def detect_min_constraint(self, colname, value, precision, epsilon):
+        if precision == 'closed':
+            op = '<'
+        elif precision == 'open':
+            op = '<='
+        else:
+            op = '<'
+            if not isinstance(value, datetime.datetime):
+                value = min(value, fuzz_down(value, epsilon))
+        self.add_detection(colname, 'min', '%s %s %s'
+                           % (self.quoted(colname), op, self.marker),
+                           [value])
+
+    def detect_max_constraint(self, colname, value, precision, epsilon):
+        if precision == 'closed':
+            op = '>'
+        elif precision == 'open':
+            op = '>='
+        else:
+            op = '>'
+            if not isinstance(value, datetime.datetime):
+                value = max(value, fuzz_up(value, epsilon))
+        self.add_detection(colname, 'max', '%s %s %s'
+                           % (self.quoted(colname), op, self.marker),
+                           [value])
+
+    def detect_min_length_constraint(self, colname, value):
+        self.add_detection(colname, 'min_length',
+                           '%s < %d' % (self.length_sql(colname), value))
+
+    def detect_max_length_constraint(self, colname, value):
+        self.add_detection(colname, 'max_length',
+                           '%s > %d' % (self.length_sql(colname), value))
+
+    def detect_tdda_type_constraint(self, colname, value):
+        self.add_detection(colname, 'type', '1 = 1', nulls_fail=True,
+                           masked=False)
+
+    def detect_sign_constraint(self, colname, value):
+        if value == 'null':
+            self.add_detection(colname, 'sign', '1 = 1', nulls_fail=True,
+                               masked=False)
+            return
+        op = {
+            'positive': '<=',
+            'non-negative': '<',
+            'zero': '<>',
+            'non-positive': '>',
+            'negative': '>=',
+        }[value]
+        self.add_detection(colname, 'sign',
+                           '%s %s 0' % (self.quoted(colname), op))
+
+    def detect_max_nulls_constraint(self, colname, value):
+        # found more nulls than are allowed, so mark all null values as bad
+        self.add_detection(colname, 'max_nulls',
+                           '%s IS NULL' % self.quoted(colname),
+                           nulls_fail=True, masked=False)
+
+    def detect_no_duplicates_constraint(self, colname, value):
+        # found duplicates, so mark anything duplicated as bad
+        col = self.quoted(colname)
+        self.add_detection(colname, 'no_duplicates',
+                           '%s IN (SELECT %s FROM %s WHERE %s IS NOT NULL '
+                           'GROUP BY %s HAVING COUNT(*) > 1)'
+                           % (col, col, self.tablename, col, col),
+                           masked=False)
+
+    def detect_allowed_values_constraint(self, colname, allowed_values,
+                                         violations):
+        values = [v for v in allowed_values if v is not None]
+        if values:
+            condition = ('%s NOT IN (%s)'
+                         % (self.quoted(colname),
+                            ', '.join([self.marker] * len(values))))
+        else:
+            condition = '1 = 1'
+        self.add_detection(colname, 'allowed_values', condition, values)
+
+    def detect_rex_constraint(self, colname, violations):
+        # violations are the regular expressions (see calc_rex_constraint)
+        (condition, params) = self.rex_match_sql(colname, violations)
+        self.add_detection(colname, 'rex', 'NOT (%s)' % condition, params)
+
+    def write_detected_records(self,
+                               detect_outpath=None,
+                               detect_write_all=False,
+                               detect_per_constraint=False,
+                               detect_output_fields=None,
+                               detect_index=False,
+                               detect_in_place=False,
+                               rownumber_is_index=False,
+                               boolean_ints=False,
+                               **kwargs):
+        """
+        Select the failing records in the database, and write them out
+        as they are fetched, in the same format as the Pandas detector.
+
+        CSV output is appended to a batch at a time; since the feather
+        format does not support appending, feather output is accumulated
+        and written at the end. If there is no output path, the results
+        are accumulated into a DataFrame, which is returned as the
+        detection object.
+
+        Records are numbered (in the RowNumber field) in the order in
+        which the database returns them.
+        """
+        if pd is None:
+            raise Exception('Database detection requires pandas.')
+        if detect_in_place:
+            raise Exception('In-place detection is not available '
+                            'for databases.')
+        colnames = self.get_column_names()
+        add_index = detect_index or detect_output_fields is None
+        if detect_output_fields is None:
+            detect_output_fields = []
+        elif len(detect_output_fields) == 0:
+            detect_output_fields = colnames
+        for fname in detect_output_fields:
+            if fname not in colnames:
+                raise Exception('Table %s has no column %s'
+                                % (self.tablename, fname))
+
+        nfailname = 'n_failures'
+        conditions = [cond for (cond, ok, p) in self.detections.values()]
+        condition_params = [v for (cond, ok, p) in self.detections.values()
+                            for v in p]
+        exprs = [self.quoted(fname) for fname in detect_output_fields]
+        params = []
+        if detect_per_constraint:
+            # each ok value expression contains its condition once
+            exprs.extend('%s AS %s' % (ok, self.quoted(name))
+                         for (name, (cond, ok, p)) in self.detections.items())
+            params.extend(condition_params)
+        exprs.append('%s AS %s'
+                     % (' + '.join('CASE WHEN %s THEN 1 ELSE 0 END' % cond
+                                   for cond in conditions) or '0',
+                        nfailname))
+        params.extend(condition_params)
+        if add_index:
+            rowname = 'RowNumber'
+            while rowname in detect_output_fields:
+                rowname += '_'
+            sql = ('SELECT * FROM (SELECT ROW_NUMBER() OVER () AS %s, %s '
+                   'FROM %s) detected'
+                   % (self.quoted(rowname), ', '.join(exprs), self.tablename))
+            if not detect_write_all:
+                sql += ' WHERE %s > 0' % nfailname
+        else:
+            sql = 'SELECT %s FROM %s' % (', '.join(exprs), self.tablename)
+            if not detect_write_all:
+                sql += ' WHERE %s' % (' OR '.join(conditions) or '1 = 0')
+                params.extend(condition_params)
+
+        output_is_feather = (detect_outpath not in (None, '-')
+                             and file_format(detect_outpath) == 'feather')
+        to_stdout = detect_outpath == '-'
+        to_csv = detect_outpath is not None and not output_is_feather
+        if to_csv and not to_stdout and os.path.exists(detect_outpath):
+            os.remove(detect_outpath)
+        parts = []
+        n_failing_records = 0
+        first = True
+        for (names, rows) in self.stream_all(sql, params=params):
+            df = pd.DataFrame.from_records(rows, columns=names)
+            for name in self.detections if detect_per_constraint else []:
+                c = df[name]
+                df[name] = detection_field(c, c.fillna(False).astype(bool))
+            n_failing_records += int((df[nfailname] > 0).sum())
+            if to_stdout:
+                sys.stdout.write(default_csv_writer(
+                    convert_output_types(df, boolean_ints), None,
+                    index=False, header=first))
+            elif to_csv:
+                default_csv_writer(convert_output_types(df, boolean_ints),
+                                   detect_outpath, index=False, mode='a',
+                                   header=first)
+            else:
+                parts.append(df)
+            first = False
+        n_passing_records = self.get_nrecords() - n_failing_records
+        if to_csv and not to_stdout:
+            if n_failing_records == 0 and not detect_write_all:
+                os.remove(detect_outpath)
+
+        out_df = None
+        if parts:
+            out_df = pd.concat(parts, ignore_index=True)
+            if output_is_feather:
+                save_df(out_df, detect_outpath)
+                out_df = None
+        return Detection(out_df, n_passing_records, n_failing_records)
 
 
 class DatabaseConstraintVerifier(DatabaseConstraintCalculator,
@@ -149,6 +561,217 @@ class DatabaseConstraintVerifier(DatabaseConstraintCalculator,
         DatabaseConstraintDetector.__init__(self, tablename)
         BaseConstraintVerifier.__init__(self, epsilon=epsilon,
                                         type_checking=type_checking)
+        self.rex_failures = {}
+
+    def verify(self, constraints, VerificationClass=Verification,
+               n_jobs=None, watermark=None, state_path=None, **kwargs):
+        workers = self.parallel_workers(n_jobs)
+        if watermark:
+            self.incremental_statistics(constraints, watermark, state_path,
+                                        n_jobs=workers)
+        else:
+            self.prefetch_statistics(constraints, n_jobs=workers)
+        return BaseConstraintVerifier.verify(
+            self, constraints, VerificationClass=VerificationClass,
+            n_jobs=workers, **kwargs)
+
+    def detect(self, constraints, VerificationClass=Verification, **kwargs):
+        self.prefetch_statistics(constraints)
+        return BaseConstraintVerifier.detect(
+            self, constraints, VerificationClass=VerificationClass, **kwargs)
+
+    def prefetch_statistics(self, constraints, n_jobs=None):
+        """
+        Calculates all of the statistics that will be needed to verify
+        the constraints provided, in a single scan of the table (where
+        the database supports it), saving them in the verifier's cache.
+        """
+        if not hasattr(self.instance, 'get_database_profile'):
+            return
+        statistics = self.verification_statistics(constraints)
+        profile = self.get_database_profile(self.tablename, statistics,
+                                            n_jobs=n_jobs)
+        for name, stats in profile.items():
+            self.cache_values(name).update(stats)
+
+    def verification_statistics(self, constraints):
+        """
+        Returns the statistics needed to verify the constraints provided,
+        as a list of (colname, ctype, names) triples, in the form used by
+        :py:meth:`get_database_profile`.
+        """
+        colnames = self.get_column_names()
+        statistics = []
+        for name, field_constraints in constraints.fields.items():
+            if name not in colnames:
+                continue
+            names = []
+            for c in field_constraints:
+                if c.value is None:
+                    continue
+                for stat in VERIFICATION_STATISTICS.get(c.kind, []):
+                    if stat not in names:
+                        names.append(stat)
+            if names:
+                statistics.append((name, self.get_tdda_type(name), names))
+        return statistics
+
+    def incremental_statistics(self, constraints, watermark, state_path,
+                               n_jobs=None):
+        """
+        Calculates the statistics needed to verify the constraints
+        provided for an append-only table, by merging the statistics for
+        the rows added since the last incremental verification into
+        those saved (in the state file at *state_path*) from before.
+
+        *watermark* is the name of a (non-null) column whose values
+        increase as rows are appended. Only rows with values greater than
+        the largest value seen by the previous verification are read.
+        The merged statistics are saved in the verifier's cache, and
+        the state file is updated.
+
+        As well as the usual statistics, the state records whether each
+        column has any duplicate values, its distinct values (for columns
+        with an allowed_values constraint, until there are more of them
+        than are allowed), and whether any of its values has failed its
+        regular expression constraint.
+
+        The state is discarded, and the whole table read, if the table,
+        the watermark column or the constraints differ from those with
+        which the state was saved.
+        """
+        if self.dbtype == 'mongodb':
+            raise Exception('Incremental verification is not supported '
+                            'for %s databases' % self.dbtype)
+        if watermark not in self.get_column_names():
+            raise Exception('No watermark column %s in table %s'
+                            % (watermark, self.tablename))
+        fingerprint = constraints_fingerprint(constraints)
+        state = read_state(state_path)
+        if (state is None or state.get('table') != self.tablename
+                or state.get('watermark_column') != watermark
+                or state.get('constraints') != fingerprint):
+            state = {
+                'table': self.tablename,
+                'watermark_column': watermark,
+                'watermark': None,
+                'constraints': fingerprint,
+                'fields': {},
+            }
+        mark = from_state_value(state['watermark'])
+        if mark is None:
+            source = self.tablename
+        else:
+            source = SQLSubquery('(SELECT * FROM %s WHERE %s > %s) tdda_new'
+                                 % (self.tablename, self.quoted(watermark),
+                                    self.marker),
+                                 [mark])
+
+        statistics = self.verification_statistics(constraints)
+        wanted = [(name, ctype, list(names))
+                  for (name, ctype, names) in statistics]
+        for (name, ctype, names) in wanted:
+            if name == watermark:
+                if 'max' not in names:
+                    names.append('max')
+                break
+        else:
+            wanted.append((watermark, self.get_tdda_type(watermark), ['max']))
+        new = self.get_database_profile(source, wanted, n_jobs=n_jobs)
+
+        self.rex_failures = {}
+        for name, field_constraints in constraints.fields.items():
+            if name not in self.get_column_names():
+                continue
+            kinds = dict((c.kind, c.value) for c in field_constraints
+                         if c.value is not None)
+            field = state['fields'].setdefault(name, {})
+            stats = new.get(name, {})
+            for stat in ('null_count', 'non_null_count'):
+                if stat in stats:
+                    field[stat] = field.get(stat, 0) + stats[stat]
+            for stat, merge in (('min', min), ('max', max),
+                                ('min_length', min), ('max_length', max)):
+                if stat in stats:
+                    old = from_state_value(field.get(stat))
+                    values = [v for v in (old, stats[stat]) if v is not None]
+                    field[stat] = (to_state_value(merge(values)) if values
+                                   else None)
+            if 'no_duplicates' in kinds and not field.get('duplicates'):
+                field['duplicates'] = (
+                    stats['nunique'] != stats['non_null_count']
+                    or (mark is not None and stats['non_null_count'] > 0
+                        and self.overlap_count(source, name, watermark,
+                                               mark) > 0))
+            if ('allowed_values' in kinds
+                    and field.get('uniques', []) is not None):
+                limit = len(kinds['allowed_values']) + 1
+                uniques = set(from_state_value(v)
+                              for v in field.get('uniques', []))
+                uniques.update(self.get_database_unique_values(
+                    source, name, include_nulls=True))
+                if len([v for v in uniques if v is not None]) > limit:
+                    field['uniques'] = None
+                else:
+                    field['uniques'] = [to_state_value(v) for v in
+                                        sorted(uniques,
+                                               key=lambda v: (v is not None,
+                                                              v))]
+            if 'rex' in kinds and not field.get('rex_failed'):
+                field['rex_failed'] = not self.get_database_rex_match(
+                    source, name, kinds['rex'])
+
+            cache = self.cache_values(name)
+            for stat in ('null_count', 'non_null_count', 'min', 'max',
+                         'min_length', 'max_length'):
+                if stat in field:
+                    cache[stat] = from_state_value(field[stat])
+            if 'uniques' in field or 'duplicates' in field:
+                uniques = field.get('uniques')
+                if uniques is not None:
+                    values = [from_state_value(v) for v in uniques]
+                    cache['uniques'] = values
+                    cache['nunique'] = len([v for v in values
+                                            if v is not None])
+                elif 'duplicates' in field:
+                    cache['nunique'] = (field['non_null_count']
+                                        - (1 if field['duplicates'] else 0))
+                else:
+                    cache['nunique'] = len(kinds['allowed_values']) + 1
+            if 'rex_failed' in field:
+                self.rex_failures[name] = field['rex_failed']
+
+        latest = new.get(watermark, {}).get('max')
+        if latest is not None:
+            state['watermark'] = to_state_value(latest)
+        write_state(state_path, state)
+        return state
+
+    def overlap_count(self, source, colname, watermark, mark):
+        """
+        Returns the number of (new) rows in *source* whose value in
+        the column given also occurs in a row of the table at or below
+        the watermark.
+
+        The query is driven by the new rows, each of which is looked up
+        in the table (using an index on the column, if there is one),
+        rather than by reading all the older rows.
+        """
+        col = self.quoted(colname)
+        sql = ('SELECT COUNT(*) FROM %s WHERE %s IS NOT NULL AND EXISTS '
+               '(SELECT 1 FROM %s tdda_old WHERE tdda_old.%s = tdda_new.%s '
+               'AND tdda_old.%s <= %s)'
+               % (source, col, self.tablename, col, col,
+                  self.quoted(watermark), self.marker))
+        return self.execute_scalar(sql, source.params + [mark])
+
+    def calc_rex_constraint(self, colname, constraint, detect=False):
+        if colname in self.rex_failures:
+            if self.rex_failures[colname]:
+                return list(constraint.value) if detect else True
+            return False
+        return DatabaseConstraintCalculator.calc_rex_constraint(
+            self, colname, constraint, detect=detect)
 
 
 class DatabaseVerification(Verification):
@@ -161,6 +784,91 @@ class DatabaseVerification(Verification):
         Verification.__init__(self, *args, **kwargs)
 
 
+class DatabaseDetection(DatabaseVerification):
+    """
+    A :py:class:`DatabaseDetection` object adds a :py:meth:`detected()`
+    method to a :py:class:`DatabaseVerification` object.
+
+    The object also provides properties `n_passing_records` and
+    `n_failing_records`, recording how many records passed and failed
+    the detection process.
+    """
+    def __init__(self, *args, **kwargs):
+        DatabaseVerification.__init__(self, *args, **kwargs)
+
+    def detected(self):
+        """
+        Returns a Pandas DataFrame containing the detection results,
+        if they were not written to an output file (and there were
+        some failing records, or *write_all* was set), or ``None``.
+        """
+        return self.detection.obj if self.detection else None
+
+
+class DatabaseBatchVerification(object):
+    """
+    A :py:class:`DatabaseBatchVerification` object is the consolidated
+    result of verifying several database tables (see
+    :py:func:`verify_db_tables`).
+
+    It has attributes:
+
+    - *tables*      --- An ordered dictionary mapping each table name
+                        to its :py:class:`DatabaseVerification`
+                        (or to ``None`` if it could not be verified)
+    - *errors*      --- A dictionary mapping the names of tables that could
+                        not be verified to a message explaining why
+    - *passes*      --- Total number of passing constraints
+    - *failures*    --- Total number of failing constraints
+    """
+    def __init__(self, report='all'):
+        self.tables = OrderedDict()
+        self.errors = {}
+        self.passes = 0
+        self.failures = 0
+        self.report = report
+
+    def add(self, tablename, verification, error=None):
+        self.tables[tablename] = verification
+        if verification is not None:
+            self.passes += verification.passes
+            self.failures += verification.failures
+        if error:
+            self.errors[tablename] = error
+
+    def table_failed(self, tablename):
+        v = self.tables[tablename]
+        return v is None or v.failures > 0
+
+    def __str__(self):
+        """
+        Returns string representation of the
+        :py:class:`DatabaseBatchVerification` object, consisting of the
+        report for each table, followed by an overall summary.
+
+        If the object's :py:attr:`report` property is set to 'fields',
+        then only tables with failures (or errors) are reported in detail.
+        """
+        parts = []
+        for tablename, v in self.tables.items():
+            if self.report == 'fields' and not self.table_failed(tablename):
+                continue
+            if v is None:
+                parts.append('TABLE %s:\n\nERROR: %s'
+                             % (tablename, self.errors[tablename]))
+            else:
+                parts.append('TABLE %s:\n\n%s' % (tablename, str(v)))
+        nfailed = len([t for t in self.tables if self.table_failed(t)])
+        parts.append('BATCH SUMMARY:\n\n'
+                     'Tables passing: %d\n'
+                     'Tables failing: %d\n'
+                     'Constraints passing: %d\n'
+                     'Constraints failing: %d'
+                     % (len(self.tables) - nfailed, nfailed,
+                        self.passes, self.failures))
+        return '\n\n'.join(parts)
+
+
 class DatabaseConstraintDiscoverer(DatabaseConstraintCalculator,
                                    BaseConstraintDiscoverer,
                                    DatabaseHandler):
@@ -168,13 +876,121 @@ class DatabaseConstraintDiscoverer(DatabaseConstraintCalculator,
     A :py:class:`DatabaseConstraintDiscoverer` object is used to discover
     constraints on a single database table.
     """
-    def __init__(self, dbtype, db, tablename, inc_rex=False):
+    def __init__(self, dbtype, db, tablename, inc_rex=False, sample=None):
         DatabaseHandler.__init__(self, dbtype, db)
         tablename = self.resolve_table(tablename)
 
         DatabaseConstraintCalculator.__init__(self, tablename)
         BaseConstraintDiscoverer.__init__(self, inc_rex=inc_rex)
         self.tablename = tablename
+        if sample is not None:
+            if sample <= 0:
+                raise Exception('Sample must be a positive fraction '
+                                'or number of rows, not %s' % sample)
+            if not hasattr(self.instance, 'get_database_profile'):
+                raise Exception('Sampled discovery is not supported '
+                                'for %s databases' % dbtype)
+        self.sample = sample
+
+    def discover(self, n_jobs=None):
+        workers = self.parallel_workers(n_jobs)
+        if hasattr(self.instance, 'get_database_profile'):
+            self.profile_table(n_jobs=workers)
+        return BaseConstraintDiscoverer.discover(self, n_jobs=workers)
+
+
+def widen(m, M, ctype, margin=SAMPLE_WIDENING):
+    """
+    Widens the range from *m* to *M* of the values of the given TDDA type
+    found in a sample, by *margin* times the width of the range at each
+    end, to allow for values in the table that were not in the sample.
+
+    The widening never changes the sign of either end (so sign
+    constraints are not lost): a positive minimum is reduced to no less
+    than *margin* times itself (or 1, for integers), and a zero minimum
+    stays at zero, and similarly for maxima. Integer ranges are widened
+    to integers, and boolean ranges are not widened at all.
+    """
+    if ctype == 'bool' or m is None or M is None:
+        return (m, M)
+    if ctype == 'date':
+        span = datetime.timedelta(seconds=(M - m).total_seconds() * margin)
+        return (m - span, M + span)
+    span = (M - m) * margin
+    (lo, hi) = (m - span, M + span)
+    if m >= 0:
+        lo = max(lo, m * margin)
+    if M <= 0:
+        hi = min(hi, M * margin)
+    if ctype == 'int':
+        lo = int(math.floor(lo))
+        hi = int(math.ceil(hi))
+        if m > 0:
+            lo = max(lo, 1)
+        if M < 0:
+            hi = min(hi, -1)
+    return (lo, hi)
+
+
+def constraints_fingerprint(constraints):
+    """
+    Returns a digest of the field constraints provided, so that saved
+    incremental state can be discarded if the constraints change.
+    """
+    text = json.dumps(constraints.to_dict()['fields'], sort_keys=True,
+                      default=str)
+    return hashlib.md5(text.encode('UTF-8')).hexdigest()
+
+
+def read_state(path):
+    """
+    Reads saved incremental verification state from the JSON file
+    given, returning ``None`` if there is no such file.
+    """
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        return json.load(f)
+
+
+def write_state(path, state):
+    """
+    Saves incremental verification state to the JSON file given.
+    """
+    with open(path, 'w') as f:
+        json.dump(state, f, indent=4, sort_keys=True)
+        f.write('\n')
+
+
+def to_state_value(value):
+    """
+    Converts a database value to a form that can be saved as JSON
+    (dates become single-key dictionaries).
+    """
+    if isinstance(value, datetime.datetime):
+        return {'datetime': value.strftime(STATE_DATE_FORMATS[0])}
+    elif isinstance(value, datetime.date):
+        return {'date': value.strftime('%Y-%m-%d')}
+    elif isinstance(value, decimal.Decimal):
+        return float(value)
+    return value
+
+
+def from_state_value(value):
+    """
+    Converts a value saved by :py:func:`to_state_value` back to
+    the database value it came from.
+    """
+    if isinstance(value, dict):
+        if 'date' in value:
+            return datetime.datetime.strptime(value['date'],
+                                              '%Y-%m-%d').date()
+        for fmt in STATE_DATE_FORMATS:
+            try:
+                return datetime.datetime.strptime(value['datetime'], fmt)
+            except ValueError:
+                pass
+    return value
 
 
 def types_compatible(x, y, colname):
@@ -201,7 +1017,7 @@ def types_compatible(x, y, colname):
 
 def verify_db_table(dbtype, db, tablename, constraints_path, epsilon=None,
                     type_checking='strict', testing=False, report='all',
-                    **kwargs):
+                    n_jobs=None, watermark=None, state_path=None, **kwargs):
     """
     Verify that (i.e. check whether) the database table provided
     satisfies the constraints in the JSON .tdda file provided.
@@ -277,6 +1093,36 @@ def verify_db_table(dbtype, db, tablename, constraints_path, epsilon=None,
                             when being run as part of an automated test.
                             It suppresses type-compatibility warnings.
 
+        *n_jobs*:
+                            The number of queries to run in parallel.
+                            This only has an effect if *db* has a
+                            connection pool (see the *pool_size* parameter
+                            of :py:func:`~tdda.constraints.db.drivers.database_connection`),
+                            in which case the statistics are calculated by
+                            several table scans running concurrently
+                            (each for a subset of the columns), and the
+                            remaining queries for each field are run
+                            in parallel too. The number of concurrent
+                            queries is limited by the size of the pool.
+
+        *watermark*:
+                            The name of a column whose values increase
+                            as rows are appended to the table (such as
+                            a sequence number or a load timestamp).
+
+                            If specified, verification is incremental:
+                            statistics for the table are saved in a state
+                            file, and each subsequent verification reads
+                            only the rows whose *watermark* values are
+                            greater than any seen before, merging their
+                            statistics into the saved ones. This is only
+                            correct for append-only tables.
+
+        *state_path*:
+                            The path to the state file for incremental
+                            verification. The default is the constraints
+                            path with ``.state`` appended.
+
     Returns:
 
         :py:class:`~DatabaseVerification` object.
@@ -307,21 +1153,188 @@ def verify_db_table(dbtype, db, tablename, constraints_path, epsilon=None,
         print('No table %s' % tablename, file=sys.stderr)
         sys.exit(1)
     constraints = DatasetConstraints(loadpath=constraints_path)
+    if watermark and state_path is None:
+        state_path = constraints_path + STATE_SUFFIX
     return dbv.verify(constraints,
                       VerificationClass=DatabaseVerification,
-                      report=report, **kwargs)
+                      report=report, n_jobs=n_jobs, watermark=watermark,
+                      state_path=state_path, **kwargs)
+
+
+def verify_db_tables(dbtype, db, tables, epsilon=None,
+                     type_checking='strict', testing=False, report='all',
+                     n_jobs=None, **kwargs):
+    """
+    Verify several database tables, each against the constraints in
+    its own JSON .tdda file, producing a single consolidated result.
+
+    Mandatory Inputs:
+
+        *dbtype*:
+                            Type of database.
+        *db*:
+                            A database object
+        *tables*:
+                            A list of (tablename, constraints_path) pairs.
+
+    Optional Inputs:
+
+        *n_jobs*:
+                            The number of tables to verify concurrently.
+                            This only has an effect if *db* has a
+                            connection pool (see the *pool_size* and
+                            *shared* parameters of
+                            :py:func:`~tdda.constraints.db.drivers.database_connection`),
+                            and the number of concurrent queries is
+                            limited by the size of the pool.
+
+    The other optional inputs are as for :py:func:`verify_db_table`,
+    and apply to every table.
+
+    A table that does not exist, whose constraints cannot be read, or
+    whose verification fails with a database error, is reported as an
+    error in the result, rather than stopping the verification of the
+    other tables.
+
+    Returns:
+
+        :py:class:`~DatabaseBatchVerification` object.
+
+    Example usage::
+
+        from tdda.constraints.db.drivers import database_connection
+        from tdda.constraints.db.constraints import verify_db_tables
+
+        db = database_connection(dbtype='postgres', db='mydb',
+                                 pool_size=4, shared=True)
+        v = verify_db_tables('postgres', db,
+                             [('schema.orders', 'orders.tdda'),
+                              ('schema.customers', 'customers.tdda')],
+                             n_jobs=4)
+        print(str(v))
+    """
+    workers = DatabaseHandler(dbtype, db).parallel_workers(n_jobs)
+    tables = list(tables)
+
+    def verify_table(item):
+        (tablename, constraints_path) = item
+        try:
+            dbv = DatabaseConstraintVerifier(dbtype, db, tablename,
+                                             epsilon=epsilon,
+                                             type_checking=type_checking,
+                                             testing=testing)
+            if not dbv.check_table_exists(tablename):
+                return (None, 'No table %s' % tablename)
+            try:
+                constraints = DatasetConstraints(loadpath=constraints_path)
+            except (IOError, ValueError) as e:
+                return (None, 'Cannot read constraints from %s: %s'
+                              % (constraints_path, e))
+            v = dbv.verify(constraints,
+                           VerificationClass=DatabaseVerification,
+                           report=report,
+                           n_jobs=n_jobs if workers == 1 else None, **kwargs)
+        except Exception as e:
+            # e.g. permissions, a bad column or a timeout
+            return (None, str(e))
+        return (v, None)
+
+    if workers > 1 and len(tables) > 1:
+        pool = ThreadPool(min(workers, len(tables)))
+        try:
+            results = pool.map(verify_table, tables)
+        finally:
+            pool.close()
+            pool.join()
+    else:
+        results = [verify_table(item) for item in tables]
+
+    batch = DatabaseBatchVerification(report=report)
+    for (tablename, constraints_path), (v, error) in zip(tables, results):
+        batch.add(tablename, v, error)
+    return batch
 
 
 def detect_db_table(dbtype, db, tablename, constraints_path, epsilon=None,
-                    type_checking='strict', testing=False, **kwargs):
+                    type_checking='strict', testing=False, outpath=None,
+                    write_all=False, per_constraint=False, output_fields=None,
+                    index=False, boolean_ints=False, report='records',
+                    **kwargs):
     """
-    Detect failures from verification of constraints
+    Check the records in the database table provided against the
+    constraints in the JSON .tdda file provided, writing out the
+    records that fail them.
+
+    The failing records are selected by the database (using a SQL
+    condition built from the failing constraints), and are fetched
+    and written out a batch at a time, so the table is never loaded
+    into memory.
+
+    Mandatory Inputs:
+
+        *dbtype*:
+                            Type of database.
+        *db*:
+                            A database object
+        *tablename*:
+                            A database table name, to be checked.
+
+        *constraints_path*:
+                            The path to a JSON .tdda file containing
+                            constraints to be checked.
+
+    Optional Inputs:
+
+        *outpath*:
+                            The path to a ``.csv`` or ``.feather`` file
+                            to which to write the detection results,
+                            in the same format as for
+                            :py:func:`~tdda.constraints.pd.constraints.detect_df`
+                            (or ``-`` to write CSV to standard output).
+                            If not set, the results are available from the
+                            :py:meth:`~DatabaseDetection.detected()` method
+                            of the result instead.
+
+        *write_all*, *per_constraint*, *output_fields*, *index*
+        and *boolean_ints*:
+                            As for
+                            :py:func:`~tdda.constraints.pd.constraints.detect_df`.
+                            Records are numbered in the order in which
+                            the database returns them.
+
+        *report*:
+                            ``all``, ``fields`` or ``records``, as for
+                            :py:func:`~tdda.constraints.pd.constraints.detect_df`.
+
+        *epsilon*, *type_checking* and *testing*:
+                            As for :py:func:`verify_db_table`.
+
+    Detection is only available for SQL databases (not MongoDB), and
+    requires Pandas.
+
+    Returns:
+
+        :py:class:`~DatabaseDetection` object.
     """
-    raise NotImplementedError('Detection is not implemented (yet) '
-                              'for databases.')
+    if dbtype == 'mongodb':
+        raise Exception('Detection is not available for MongoDB.')
+    dbv = DatabaseConstraintVerifier(dbtype, db, tablename, epsilon=epsilon,
+                                     type_checking=type_checking,
+                                     testing=testing)
+    if not dbv.check_table_exists(tablename):
+        print('No table %s' % tablename, file=sys.stderr)
+        sys.exit(1)
+    constraints = DatasetConstraints(loadpath=constraints_path)
+    return dbv.detect(constraints, VerificationClass=DatabaseDetection,
+                      outpath=outpath, write_all=write_all,
+                      per_constraint=per_constraint,
+                      output_fields=output_fields, index=index,
+                      rownumber_is_index=False, boolean_ints=boolean_ints,
+                      report=report, **kwargs)
 
 
-def discover_db_table(dbtype, db, tablename, inc_rex=False):
+def discover_db_table(dbtype, db, tablename, inc_rex=False, n_jobs=None,
+                      sample=None):
     """
     Automatically discover potentially useful constraints that characterize
     the database table provided.
@@ -334,6 +1347,21 @@ def discover_db_table(dbtype, db, tablename, inc_rex=False):
             a database object
         *tablename*:
             a table name
+        *n_jobs*:
+            The number of queries to run in parallel, as for
+            :py:func:`verify_db_table`.
+        *sample*:
+            If specified, discover draft constraints from a (repeatable)
+            random sample of the table, rather than from the whole table.
+            A value less than 1 is the fraction of the rows to sample;
+            otherwise it is the number of rows. The min and max constraints
+            (and lengths) are widened from those found in the sample, and
+            the table itself is only checked (in a single pass) for the
+            statistics the sample cannot determine: see
+            :py:meth:`DatabaseConstraintCalculator.sampled_profile`.
+            Sampling uses ``TABLESAMPLE`` on PostgreSQL, and ``$sample``
+            on MongoDB, where the sample is not repeatable (each query
+            sees a different random selection of the documents).
 
     Possible return values:
 
@@ -433,14 +1461,15 @@ def discover_db_table(dbtype, db, tablename, inc_rex=False):
 
     """
     disco = DatabaseConstraintDiscoverer(dbtype, db, tablename,
-                                         inc_rex=inc_rex)
+                                         inc_rex=inc_rex, sample=sample)
     if not disco.check_table_exists(tablename):
         print('No table %s' % tablename, file=sys.stderr)
         sys.exit(1)
-    constraints = disco.discover()
+    constraints = disco.discover(n_jobs=n_jobs)
     if constraints:
         nrows = disco.get_nrows(tablename)
-        constraints.set_stats(n_records=nrows, n_selected=nrows)
+        nselected = nrows if disco.sample_nrows is None else disco.sample_nrows
+        constraints.set_stats(n_records=nrows, n_selected=nselected)
         constraints.set_dates_user_host_creator()
         constraints.set_rdbms('%s:%s:%s:%s' % (dbtype or '', db.host or '',
                                                db.user, db.database))
@@ -20,7 +20,13 @@ Parameters:
 
   * constraints.tdda is a JSON .tdda file constaining constraints.
 
-  * detection output file is not implemented yet.
+  * detection output file is a .csv or .feather file to which the
+    failing records are written (in the same format as for CSV files
+    and Pandas DataFrames). If it is not given, the failing records
+    are not written out.
+
+The failing records are selected by the database itself, and are
+written out as they are fetched.
 
 '''
 
@@ -44,7 +50,7 @@ def detect_database_table_from_file(table, constraints_path,
     detect using the given database table, against constraints in the .tdda
     file specified.
 
-    Not implemented
+    Prints results to stdout.
     """
     (table, dbtype) = parse_table_name(table, dbtype)
     db = database_connection(table=table, conn=conn, dbtype=dbtype, db=db,
@@ -25,6 +25,20 @@ Parameters:
   * constraints.tdda, if provided, specifies the name of a file to
     which the generated constraints will be written.
 
+Additional optional flags are:
+
+  * --jobs N
+      Run up to N database queries in parallel, each on its own
+      connection.
+
+  * --sample S
+      Discover draft constraints from a random sample of the table:
+      a fraction of its rows if S is less than 1, and otherwise S rows.
+      Minimum and maximum values are widened from those in the sample,
+      and the whole table is only checked for the few statistics that
+      the sample cannot determine. Samples are repeatable, except on
+      MongoDB, where each query sees a different random sample.
+
 '''
 
 import os
@@ -50,7 +64,8 @@ def discover_constraints_from_database(table, constraints_path=None,
     (table, dbtype) = parse_table_name(table, dbtype)
     db = database_connection(table=table, conn=conn, dbtype=dbtype, db=db,
                              host=host, port=port,
-                             user=user, password=password)
+                             user=user, password=password,
+                             pool_size=kwargs.get('n_jobs'))
     constraints = discover_db_table(dbtype, db, table, **kwargs)
     if constraints is None:
         # should never happen
@@ -69,11 +84,21 @@ def discover_constraints_from_database(table, constraints_path=None,
 def get_params(args):
     parser = database_arg_parser(discover_parser, USAGE)
     parser.add_argument('table', nargs=1, help='database table name')
+    parser.add_argument('-j', '--jobs', type=int,
+                        help='number of database queries to run in parallel')
+    parser.add_argument('--sample', type=float,
+                        help='fraction (if less than 1) or number of rows '
+                             'to sample')
     parser.add_argument('constraints', nargs='?',
                         help='name of constraints file to create')
     params = {}
     flags = database_arg_flags(discover_flags, parser, args, params)
     params['table'] = flags.table[0] if flags.table else None
+    if flags.jobs is not None:
+        params['n_jobs'] = flags.jobs
+    if flags.sample is not None:
+        params['sample'] = (flags.sample if flags.sample < 1
+                            else int(flags.sample))
     params['constraints_path'] = flags.constraints
     return params
 
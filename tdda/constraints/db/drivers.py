@@ -13,6 +13,16 @@ import json
 import os
 import re
 import sys
+import threading
+
+from collections import OrderedDict
+from contextlib import contextmanager
+from multiprocessing.pool import ThreadPool
+
+try:
+    from queue import Queue
+except ImportError:
+    from Queue import Queue
 
 try:
     import pgdb
@@ -35,12 +45,58 @@ except ImportError:
     pymongo = None
 
 
-from tdda.constraints.base import UNICODE_TYPE
+from tdda.constraints.base import UNICODE_TYPE, combine_rexes
 from tdda.constraints.baseconstraints import unicode_string, long_type
 from tdda.constraints.flags import (discover_parser, discover_flags,
                                     verify_parser, verify_flags)
 
 
+PROFILE_BATCH_SIZE = 100    # Maximum number of columns profiled by a single
+                            # aggregate query (databases limit the number of
+                            # expressions in a select list)
+
+SAMPLE_SEED = 1597          # Seed for repeatable table sampling, so that
+                            # every query sees the same sample
+
+SAMPLE_MULTIPLIER = 2654435761  # Multiplicative hash of SQLite rowids used
+SAMPLE_MODULUS = 4294967291     # to choose (repeatable) sample rows
+
+FETCH_BATCH_SIZE = 10000    # Number of rows fetched at a time when
+                            # streaming the results of a query
+
+REGEX_CACHE_SIZE = 256      # Number of compiled regular expressions kept
+                            # by the SQLite REGEXP implementation
+
+REGEX_CACHE = OrderedDict() # Least recently used first
+REGEX_CACHE_LOCK = threading.Lock()
+
+TYPE_SAMPLE_SIZE = 1000     # Number of MongoDB documents sampled to
+                            # infer the types of a collection's fields
+
+MONGODB_TYPES = {           # TDDA types of BSON types (others are 'other')
+    'bool': 'bool',
+    'int': 'int',
+    'long': 'int',
+    'double': 'real',
+    'decimal': 'real',
+    'string': 'string',
+    'date': 'date',
+    'timestamp': 'date',
+}
+
+PARAMETER_MARKERS = {       # Placeholders for query parameters, by the
+    'postgres': '%s',       # DB-API paramstyle of each database's driver
+    'postgresql': '%s',
+    'mysql': '%s',
+    'sqlite': '?',
+    'sqlserver': '?',
+}
+
+SHARED_CONNECTIONS = {}     # Pooled connections shared within the process,
+                            # keyed on their connection parameters
+SHARED_CONNECTIONS_LOCK = threading.Lock()
+
+
 DATABASE_USAGE = '''
 
 Database connection flags:
@@ -138,10 +194,20 @@ def database_arg_flags(create_flags, parser, args, params):
 
 def database_connection(table=None, conn=None, dbtype=None, db=None,
                         host=None, port=None, user=None, password=None,
-                        schema=None):
+                        schema=None, pool_size=None, shared=False):
     """
     Connect to a database, using an appropriate driver for the type
     of database specified.
+
+    If *pool_size* is specified (and greater than 1), the connection
+    also has a :py:class:`ConnectionPool` of up to that many further
+    connections, which are used to run independent queries in parallel
+    (see the *n_jobs* parameter of
+    :py:func:`~tdda.constraints.db.constraints.verify_db_table`).
+
+    If *shared* is set, a pooled connection with the same parameters
+    that was opened earlier in the same process is returned (rather
+    than a new one), so that its connections are reused across tables.
     """
     if conn:
         defaults = ConnectionSpec(conn)
@@ -190,16 +256,26 @@ def database_connection(table=None, conn=None, dbtype=None, db=None,
         sys.exit(1)
 
     dbtypelower = dbtype.lower()
-    if dbtypelower in DATABASE_CONNECTORS:
-        connector = DATABASE_CONNECTORS[dbtypelower]
+    if dbtypelower not in DATABASE_CONNECTORS:
+        print('Database type %s not supported' % dbtype, file=sys.stderr)
+        sys.exit(1)
+    connector = DATABASE_CONNECTORS[dbtypelower]
+    pooled = pool_size and pool_size > 1 and dbtypelower != 'mongodb'
+    key = (dbtypelower, db, host, port, user, schema)
+    with SHARED_CONNECTIONS_LOCK:
+        if pooled and shared and key in SHARED_CONNECTIONS:
+            return SHARED_CONNECTIONS[key]
         conn = connector(host, port, db, user, password)
         if conn is None:
             sys.exit(1)   # error message already reported
-        return Connection(conn, schema, host=host, port=port, database=db,
-                          user=user)
-    else:
-        print('Database type %s not supported' % dbtype, file=sys.stderr)
-        sys.exit(1)
+        connection = Connection(conn, schema, host=host, port=port,
+                                database=db, user=user)
+        if pooled:
+            connection.pool = ConnectionPool(
+                lambda: connector(host, port, db, user, password), pool_size)
+            if shared:
+                SHARED_CONNECTIONS[key] = connection
+    return connection
 
 
 def database_connection_postgres(host, port, db, user, password):
@@ -238,7 +314,9 @@ def database_connection_mysql(host, port, db, user, password):
 
 def database_connection_sqlite(host, port, db, user, password):
     if sqlite3:
-        conn = sqlite3.connect(db)
+        # Pooled connections are used by different threads (though
+        # never by more than one at a time).
+        conn = sqlite3.connect(db, check_same_thread=False)
         conn.create_function('regexp', 2, regex_matcher)
         return conn
     else:
@@ -262,14 +340,33 @@ def database_connection_mongodb(host, port, db, user, password):
         sys.exit(1)
 
 
+def compiled_regex(expr):
+    """
+    Returns the compiled form of a regular expression, from a
+    least-recently-used cache of up to :py:const:`REGEX_CACHE_SIZE`
+    regular expressions (shared by all connections).
+    """
+    with REGEX_CACHE_LOCK:
+        c = REGEX_CACHE.pop(expr, None)
+        if c is None:
+            c = re.compile(expr)
+            if len(REGEX_CACHE) >= REGEX_CACHE_SIZE:
+                REGEX_CACHE.popitem(last=False)
+        REGEX_CACHE[expr] = c
+    return c
+
+
 def regex_matcher(expr, item):
     """
-    REGEXP implementation for Sqlite
+    REGEXP implementation for Sqlite.
+
+    This is called for every row, so the regular expression is only
+    compiled the first time it is seen.
     """
     if item is None:
         return False
     else:
-        return re.match(expr, item) is not None
+        return compiled_regex(expr).match(item) is not None
 
 
 class ConnectionSpec:
@@ -307,6 +404,57 @@ class Connection:
         self.port = port
         self.database = database
         self.user = user
+        self.pool = None
+
+
+class ConnectionPool:
+    """
+    A pool of up to *size* DB-API connections to the same database,
+    opened (using *connect*) as they are needed, so that independent
+    queries can be run concurrently from several threads. Each
+    connection is only ever used by one thread at a time.
+    """
+    def __init__(self, connect, size):
+        self.connect = connect
+        self.size = size
+        self.idle = Queue()
+        self.nopen = 0
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        with self.lock:
+            can_open = self.idle.empty() and self.nopen < self.size
+            if can_open:
+                self.nopen += 1
+        if can_open:
+            try:
+                return self.connect()
+            except:
+                with self.lock:
+                    self.nopen -= 1
+                raise
+        return self.idle.get()
+
+    def release(self, conn):
+        self.idle.put(conn)
+
+    @contextmanager
+    def cursor(self):
+        """
+        Context manager providing a cursor on a connection from the
+        pool, returning the connection to the pool afterwards.
+        """
+        conn = self.acquire()
+        try:
+            yield conn.cursor()
+        finally:
+            self.release(conn)
+
+    def close(self):
+        while not self.idle.empty():
+            self.idle.get().close()
+            with self.lock:
+                self.nopen -= 1
 
 
 class DatabaseHandler:
@@ -330,6 +478,27 @@ class DatabaseHandler:
         return getattr(self.instance, name)
 
 
+class SQLSubquery:
+    """
+    A SQL query, with values for its placeholders (*params*), whose
+    results are used in place of a table name.
+    """
+    def __init__(self, sql, params):
+        self.sql = sql
+        self.params = list(params)
+
+    def __str__(self):
+        return self.sql
+
+
+def source_params(source):
+    """
+    Returns the list of parameters for the placeholders in a table name
+    or :py:class:`SQLSubquery`.
+    """
+    return list(getattr(source, 'params', []))
+
+
 class SQLDatabaseHandler:
     """
     Common database SQL support
@@ -339,6 +508,9 @@ class SQLDatabaseHandler:
         self.db = db.connection
         self.schema = db.schema
         self.cursor = db.connection.cursor()
+        self.pool = getattr(db, 'pool', None)
+        self.catalog = {}
+        self.marker = PARAMETER_MARKERS.get(dbtype, '%s')
 
     def quoted(self, name):
         # quote a columnname
@@ -349,18 +521,186 @@ class SQLDatabaseHandler:
         else:
             return '"%s"' % name
 
-    def execute_scalar(self, sql):
+    def execute_scalar(self, sql, params=None):
         # execute a SQL statement, returning a single scalar result
-        self.cursor.execute(sql)
-        result = self.cursor.fetchall()[0][0]
+        result = self.execute_all(sql, params)[0][0]
         if result == '' and self.dbtype == 'sqlite':
             result = None
         return result
 
-    def execute_all(self, sql):
-        # execute a SQL statement, returning a list of rows
-        self.cursor.execute(sql)
-        return self.cursor.fetchall()
+    def execute_all(self, sql, params=None):
+        # execute a SQL statement, returning a list of rows.
+        # Any values in the statement should be passed as params (with
+        # placeholders in the SQL), so that the statement text is the
+        # same whatever the values, and can be reused by the driver.
+        if self.pool is None:
+            self.execute(self.cursor, sql, params)
+            return self.cursor.fetchall()
+        with self.pool.cursor() as cursor:
+            self.execute(cursor, sql, params)
+            return cursor.fetchall()
+
+    def execute(self, cursor, sql, params=None):
+        if params:
+            cursor.execute(sql, [self.sql_parameter(v) for v in params])
+        else:
+            cursor.execute(sql)
+
+    def stream_all(self, sql, batch_size=FETCH_BATCH_SIZE, params=None):
+        """
+        Execute a SQL query, generating its results as a sequence of
+        (column names, rows) pairs, with up to *batch_size* rows in each,
+        so that the whole result never needs to be held in memory.
+        The first pair is always generated, even if there are no rows.
+        Any *params* are the values for the query's placeholders.
+
+        The rows are fetched from the server as they are needed, using
+        a server-side cursor for databases whose drivers otherwise
+        fetch the whole result when the query is executed.
+        """
+        conn = self.pool.acquire() if self.pool else self.db
+        postgres = self.dbtype in ('postgres', 'postgresql')
+        try:
+            if postgres:
+                cursor = conn.cursor()
+                self.execute(cursor,
+                             'DECLARE tdda_stream NO SCROLL CURSOR FOR %s'
+                             % sql, params)
+                def fetch():
+                    cursor.execute('FETCH FORWARD %d FROM tdda_stream'
+                                   % batch_size)
+                    return cursor.fetchall()
+            else:
+                if self.dbtype == 'mysql':
+                    cursor = conn.cursor(MySQLdb.cursors.SSCursor)
+                else:
+                    cursor = conn.cursor()
+                self.execute(cursor, sql, params)
+                def fetch():
+                    return cursor.fetchmany(batch_size)
+            rows = fetch()
+            names = [d[0] for d in cursor.description]
+            yield (names, rows)
+            while len(rows) == batch_size:
+                rows = fetch()
+                if rows:
+                    yield (names, rows)
+            if postgres:
+                cursor.execute('CLOSE tdda_stream')
+                conn.commit()
+        finally:
+            if self.pool:
+                self.pool.release(conn)
+
+    def parallel_workers(self, n_jobs):
+        """
+        Returns the number of queries that can be run concurrently,
+        given that *n_jobs* have been requested. This is limited by the
+        size of the connection pool (so is 1 if there isn't one).
+        """
+        if self.pool is None or not n_jobs:
+            return 1
+        return max(1, min(n_jobs, self.pool.size))
+
+    def sample_source(self, tablename, sample, nrows):
+        """
+        Returns a SQL subquery (for use in place of the table name in
+        a FROM clause) selecting a repeatable random sample of the rows
+        of a table, so that every query on it sees the same rows.
+
+        *sample* is either a fraction of the rows (if less than 1),
+        or a number of rows; *nrows* is the number of rows in the table.
+
+        Returns ``None`` if the sample would include the whole table.
+        """
+        limit = None
+        if sample < 1:
+            fraction = sample
+        else:
+            limit = int(sample)
+            fraction = limit / nrows if nrows else 1
+        if fraction >= 1:
+            return None
+        if self.dbtype in ('postgres', 'postgresql'):
+            # block sampling, so only the sampled pages are read; when
+            # a number of rows is wanted, take a slightly larger sample
+            # and then limit it
+            percent = 100 * min(1, fraction * (1.2 if limit else 1))
+            sql = ('SELECT * FROM %s TABLESAMPLE SYSTEM (%r) REPEATABLE (%d)'
+                   % (tablename, percent, SAMPLE_SEED))
+            if limit:
+                sql += ' LIMIT %d' % limit
+        elif self.dbtype == 'sqlite':
+            key = '((rowid * %d) %% %d)' % (SAMPLE_MULTIPLIER, SAMPLE_MODULUS)
+            if limit:
+                sql = ('SELECT * FROM %s ORDER BY %s LIMIT %d'
+                       % (tablename, key, limit))
+            else:
+                sql = ('SELECT * FROM %s WHERE %s < %d'
+                       % (tablename, key, int(fraction * SAMPLE_MODULUS)))
+        elif self.dbtype == 'mysql':
+            if limit:
+                sql = ('SELECT * FROM %s ORDER BY RAND(%d) LIMIT %d'
+                       % (tablename, SAMPLE_SEED, limit))
+            else:
+                sql = ('SELECT * FROM %s WHERE RAND(%d) < %r'
+                       % (tablename, SAMPLE_SEED, fraction))
+        else:
+            raise Exception('Sampling is not supported for %s databases'
+                            % self.dbtype)
+        return '(%s) tdda_sample' % sql
+
+    def sql_parameter(self, value):
+        """
+        Returns the form in which a (constraint) value is passed to the
+        database driver as a query parameter.
+        """
+        if self.dbtype == 'sqlite':
+            # sqlite has no date type, so dates are stored as strings,
+            # in the form used by python's sqlite3 module (with
+            # microseconds only if there are any)
+            if isinstance(value, datetime.datetime):
+                return value.isoformat(' ')
+            elif isinstance(value, datetime.date):
+                return value.strftime('%Y-%m-%d %H:%M:%S')
+        return value
+
+    def length_sql(self, colname):
+        """
+        Returns the SQL expression for the length of a (string) column.
+        """
+        length = 'CHAR_LENGTH' if self.dbtype == 'mysql' else 'LENGTH'
+        return '%s(%s)' % (length, self.quoted(colname))
+
+    def rex_match_sql(self, colname, rexes):
+        """
+        Returns the SQL condition for a (string) column matching at least
+        one of the regular expressions given, and the list of parameters
+        (the regular expressions) for its placeholders.
+        """
+        name = self.quoted(colname)
+        if self.dbtype in ('postgres', 'postgresql'):
+            # postgresql uses ~ syntax
+            op = '~'
+        elif self.dbtype == 'mysql':
+            # mysql uses REGEXP syntax, and doesn't understand \d
+            rexes = [r.replace('\\d', '[0-9]') for r in rexes]
+            op = 'REGEXP'
+        elif self.dbtype == 'sqlite':
+            # sqlite doesn't support regular expressions unless the
+            # regexp() user-defined function is available - but we have
+            # arranged for that in the database_connection_sqlite function.
+            # Each call of that is a python function call, so the
+            # expressions are combined into a single one (where possible)
+            # to call it only once per row.
+            combined = combine_rexes(rexes)
+            if combined is not None:
+                rexes = [combined]
+            op = 'REGEXP'
+        else:
+            raise Exception('Unsupported database type')
+        rexprs = ['(%s %s %s)' % (name, op, self.marker) for r in rexes]
+        return (' OR '.join(rexprs), list(rexes))
 
     def db_value_is_null(self, value):
         return value is None
@@ -403,30 +743,57 @@ class SQLDatabaseHandler:
         """
         Check that a table (or a schema.table) exists and is accessible.
         """
+        if tablename in self.catalog:
+            return True
         (schema, table) = self.split_name(tablename)
         if self.dbtype in ('postgres', 'postgresql', 'mysql'):
-            if schema:
-                allsql = 'SELECT COUNT(*) FROM information_schema.tables'
-                sql = '''SELECT COUNT(*) FROM information_schema.tables
-                         WHERE table_schema = '%s'
-                         AND table_name = '%s';''' % (schema, table)
-            else:
-                #TODO: we need to pick a default schema in this case!
-                sql = '''SELECT COUNT(*) FROM information_schema.tables
-                         WHERE table_name = '%s';''' % table
+            allsql = 'SELECT COUNT(*) FROM information_schema.tables'
         elif self.dbtype == 'sqlite':
             # no schemas
             allsql = 'SELECT COUNT(*) FROM sqlite_master'
-            sql = '''SELECT COUNT(*) FROM sqlite_master
-                            WHERE (type = 'table' OR type='view')
-                            AND name = '%s';''' % tablename
         else:
             raise Exception('Unsupported database type %s' % self.dbtype)
 
         if self.execute_scalar(allsql) == 0:
             # no permission to see any tables, so wrong credentials
             raise Exception('Permission denied')
-        return self.execute_scalar(sql) > 0
+        # a table (or view) that exists has at least one column
+        return len(self.get_table_catalog(tablename)) > 0
+
+    def get_table_catalog(self, tablename):
+        """
+        Returns the names and (database) types of all of the columns
+        of a table, as an ordered dictionary, fetched in a single query.
+
+        The result is cached for the lifetime of the handler, so that
+        the catalog is only read once per table however many columns
+        are used. Tables that are not found are not cached.
+        """
+        catalog = self.catalog.get(tablename)
+        if catalog is not None:
+            return catalog
+        (schema, table) = self.split_name(tablename)
+        if self.dbtype in ('postgres', 'postgresql', 'mysql'):
+            sql = '''
+                SELECT COLUMN_NAME, DATA_TYPE FROM INFORMATION_SCHEMA.COLUMNS
+                WHERE TABLE_NAME = %s
+                ''' % self.marker
+            params = [table]
+            if schema:
+                sql += ' AND TABLE_SCHEMA = %s' % self.marker
+                params.append(schema)
+            sql += ' ORDER BY ORDINAL_POSITION'
+            rows = self.execute_all(sql, params)
+        elif self.dbtype == 'sqlite':
+            rows = [(r[1], r[2])
+                    for r in self.execute_all('PRAGMA table_info(%s)'
+                                              % tablename)]
+        else:
+            raise Exception('Unsupported database type')
+        catalog = OrderedDict((name, ctype) for (name, ctype) in rows)
+        if catalog:
+            self.catalog[tablename] = catalog
+        return catalog
 
     def get_nrows(self, tablename):
         (schema, table) = self.split_name(tablename)
@@ -437,22 +804,7 @@ class SQLDatabaseHandler:
         return self.execute_scalar(sql)
 
     def get_database_column_names(self, tablename):
-        (schema, table) = self.split_name(tablename)
-        if self.dbtype in ('postgres', 'postgresql', 'mysql'):
-            sql = '''
-                SELECT COLUMN_NAME FROM INFORMATION_SCHEMA.COLUMNS
-                WHERE TABLE_NAME = '%s'
-                AND TABLE_SCHEMA = '%s'
-                ORDER BY ORDINAL_POSITION;
-                ''' % (table, schema)
-            rows = self.execute_all(sql)
-            return [r[0] for r in rows]
-        elif self.dbtype == 'sqlite':
-            sql = 'PRAGMA table_info(%s)' % tablename
-            rows = self.execute_all(sql)
-            return [r[1] for r in rows]
-        else:
-            raise Exception('Unsupported database type')
+        return list(self.get_table_catalog(tablename).keys())
 
     def get_database_column_type(self, tablename, colname):
         typeMap = {
@@ -493,31 +845,16 @@ class SQLDatabaseHandler:
             'datetime'                   : 'date',
             None                         : None,
         }
-        (schema, table) = self.split_name(tablename)
-        if self.dbtype in ('postgres', 'postgresql', 'mysql'):
-            if schema:
-                sql = '''
-                    SELECT DATA_TYPE FROM INFORMATION_SCHEMA.COLUMNS
-                    WHERE TABLE_NAME = '%s' 
-                     AND TABLE_SCHEMA = '%s'
-                     AND COLUMN_NAME = '%s';
-                    ''' % (table, schema, colname)
-            else:
-                sql = '''
-                    SELECT DATA_TYPE FROM INFORMATION_SCHEMA.COLUMNS
-                    WHERE TABLE_NAME = '%s' 
-                     AND COLUMN_NAME = '%s';
-                    ''' % (tablename, colname)
-            typeresult = self.execute_scalar(sql)
-        elif self.dbtype == 'sqlite':
-            result = self.execute_all('PRAGMA table_info(%s)' % tablename)
-            typeresult = None
-            for row in result:
-                if row[1].lower() == colname.lower():
-                    typeresult = row[2]
+        catalog = self.get_table_catalog(tablename)
+        typeresult = catalog.get(colname)
+        if typeresult is None and self.dbtype == 'sqlite':
+            # sqlite column names are not case-sensitive
+            for (name, ctype) in catalog.items():
+                if name.lower() == colname.lower():
+                    typeresult = ctype
                     break
-        else:
-            raise Exception('Unsupported database type')
+        if typeresult is None:
+            return None
         dtype = typeMap[typeresult.lower()]
         return dtype
 
@@ -537,29 +874,15 @@ class SQLDatabaseHandler:
 
     def get_database_min(self, tablename, colname):
         ctype = self.get_database_column_type(tablename, colname)
-        if ctype == 'bool':
-            asint = self.cast_bool_to_int(self.quoted(colname))
-            expr = self.cast_int_to_bool('MIN(%s)' % asint)
-            sql = 'SELECT %s FROM %s' % (expr, tablename)
-        else:
-            sql = 'SELECT MIN(%s) FROM %s' % (self.quoted(colname), tablename)
-        result = self.execute_scalar(sql)
-        if ctype == 'date' and type(result) is str:
-            result = datetime.datetime.strptime(result, '%Y-%m-%d %H:%M:%S')
-        return result
+        sql = 'SELECT %s FROM %s' % (self.statistic_sql('min', colname, ctype),
+                                     tablename)
+        return self.statistic_value('min', self.execute_scalar(sql), ctype)
 
     def get_database_max(self, tablename, colname):
         ctype = self.get_database_column_type(tablename, colname)
-        if ctype == 'bool':
-            asint = self.cast_bool_to_int(self.quoted(colname))
-            expr = self.cast_int_to_bool('MAX(%s)' % asint)
-            sql = 'SELECT %s FROM %s' % (expr, tablename)
-        else:
-            sql = 'SELECT MAX(%s) FROM %s' % (self.quoted(colname), tablename)
-        result = self.execute_scalar(sql)
-        if ctype == 'date' and type(result) is str:
-            result = datetime.datetime.strptime(result, '%Y-%m-%d %H:%M:%S')
-        return result
+        sql = 'SELECT %s FROM %s' % (self.statistic_sql('max', colname, ctype),
+                                     tablename)
+        return self.statistic_value('max', self.execute_scalar(sql), ctype)
 
     def get_database_min_length(self, tablename, colname):
         return self.extreme_length(tablename, colname, min, 'MIN')
@@ -584,6 +907,99 @@ class SQLDatabaseHandler:
                                                      tablename)
             return self.execute_scalar(sql)
 
+    def get_database_profile(self, tablename, statistics, n_jobs=None):
+        """
+        Calculates several statistics for several columns of a table,
+        using a single aggregate query for (up to) every
+        :py:const:`PROFILE_BATCH_SIZE` columns, so that the table is
+        scanned once rather than once per statistic per column.
+
+        *statistics* is a list of (colname, ctype, names) triples, where
+        *names* lists the statistics wanted for the column, chosen from
+        ``null_count``, ``non_null_count``, ``nunique``, ``min``, ``max``,
+        ``min_length`` and ``max_length``.
+
+        If *n_jobs* is specified, and the connection has a pool, the
+        columns are split into batches which are profiled in parallel.
+
+        Returns a dictionary mapping each column name to a dictionary
+        of its statistics, keyed on their names.
+        """
+        workers = self.parallel_workers(n_jobs)
+        batch_size = PROFILE_BATCH_SIZE
+        if workers > 1:
+            # Split the columns between the workers (each batch is
+            # a separate scan of the table, on its own connection).
+            batch_size = min(batch_size,
+                             max(1, -(-len(statistics) // workers)))
+        batches = [statistics[start:start + batch_size]
+                   for start in range(0, len(statistics), batch_size)]
+
+        def profile_batch(batch):
+            exprs = []
+            keys = []
+            for (colname, ctype, names) in batch:
+                for name in names:
+                    exprs.append(self.statistic_sql(name, colname, ctype))
+                    keys.append((colname, ctype, name))
+            if not exprs:
+                return []
+            sql = 'SELECT %s FROM %s' % (', '.join(exprs), tablename)
+            return zip(keys, self.execute_all(sql,
+                                              source_params(tablename))[0])
+
+        if workers > 1 and len(batches) > 1:
+            pool = ThreadPool(min(workers, len(batches)))
+            try:
+                batch_results = pool.map(profile_batch, batches)
+            finally:
+                pool.close()
+                pool.join()
+        else:
+            batch_results = [profile_batch(batch) for batch in batches]
+
+        results = {}
+        for batch_result in batch_results:
+            for (colname, ctype, name), value in batch_result:
+                if value == '' and self.dbtype == 'sqlite':
+                    value = None
+                value = self.statistic_value(name, value, ctype)
+                results.setdefault(colname, {})[name] = value
+        return results
+
+    def statistic_sql(self, name, colname, ctype):
+        """
+        Returns the SQL aggregate expression for calculating the named
+        statistic for a column.
+        """
+        col = self.quoted(colname)
+        if name == 'null_count':
+            return 'COUNT(*) - COUNT(%s)' % col
+        elif name == 'non_null_count':
+            return 'COUNT(%s)' % col
+        elif name == 'nunique':
+            return 'COUNT(DISTINCT %s)' % col
+        elif name in ('min', 'max'):
+            if ctype == 'bool':
+                asint = self.cast_bool_to_int(col)
+                return self.cast_int_to_bool('%s(%s)' % (name.upper(), asint))
+            return '%s(%s)' % (name.upper(), col)
+        elif name in ('min_length', 'max_length'):
+            return '%s(%s)' % (name[:3].upper(), self.length_sql(colname))
+        else:
+            raise Exception('Unsupported statistic %s' % name)
+
+    def statistic_value(self, name, value, ctype):
+        """
+        Converts a statistic value returned by the database to the
+        form used for constraints.
+        """
+        if name in ('min', 'max'):
+            if ctype == 'date' and type(value) is str:
+                fmt = '%Y-%m-%d %H:%M:%S' + ('.%f' if '.' in value else '')
+                value = datetime.datetime.strptime(value, fmt)
+        return value
+
     def get_database_nunique(self, tablename, colname):
         colname = self.quoted(colname)
         sql = ('SELECT COUNT(DISTINCT %s) FROM %s WHERE %s IS NOT NULL'
@@ -598,31 +1014,17 @@ class SQLDatabaseHandler:
         orderby = ('ORDER BY %s ASC' % colname) if sorted_values else ''
         sql = 'SELECT DISTINCT %s FROM %s %s %s' % (colname, tablename,
                                                     whereclause, orderby)
-        result = self.execute_all(sql)
+        result = self.execute_all(sql, source_params(tablename))
         return [x[0] for x in result]
 
     def get_database_rex_match(self, tablename, colname, rexes):
         if rexes is None:      # a null value is not considered to be an
             return True        # active constraint, so is always satisfied
-        name = self.quoted(colname)
-        if self.dbtype in ('postgres', 'postgresql'):
-            # postgresql uses ~ syntax
-            rexprs = ["(%s ~ '%s')" % (name, r) for r in rexes]
-        elif self.dbtype == 'mysql':
-            # mysql uses REGEXP syntax, and doesn't understand \d
-            rexes = [r.replace('\\d', '[0-9]') for r in rexes]
-            rexprs = ["(%s REGEXP '%s')" % (name, r) for r in rexes]
-        elif self.dbtype == 'sqlite':
-            # sqlite doesn't support regular expressions unless the
-            # regexp() user-defined function is available - but we have
-            # arranged for that in the database_connection_mongodb function.
-            rexprs = ["(%s REGEXP '%s')" % (name, r) for r in rexes]
-        else:
-            raise Exception('Unsupported database type')
-
+        (condition, params) = self.rex_match_sql(colname, rexes)
         sql = ('SELECT COUNT(*) FROM %s WHERE %s IS NOT NULL AND NOT(%s)'
-               % (tablename, name, ' OR '.join(rexprs)))
-        return self.execute_scalar(sql) == 0
+               % (tablename, self.quoted(colname), condition))
+        return self.execute_scalar(sql, source_params(tablename)
+                                        + params) == 0
 
     def cast_bool_to_int(self, s):
         if self.dbtype == 'mysql':
@@ -643,6 +1045,19 @@ class SQLDatabaseHandler:
         return sql
 
 
+class MongoDBSample:
+    """
+    A random sample of *size* documents from a MongoDB collection,
+    used in place of a collection name.
+    """
+    def __init__(self, tablename, size):
+        self.tablename = tablename
+        self.size = size
+
+    def __str__(self):
+        return '%s (sample of %d)' % (self.tablename, self.size)
+
+
 class MongoDBDatabaseHandler:
     """
     NoSQL MonggoDB support
@@ -650,6 +1065,10 @@ class MongoDBDatabaseHandler:
     def __init__(self, dbtype, db):
         self.dbtype = dbtype
         self.db = db
+        self.type_histograms = {}
+
+    def parallel_workers(self, n_jobs):
+        return 1
 
     def find_collection(self, tablename):
         """
@@ -670,6 +1089,119 @@ class MongoDBDatabaseHandler:
         except:
             return False
 
+    def sample_source(self, tablename, sample, nrows):
+        """
+        Returns a :py:class:`MongoDBSample` (for use in place of the
+        collection name) selecting a random sample of the documents in
+        a collection, using a ``$sample`` aggregation stage.
+
+        *sample* is either a fraction of the documents (if less than 1),
+        or a number of documents; *nrows* is the number of documents in
+        the collection.
+
+        Returns ``None`` if the sample would include the whole collection.
+
+        Unlike the samples from SQL databases, these are not repeatable:
+        each query on the sample sees a different random selection.
+        """
+        size = int(round(sample * nrows)) if sample < 1 else int(sample)
+        if size >= nrows:
+            return None
+        return MongoDBSample(tablename, max(1, size))
+
+    def pipeline_source(self, tablename):
+        """
+        Returns the collection for a collection name (or sample), and the
+        aggregation pipeline stages (if any) selecting the documents
+        from it.
+        """
+        if isinstance(tablename, MongoDBSample):
+            return (self.find_collection(tablename.tablename),
+                    [{'$sample': {'size': tablename.size}}])
+        return (self.find_collection(tablename), [])
+
+    def get_database_profile(self, tablename, statistics, n_jobs=None):
+        """
+        Calculates several statistics for several fields of a collection,
+        in a single aggregation, with a ``$facet`` stage containing one
+        pipeline per field (and another per field for distinct counts).
+
+        *statistics* is a list of (colname, ctype, names) triples, where
+        *names* lists the statistics wanted for the field, chosen from
+        ``null_count``, ``non_null_count``, ``nunique``, ``min``, ``max``,
+        ``min_length``, ``max_length`` and ``types`` (the sorted list of
+        BSON type names of the field's non-null values).
+
+        The collection name can be a :py:class:`MongoDBSample`, in which
+        case the statistics are for a random sample of the documents.
+
+        Returns a dictionary mapping each field name to a dictionary
+        of its statistics, keyed on their names.
+        """
+        (collection, pipeline) = self.pipeline_source(tablename)
+        facets = {}
+        for i, (colname, ctype, names) in enumerate(statistics):
+            facets['s%d' % i] = [{'$group': self.statistics_group(colname,
+                                                                  names)}]
+            if 'nunique' in names:
+                facets['u%d' % i] = [
+                    {'$match': {colname: {'$ne': None}}},
+                    {'$group': {'_id': '$' + colname}},
+                    {'$count': 'nunique'},
+                ]
+        if not facets:
+            return {}
+        result = collection.aggregate(pipeline + [{'$facet': facets}],
+                                      allowDiskUse=True).next()
+
+        profile = {}
+        for i, (colname, ctype, names) in enumerate(statistics):
+            groups = result.get('s%d' % i)
+            group = groups[0] if groups else {}
+            stats = {}
+            for name in names:
+                if name == 'nunique':
+                    counts = result.get('u%d' % i)
+                    stats[name] = counts[0]['nunique'] if counts else 0
+                elif name in ('null_count', 'non_null_count'):
+                    stats[name] = group.get(name, 0)
+                elif name in ('min_length', 'max_length'):
+                    v = group.get(name)
+                    stats[name] = int(v) if v is not None else None
+                elif name == 'types':
+                    stats[name] = sorted(t for t in group.get(name, [])
+                                         if t not in ('missing', 'null'))
+                else:
+                    stats[name] = group.get(name)
+            profile[colname] = stats
+        return profile
+
+    def statistics_group(self, colname, names):
+        """
+        Returns the ``$group`` stage calculating the named statistics
+        (other than distinct counts) for a field.
+        """
+        field = '$' + colname
+        is_null = {'$eq': [{'$ifNull': [field, None]}, None]}
+        length = {'$cond': [{'$eq': [{'$type': field}, 'string']},
+                            {'$strLenCP': field}, None]}
+        accumulators = {
+            'null_count': {'$sum': {'$cond': [is_null, 1, 0]}},
+            'non_null_count': {'$sum': {'$cond': [is_null, 0, 1]}},
+            'min': {'$min': field},
+            'max': {'$max': field},
+            'min_length': {'$min': length},
+            'max_length': {'$max': length},
+            'types': {'$addToSet': {'$type': field}},
+        }
+        group = {'_id': None}
+        for name in names:
+            if name in accumulators:
+                group[name] = accumulators[name]
+            elif name != 'nunique':
+                raise Exception('Unsupported statistic %s' % name)
+        return group
+
     def get_database_column_names(self, tablename):
         collection = self.find_collection(tablename)
         try:
@@ -711,7 +1243,51 @@ class MongoDBDatabaseHandler:
             # the map/reduce op returns a json repr of the list of keys
             return json.loads(v)
 
+    def get_type_histogram(self, tablename):
+        """
+        Returns a dictionary mapping the name of each (top-level) field
+        found in a sample of :py:const:`TYPE_SAMPLE_SIZE` documents from
+        a collection to a dictionary of the number of (non-null) values
+        of each TDDA type in the sample.
+
+        The histogram is calculated in a single aggregation, and cached
+        for the lifetime of the handler.
+        """
+        histogram = self.type_histograms.get(tablename)
+        if histogram is not None:
+            return histogram
+        collection = self.find_collection(tablename)
+        agg = collection.aggregate([
+            {'$sample': {'size': TYPE_SAMPLE_SIZE}},
+            {'$project': {'kv': {'$objectToArray': '$$ROOT'}}},
+            {'$unwind': '$kv'},
+            {'$group': {'_id': {'k': '$kv.k', 't': {'$type': '$kv.v'}},
+                        'n': {'$sum': 1}}},
+        ], allowDiskUse=True)
+        histogram = {}
+        for row in agg:
+            name = row['_id']['k']
+            counts = histogram.setdefault(name, {})
+            bsontype = row['_id']['t']
+            if bsontype == 'null':
+                continue
+            ctype = MONGODB_TYPES.get(bsontype, 'other')
+            counts[ctype] = counts.get(ctype, 0) + row['n']
+        self.type_histograms[tablename] = histogram
+        return histogram
+
     def get_database_column_type(self, tablename, colname):
+        counts = self.get_type_histogram(tablename).get(colname)
+        if not counts:
+            # not in the sample (or only ever null there, or a nested
+            # field), so use the first document that has a value
+            return self.first_value_type(tablename, colname)
+        if set(counts.keys()) == set(['int', 'real']):
+            # integer values in a real field are common in MongoDB
+            return 'real'
+        return max(sorted(counts.keys()), key=lambda t: counts[t])
+
+    def first_value_type(self, tablename, colname):
         collection = self.find_collection(tablename)
         doc = collection.find_one({colname: {'$ne': None}})
         if doc:
@@ -756,9 +1332,14 @@ class MongoDBDatabaseHandler:
 
     def get_database_unique_values(self, tablename, colname,
                                    sorted_values=True, include_nulls=False):
-        collection = self.find_collection(tablename)
+        (collection, pipeline) = self.pipeline_source(tablename)
         try:
-            values = collection.distinct(colname, allowDiskUse=True)
+            if pipeline:
+                values = [d['_id'] for d in collection.aggregate(
+                    pipeline + [{'$group': {'_id': '$' + colname}}],
+                    allowDiskUse=True)]
+            else:
+                values = collection.distinct(colname, allowDiskUse=True)
         except:
             # pymongo.errors.OperationFailure: distinct too big, 16mb cap
             # (there appears to be no workaround, so just don't include
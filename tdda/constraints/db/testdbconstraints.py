@@ -15,15 +15,19 @@ The tests will run on Postgres and MySQL, provided that:
     the schema name for where the test data has been imported, and the
     user/password credentials.
 
-The tests don't (yet) run on MongoDB.
+The only tests that run on MongoDB are those for the aggregation
+profiler, which use mongomock (if it is available).
 """
 
 from __future__ import division
 from __future__ import print_function
 from __future__ import absolute_import
 
+import datetime
 import json
 import os
+import shutil
+import tempfile
 import unittest
 
 try:
@@ -46,12 +50,21 @@ try:
 except ImportError:
     pymongo = None
 
+try:
+    import mongomock
+except ImportError:
+    mongomock = None
+
 
 from tdda.referencetest.referencetestcase import ReferenceTestCase, tag
 
-from tdda.constraints.db.drivers import database_connection, DatabaseHandler
+from tdda.constraints.db.drivers import (database_connection, DatabaseHandler,
+                                         compiled_regex, regex_matcher)
 from tdda.constraints.db.constraints import (verify_db_table,
-                                             discover_db_table)
+                                             verify_db_tables,
+                                             detect_db_table,
+                                             discover_db_table,
+                                             widen)
 
 THIS_DIR = os.path.dirname(os.path.abspath(__file__))
 TESTDATA_DIR = os.path.join(os.path.dirname(THIS_DIR), 'testdata')
@@ -72,6 +85,19 @@ class TestDatabaseHandlers:
         self.assertTrue(self.dbh.check_table_exists(elements))
         self.assertFalse(self.dbh.check_table_exists('does_not_exist'))
 
+    def test_catalog_cache(self):
+        elements = self.dbh.resolve_table('elements')
+        self.assertEqual(self.dbh.get_database_column_type(elements, 'Z'),
+                         'int')
+        catalog = self.dbh.get_table_catalog(elements)
+        self.assertIs(self.dbh.catalog[elements], catalog)
+        self.assertEqual(list(catalog.keys()),
+                         self.dbh.get_database_column_names(elements))
+        self.assertIsNone(self.dbh.get_database_column_type(elements,
+                                                            'NoSuchColumn'))
+        self.assertFalse(self.dbh.check_table_exists('does_not_exist'))
+        self.assertNotIn('does_not_exist', self.dbh.catalog)
+
     def test_handler_simple_ops(self):
         elements = self.dbh.resolve_table('elements')
         names = self.dbh.get_database_column_names(elements)
@@ -95,6 +121,30 @@ class TestDatabaseHandlers:
         self.assertEqual(self.dbh.get_database_nnonnull(elements, 'Colour'),
                          33)
 
+    def test_handler_profile(self):
+        elements = self.dbh.resolve_table('elements')
+        names = ['null_count', 'non_null_count', 'nunique', 'min', 'max']
+        lengths = ['null_count', 'min_length', 'max_length']
+        profile = self.dbh.get_database_profile(elements, [
+            ('Z', 'int', names),
+            ('Density', 'real', names[:2] + names[3:]),
+            ('Colour', 'string', lengths),
+        ])
+        self.assertEqual(profile['Z'], {'null_count': 0,
+                                        'non_null_count': 118,
+                                        'nunique': 118,
+                                        'min': 1, 'max': 118})
+        self.assertEqual(profile['Density']['null_count'],
+                         self.dbh.get_database_nnull(elements, 'Density'))
+        self.assertEqual(profile['Density']['max'],
+                         self.dbh.get_database_max(elements, 'Density'))
+        self.assertEqual(profile['Colour'],
+                         {'null_count': 85,
+                          'min_length': self.dbh.get_database_min_length(
+                              elements, 'Colour'),
+                          'max_length': self.dbh.get_database_max_length(
+                              elements, 'Colour')})
+
     def test_handler_unique_values(self):
         elements = self.dbh.resolve_table('elements')
         self.assertEqual(self.dbh.get_database_unique_values(elements,
@@ -142,6 +192,302 @@ class TestSQLiteDatabaseConnectionFile(unittest.TestCase):
         self.assertFalse(dbh.check_table_exists('does_not_exist'))
 
 
+@unittest.skipIf(mongomock is None, 'mongomock not available')
+class TestMongoDBProfile(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        db = mongomock.MongoClient().tdda
+        db.elements.insert_many([
+            {'Z': 1, 'Name': 'Hydrogen', 'Density': 8.988e-05},
+            {'Z': 2, 'Name': 'Helium', 'Density': None},
+            {'Z': 3, 'Name': 'Lithium'},
+            {'Z': 4, 'Name': 'Beryllium', 'Density': 2},
+            {'Z': 5, 'Name': 'Helium', 'Density': 2.34},
+        ])
+        cls.dbh = DatabaseHandler('mongodb', db)
+
+    def test_profile(self):
+        profile = self.dbh.get_database_profile('elements', [
+            ('Z', 'int', ['null_count', 'non_null_count', 'nunique',
+                          'min', 'max']),
+            ('Name', 'string', ['nunique', 'min_length', 'max_length']),
+            ('Density', 'real', ['null_count', 'non_null_count', 'max']),
+        ])
+        self.assertEqual(profile['Z'], {'null_count': 0,
+                                        'non_null_count': 5, 'nunique': 5,
+                                        'min': 1, 'max': 5})
+        self.assertEqual(profile['Name'], {'nunique': 4, 'min_length': 6,
+                                           'max_length': 9})
+        self.assertEqual(profile['Density'], {'null_count': 2,
+                                              'non_null_count': 3,
+                                              'max': 2.34})
+
+    def test_column_types(self):
+        histogram = self.dbh.get_type_histogram('elements')
+        self.assertIs(self.dbh.type_histograms['elements'], histogram)
+        self.assertEqual(histogram['Z'], {'int': 5})
+        self.assertEqual(histogram['Density'], {'int': 1, 'real': 2})
+        self.assertEqual(self.dbh.get_database_column_type('elements', 'Z'),
+                         'int')
+        self.assertEqual(self.dbh.get_database_column_type('elements',
+                                                           'Name'),
+                         'string')
+        self.assertEqual(self.dbh.get_database_column_type('elements',
+                                                           'Density'),
+                         'real')
+        self.assertIsNone(self.dbh.get_database_column_type('elements',
+                                                            'Colour'))
+
+    def test_sampled_profile(self):
+        sample = self.dbh.sample_source('elements', 3, 5)
+        profile = self.dbh.get_database_profile(sample, [
+            ('Z', 'int', ['null_count', 'non_null_count']),
+        ])
+        self.assertEqual(profile['Z'], {'null_count': 0,
+                                        'non_null_count': 3})
+        self.assertIsNone(self.dbh.sample_source('elements', 5, 5))
+
+
+@unittest.skipIf(sqlite3 is None, 'sqlite3 not available')
+class TestSQLiteRegexp(unittest.TestCase):
+    def test_regex_matcher(self):
+        self.assertIs(compiled_regex(r'^[A-Z][a-z]*$'),
+                      compiled_regex(r'^[A-Z][a-z]*$'))
+        self.assertTrue(regex_matcher(r'[A-Z]', 'He'))
+        self.assertFalse(regex_matcher(r'[a-z]', 'He'))
+        self.assertFalse(regex_matcher(r'.*', None))
+
+    def test_combined_rex_match(self):
+        dbfile = os.path.join(TESTDATA_DIR, 'example.db')
+        db = database_connection(dbtype='sqlite', db=dbfile)
+        dbh = DatabaseHandler('sqlite', db)
+        rexes = [r'^[A-Z]$', r'^[A-Z][a-z]$']
+        self.assertEqual(dbh.rex_match_sql('Symbol', rexes)[0].count('REGEXP'),
+                         1)
+        self.assertTrue(dbh.get_database_rex_match('elements', 'Symbol',
+                                                   rexes + [r'^Uu[a-z]$']))
+        self.assertFalse(dbh.get_database_rex_match('elements', 'Symbol',
+                                                    rexes))
+
+        # regular expressions are passed as parameters, so can contain
+        # anything, including quotes
+        self.assertTrue(dbh.get_database_rex_match('elements', 'Name',
+                                                   [r"^[^'%?]+$"]))
+
+        # backreferences can't be combined, so are matched separately
+        rexes = [r'^([A-Z])\1?$', r'^[A-Z][a-z]+$']
+        self.assertEqual(dbh.rex_match_sql('Symbol', rexes)[0].count('REGEXP'),
+                         2)
+        self.assertTrue(dbh.get_database_rex_match('elements', 'Symbol',
+                                                   rexes))
+
+
+@unittest.skipIf(sqlite3 is None, 'sqlite3 not available')
+class TestSQLiteConnectionPool(unittest.TestCase):
+    def test_parallel_verify_and_discover(self):
+        dbfile = os.path.join(TESTDATA_DIR, 'example.db')
+        db = database_connection(dbtype='sqlite', db=dbfile, pool_size=4,
+                                 shared=True)
+        self.assertIs(database_connection(dbtype='sqlite', db=dbfile,
+                                          pool_size=4, shared=True), db)
+        constraints_file = os.path.join(TESTDATA_DIR, 'elements92.tdda')
+        # with one connection in use elsewhere, the queries must open more
+        held = db.pool.acquire()
+        try:
+            result = verify_db_table('sqlite', db, 'elements',
+                                     constraints_file, testing=True, n_jobs=4)
+        finally:
+            db.pool.release(held)
+        self.assertEqual(result.passes, 57)
+        self.assertEqual(result.failures, 15)
+        self.assertTrue(1 < db.pool.nopen <= 4)
+
+        serial_db = database_connection(dbtype='sqlite', db=dbfile)
+        serial = discover_db_table('sqlite', serial_db, 'elements')
+        parallel = discover_db_table('sqlite', db, 'elements', n_jobs=4)
+        self.assertEqual(parallel.to_dict()['fields'],
+                         serial.to_dict()['fields'])
+
+    def test_verify_tables(self):
+        dbfile = os.path.join(TESTDATA_DIR, 'example.db')
+        db = database_connection(dbtype='sqlite', db=dbfile, pool_size=2,
+                                 shared=True)
+        constraints_file = os.path.join(TESTDATA_DIR, 'elements92.tdda')
+        tables = [('elements', constraints_file),
+                  ('nosuchtable', constraints_file)]
+        result = verify_db_tables('sqlite', db, tables, testing=True,
+                                  n_jobs=2)
+        self.assertEqual(result.passes, 57)
+        self.assertEqual(result.failures, 15)
+        self.assertEqual(list(result.tables.keys()),
+                         ['elements', 'nosuchtable'])
+        self.assertEqual(result.tables['elements'].failures, 15)
+        self.assertIsNone(result.tables['nosuchtable'])
+        self.assertEqual(result.errors, {'nosuchtable': 'No table nosuchtable'})
+        self.assertTrue(str(result).endswith('Tables passing: 0\n'
+                                             'Tables failing: 2\n'
+                                             'Constraints passing: 57\n'
+                                             'Constraints failing: 15'))
+
+        # a database error (here, from an invalid regular expression)
+        # is reported as an error for the table being verified
+        tmpdir = tempfile.mkdtemp()
+        try:
+            bad_file = os.path.join(tmpdir, 'bad_rex.tdda')
+            with open(bad_file, 'w') as f:
+                json.dump({'fields': {'Name': {'rex': ['[']}}}, f)
+            result = verify_db_tables('sqlite', db,
+                                      [('elements', bad_file),
+                                       ('nosuchtable', constraints_file)],
+                                      testing=True)
+        finally:
+            shutil.rmtree(tmpdir)
+        self.assertIsNone(result.tables['elements'])
+        self.assertEqual(sorted(result.errors.keys()),
+                         ['elements', 'nosuchtable'])
+
+
+@unittest.skipIf(sqlite3 is None, 'sqlite3 not available')
+class TestSQLiteSampledDiscovery(unittest.TestCase):
+    def test_widen(self):
+        self.assertEqual(widen(1, 10, 'int'), (1, 11))
+        self.assertEqual(widen(0, 10, 'int'), (0, 11))
+        self.assertEqual(widen(-10, -1, 'int'), (-11, -1))
+        self.assertEqual(widen(-5.0, 5.0, 'real'), (-6.0, 6.0))
+        self.assertEqual(widen(False, True, 'bool'), (False, True))
+
+    def test_discover_sample(self):
+        dbfile = os.path.join(TESTDATA_DIR, 'example.db')
+        db = database_connection(dbtype='sqlite', db=dbfile)
+        exact = discover_db_table('sqlite', db, 'elements').to_dict()
+        sampled = discover_db_table('sqlite', db, 'elements',
+                                    sample=40).to_dict()
+        metadata = sampled['creation_metadata']
+        self.assertEqual(metadata['n_records'], 118)
+        self.assertEqual(metadata['n_selected'], 40)
+        self.assertEqual(sampled['fields']['Z'],
+                         {'type': 'int', 'min': 1, 'max': 129,
+                          'sign': 'positive', 'max_nulls': 0,
+                          'no_duplicates': True})
+
+        # constraints the sample cannot determine are checked exactly
+        for name, field in exact['fields'].items():
+            for kind in ('type', 'max_nulls', 'no_duplicates',
+                         'allowed_values'):
+                self.assertEqual(sampled['fields'][name].get(kind),
+                                 field.get(kind))
+
+        # a sample of the whole table is the same as no sample
+        whole = discover_db_table('sqlite', db, 'elements', sample=1000)
+        self.assertEqual(whole.to_dict()['fields'], exact['fields'])
+
+    def test_discover_sample_rare_category(self):
+        tmpdir = tempfile.mkdtemp()
+        try:
+            db = database_connection(dbtype='sqlite',
+                                     db=os.path.join(tmpdir, 'cats.db'))
+            db.connection.execute('CREATE TABLE cats (cat TEXT)')
+            db.connection.executemany('INSERT INTO cats VALUES (?)',
+                                      [('abcde'[i % 5],)
+                                       for i in range(19999)] + [('RARE',)])
+            db.connection.commit()
+            constraints = discover_db_table('sqlite', db, 'cats',
+                                            sample=0.01)
+            field = constraints.to_dict()['fields']['cat']
+            self.assertEqual(sorted(field['allowed_values']),
+                             ['RARE', 'a', 'b', 'c', 'd', 'e'])
+            self.assertEqual((field['min_length'], field['max_length']),
+                             (1, 4))
+
+            constraints_file = os.path.join(tmpdir, 'cats.tdda')
+            with open(constraints_file, 'w') as f:
+                f.write(constraints.to_json())
+            result = verify_db_table('sqlite', db, 'cats', constraints_file,
+                                     testing=True)
+            self.assertEqual(result.failures, 0)
+            db.connection.close()
+        finally:
+            shutil.rmtree(tmpdir)
+
+
+@unittest.skipIf(sqlite3 is None, 'sqlite3 not available')
+class TestSQLiteIncrementalVerification(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        dbfile = os.path.join(self.tmpdir, 'example.db')
+        shutil.copy(os.path.join(TESTDATA_DIR, 'example.db'), dbfile)
+        self.db = database_connection(dbtype='sqlite', db=dbfile)
+        self.append('CREATE TABLE growing AS '
+                    'SELECT * FROM elements WHERE "Z" <= 92')
+
+    def tearDown(self):
+        self.db.connection.close()
+        shutil.rmtree(self.tmpdir)
+
+    def append(self, sql):
+        self.db.connection.execute(sql)
+        self.db.connection.commit()
+
+    def test_verify_incremental(self):
+        constraints_file = os.path.join(TESTDATA_DIR, 'elements92.tdda')
+        state_path = os.path.join(self.tmpdir, 'elements92.tdda.state')
+        appends = [
+            None,
+            'INSERT INTO growing SELECT * FROM elements '
+            'WHERE "Z" > 92 AND "Z" <= 100',
+            'INSERT INTO growing SELECT * FROM elements WHERE "Z" > 100',
+            # a duplicate of a name below the watermark
+            'INSERT INTO growing ("Z", "Name", "Symbol") '
+            'VALUES (119, \'Hydrogen\', \'Uue\')',
+        ]
+        for sql in appends:
+            if sql:
+                self.append(sql)
+            full = verify_db_table('sqlite', self.db, 'growing',
+                                   constraints_file, testing=True)
+            incremental = verify_db_table('sqlite', self.db, 'growing',
+                                          constraints_file, testing=True,
+                                          watermark='Z',
+                                          state_path=state_path)
+            self.assertEqual(str(incremental), str(full))
+        self.assertEqual(full.failures, 18)
+        with open(state_path) as f:
+            state = json.load(f)
+        self.assertEqual(state['watermark'], 119)
+        self.assertTrue(state['fields']['Name']['duplicates'])
+
+    def test_verify_incremental_subsecond_watermark(self):
+        constraints_file = os.path.join(self.tmpdir, 'events.tdda')
+        with open(constraints_file, 'w') as f:
+            json.dump({'fields': {
+                'ts': {'type': 'date'},
+                'v': {'type': 'int', 'max_nulls': 0, 'no_duplicates': True},
+            }}, f)
+        state_path = constraints_file + '.state'
+        self.append('CREATE TABLE events (ts TIMESTAMP, v INTEGER)')
+        t = datetime.datetime(2020, 1, 1, 10, 0, 0)
+        for i in range(1, 7):
+            # two rows in each second, the second ones at the second
+            self.db.connection.execute(
+                'INSERT INTO events VALUES (?, ?)',
+                (t + datetime.timedelta(microseconds=500000 * i), i))
+            self.db.connection.commit()
+            full = verify_db_table('sqlite', self.db, 'events',
+                                   constraints_file, testing=True)
+            incremental = verify_db_table('sqlite', self.db, 'events',
+                                          constraints_file, testing=True,
+                                          watermark='ts',
+                                          state_path=state_path)
+            self.assertEqual(str(incremental), str(full))
+            self.assertEqual(full.failures, 0)
+        with open(state_path) as f:
+            state = json.load(f)
+        self.assertEqual(state['fields']['v']['non_null_count'], 6)
+        self.assertFalse(state['fields']['v']['duplicates'])
+        self.assertEqual(state['watermark'],
+                         {'datetime': '2020-01-01 10:00:03.000000'})
+
+
 class TestDatabaseConstraintVerifiers:
     """
     Mix-in class, to be used in a subclass that also inherits ReferenceTestCase
@@ -184,6 +530,24 @@ class TestDatabaseConstraintVerifiers:
             for name, value in field.items():
                 self.assertEqual(type(value), bool)
 
+    def test_detect_elements(self):
+        # the failing records should be the same as those detected by
+        # pandas on the corresponding CSV file
+        constraints_file = os.path.join(TESTDATA_DIR, 'elements92.tdda')
+        outpath = os.path.join(tempfile.gettempdir(), 'dbdetect.csv')
+        elements = self.dbh.resolve_table('elements')
+        result = detect_db_table(self.dbh.dbtype, self.db, elements,
+                                 constraints_file, testing=True,
+                                 outpath=outpath, per_constraint=True,
+                                 output_fields=['Z'], index=True)
+        self.assertEqual(result.passes, 57)
+        self.assertEqual(result.failures, 15)
+        self.assertEqual(result.detection.n_passing_records, 91)
+        self.assertEqual(result.detection.n_failing_records, 27)
+        self.assertIsNone(result.detected())
+        self.assertTextFileCorrect(outpath,
+                                   'elements118_detect_from_csv.csv')
+
 
 @unittest.skipIf(sqlite3 is None, 'sqlite3 not available')
 class TestSQLiteDBConstraintVerifiers(ReferenceTestCase,
@@ -270,6 +634,7 @@ class TestMySQLDBConstraintDiscoverers(ReferenceTestCase,
         cls.dbh = DatabaseHandler('mysql', cls.db)
 
 
+TestSQLiteDBConstraintVerifiers.set_default_data_location(TESTDATA_DIR)
 TestSQLiteDBConstraintDiscoverers.set_default_data_location(TESTDATA_DIR)
 TestPostgresDBConstraintDiscoverers.set_default_data_location(TESTDATA_DIR)
 TestMySQLDBConstraintDiscoverers.set_default_data_location(TESTDATA_DIR)
@@ -20,15 +20,43 @@ Parameters:
 
   * constraints.tdda is a JSON .tdda file constaining constraints.
 
+Additional optional flags are:
+
+  * --jobs N
+      Run up to N database queries in parallel, each on its own
+      connection.
+
+  * --manifest manifest.json
+      Verify all of the tables listed in a JSON manifest file (instead
+      of a single table), producing a single consolidated report.
+      The manifest contains a list of tables, each of the form
+          {"table": "schema.table", "constraints": "table.tdda"}
+      (constraints paths are relative to the manifest; if a table's
+      constraints are not given, they are read from table.tdda).
+      With --jobs, up to N tables are verified concurrently.
+
+  * --watermark COLUMN
+      Verify an append-only table incrementally. COLUMN is a column
+      whose values increase as rows are appended (such as a sequence
+      number or load timestamp). Statistics for the table are saved
+      in a state file (constraints.tdda.state), and subsequent runs
+      read only the rows added since, merging them into the saved
+      statistics.
+
+  * --state state.json
+      Use the state file given for incremental verification
+      (with --watermark), rather than the default.
+
 '''
 
 import argparse
+import json
 import os
 import sys
 
 from tdda import __version__
 from tdda.constraints.flags import verify_parser, verify_flags
-from tdda.constraints.db.constraints import verify_db_table
+from tdda.constraints.db.constraints import verify_db_table, verify_db_tables
 from tdda.constraints.db.drivers import (database_connection, parse_table_name,
                                          database_arg_parser,
                                          database_arg_flags)
@@ -47,19 +75,105 @@ def verify_database_table_from_file(table, constraints_path,
     (table, dbtype) = parse_table_name(table, dbtype)
     db = database_connection(table=table, conn=conn, dbtype=dbtype, db=db,
                              host=host, port=port,
-                             user=user, password=password)
+                             user=user, password=password,
+                             pool_size=kwargs.get('n_jobs'))
     print(verify_db_table(dbtype, db, table, constraints_path, **kwargs))
 
 
+def verify_database_tables_from_manifest(manifest_path,
+                                         conn=None, dbtype=None, db=None,
+                                         host=None, port=None, user=None,
+                                         password=None, **kwargs):
+    """
+    Verify all of the database tables listed in the manifest file
+    specified, each against its own .tdda file, over a single (pooled)
+    database connection.
+
+    Prints the consolidated results to stdout.
+    """
+    tables = read_manifest(manifest_path)
+    if not tables:
+        print('No tables in manifest %s' % manifest_path, file=sys.stderr)
+        sys.exit(1)
+    dbtypes = set(parse_table_name(table, dbtype)[1]
+                  for (table, path) in tables)
+    if len(dbtypes) > 1:
+        print('All tables in a manifest must be in the same database',
+              file=sys.stderr)
+        sys.exit(1)
+    dbtype = dbtypes.pop()
+    tables = [(parse_table_name(table, dbtype)[0], path)
+              for (table, path) in tables]
+    db = database_connection(conn=conn, dbtype=dbtype, db=db,
+                             host=host, port=port,
+                             user=user, password=password,
+                             pool_size=kwargs.get('n_jobs'), shared=True)
+    print(verify_db_tables(dbtype, db, tables, **kwargs))
+
+
+def read_manifest(path):
+    """
+    Read a JSON manifest file, returning a list of (table, constraints_path)
+    pairs, with constraints paths relative to the manifest's directory.
+
+    The manifest is either a list of tables, or an object with a
+    ``tables`` key containing the list. Each table is either a name
+    or an object with a ``table`` key and an optional ``constraints`` key.
+    """
+    with open(path) as f:
+        manifest = json.load(f)
+    if isinstance(manifest, dict):
+        manifest = manifest.get('tables', [])
+    dirname = os.path.dirname(path)
+    tables = []
+    for item in manifest:
+        if not isinstance(item, dict):
+            item = {'table': item}
+        table = item['table']
+        constraints = item.get('constraints')
+        if constraints is None:
+            constraints = table.split(':')[-1] + '.tdda'
+        tables.append((table, os.path.join(dirname, constraints)))
+    return tables
+
+
 def get_verify_params(args):
     parser = database_arg_parser(verify_parser, USAGE)
-    parser.add_argument('table', nargs=1, help='database table name')
+    parser.add_argument('table', nargs='?', help='database table name')
+    parser.add_argument('-j', '--jobs', type=int,
+                        help='number of database queries to run in parallel')
+    parser.add_argument('-m', '--manifest',
+                        help='manifest of tables and constraints to verify')
+    parser.add_argument('-w', '--watermark',
+                        help='column for incremental verification of '
+                             'an append-only table')
+    parser.add_argument('--state',
+                        help='state file for incremental verification')
     parser.add_argument('constraints', nargs='?',
                         help='constraints file to verify against')
     params = {}
     flags = database_arg_flags(verify_flags, parser, args, params)
-    params['table'] = flags.table[0] if flags.table else None
-    params['constraints_path'] = flags.constraints
+    if flags.manifest:
+        params['manifest_path'] = flags.manifest
+        if flags.watermark:
+            print('Incremental verification is not available with a '
+                  'manifest', file=sys.stderr)
+            sys.exit(1)
+        if flags.table:
+            print('A table cannot be specified with a manifest',
+                  file=sys.stderr)
+            sys.exit(1)
+    else:
+        if not flags.table:
+            print(parser.epilog, file=sys.stderr)
+            sys.exit(1)
+        params['table'] = flags.table
+        params['constraints_path'] = flags.constraints
+        if flags.watermark:
+            params['watermark'] = flags.watermark
+            params['state_path'] = flags.state
+    if flags.jobs is not None:
+        params['n_jobs'] = flags.jobs
     return params
 
 
@@ -70,7 +184,10 @@ class DatabaseVerifier:
 
     def verify(self):
         params = get_verify_params(self.argv[1:])
-        verify_database_table_from_file(**params)
+        if 'manifest_path' in params:
+            verify_database_tables_from_manifest(**params)
+        else:
+            verify_database_table_from_file(**params)
 
 
 def main(argv):
@@ -301,6 +301,15 @@ class BaseConstraintCalculator:
         """
         raise NotImplementedError('nunique')
 
+    def calc_distinct_sketch(self, colname):
+        """
+        Calculates a :py:class:`~tdda.constraints.baseconstraints.HyperLogLog`
+        sketch of the distinct non-null values in a column, for
+        approximate-distinct discovery, or returns ``None`` if sketches
+        are not supported (in which case exact counts are used).
+        """
+        return None
+
     def calc_unique_values(self, colname, include_nulls=True):
         """
         Calculates the set of unique values (including or excluding nulls)
@@ -327,6 +336,54 @@ class BaseConstraintCalculator:
         """
         raise NotImplementedError('all_non_nulls_boolean')
 
+    def calc_field_profile(self, colname, type_, distinct=True,
+                           max_uniques=None):
+        """
+        Calculates all of the statistics for a column (of the given
+        TDDA type) that are needed for constraint discovery, returning
+        them as a dictionary keyed on the name of the statistic.
+
+        The keys used are:
+
+            - ``null_count`` and ``non_null_count`` (always present)
+            - ``nunique`` (for string and int columns)
+            - ``uniques`` (for string columns, only when there are
+              no more than *max_uniques* distinct values, if that is
+              specified)
+            - ``min_length`` and ``max_length`` (for string columns
+              with non-null values)
+            - ``min`` and ``max`` (for non-string columns with non-null
+              values)
+
+        If *distinct* is ``False``, ``nunique`` and ``uniques`` are
+        omitted (because the caller has an approximate count that is
+        good enough).
+
+        This default implementation just calls the individual ``calc_``
+        methods, one statistic at a time. Implementations that can
+        compute the statistics more efficiently together (for example,
+        in a single pass over the data) should override it.
+        """
+        nNonNull = self.calc_non_null_count(colname)
+        profile = {
+            'null_count': self.calc_null_count(colname),
+            'non_null_count': nNonNull,
+        }
+        if type_ in ('string', 'int') and distinct:
+            profile['nunique'] = self.calc_nunique(colname)
+        if type_ == 'string':
+            if distinct and (max_uniques is None
+                             or profile['nunique'] <= max_uniques):
+                profile['uniques'] = self.calc_unique_values(
+                    colname, include_nulls=False)
+            if nNonNull > 0:
+                profile['min_length'] = self.calc_min_length(colname)
+                profile['max_length'] = self.calc_max_length(colname)
+        elif nNonNull > 0:
+            profile['min'] = self.calc_min(colname)
+            profile['max'] = self.calc_max(colname)
+        return profile
+
     def find_rexes(self, colname, values=None):
         """
         Generate a list of regular expressions that cover all of
@@ -16,20 +16,30 @@ The top-level functions are:
         Verify (check) a Pandas DataFrame, against a set of previously
         discovered constraints.
 
+    :py:func:`verify_csv_chunked`:
+        Verify (check) a CSV file, reading it in chunks, against a set of
+        previously discovered constraints.
+
     :py:func:`detect_df`:
         Verify (check) a Pandas DataFrame, against a set of previously
         discovered constraints, and generate an output dataset containing
         information about input rows which failed any of the constraints.
 
+    :py:func:`detect_csv_chunked`:
+        Like :py:func:`detect_df`, but for a CSV file, read and checked in
+        chunks, with failing records written as each chunk is checked.
+
 """
 from __future__ import division
 from __future__ import print_function
 from __future__ import absolute_import
 
 import datetime
+import itertools
 import os
 import re
 import sys
+import threading
 
 from collections import OrderedDict
 
@@ -41,6 +51,11 @@ except ImportError:
 import pandas as pd
 import numpy as np
 
+try:
+    from pandas.arrays import BooleanArray
+except ImportError:
+    BooleanArray = None     # nullable booleans need Pandas 1.0 or later
+
 try:
     from pmmif import featherpmm
 except ImportError:
@@ -52,6 +67,8 @@ except ImportError:
 
 from tdda.constraints.base import (
     STANDARD_FIELD_CONSTRAINTS,
+    verify,
+    combine_rexes,
     native_definite,
     DatasetConstraints,
     Verification,
@@ -63,11 +80,13 @@ from tdda.constraints.baseconstraints import (
     BaseConstraintDetector,
     BaseConstraintVerifier,
     BaseConstraintDiscoverer,
-    MAX_CATEGORIES,
+    HyperLogLog,
+    MAX_CATEGORIES, HLL_PRECISION, DETECTION_FIELD_SUFFIXES,
     unicode_string, byte_string, long_type
 )
 
 from tdda.referencetest.checkpandas import (default_csv_loader,
+                                            default_csv_chunk_loader,
                                             default_csv_writer)
 from tdda import rexpy
 
@@ -81,6 +100,23 @@ isPy3 = sys.version_info[0] >= 3
 
 DEBUG = False
 
+DEFAULT_CHUNK_SIZE = 100000     # Number of records read at a time when
+                                # verifying CSV files in chunks
+
+REX_BLOCK_SIZE = 10000          # Number of distinct strings matched at a
+                                # time when verifying rex constraints
+
+UNIQUE_BLOCK_SIZE = 1000        # Number of records in the first block
+                                # examined when collecting a bounded number
+                                # of distinct values (blocks then double)
+
+MAX_VALUE_VIOLATIONS = 20       # Number of distinct values outside an
+                                # allowed_values constraint kept when
+                                # verifying CSV files in chunks
+
+DEFAULT_STATISTICS_CACHE_BYTES = 64 * 1024 * 1024   # Default memory cap for
+                                                    # a PandasStatisticsCache
+
 
 class PandasConstraintCalculator(BaseConstraintCalculator):
     """
@@ -110,22 +146,14 @@ class PandasConstraintCalculator(BaseConstraintCalculator):
             m = self.df[colname].dropna().min()  # Otherwise -inf!
         else:
             m = self.df[colname].min()
-        if pandas_tdda_type(m) == 'date':
-            m = m.to_pydatetime(warn=False)
-        elif hasattr(m, 'item'):
-            m = m.item()
-        return m
+        return pandas_native_value(m)
 
     def calc_max(self, colname):
         if self.df[colname].dtype == np.dtype('O'):
             M = self.df[colname].dropna().max()
         else:
             M = self.df[colname].max()
-        if pandas_tdda_type(M) == 'date':
-            M = M.to_pydatetime(warn=False)
-        elif hasattr(M, 'item'):
-            M = M.item()
-        return M
+        return pandas_native_value(M)
 
     def calc_min_length(self, colname):
         if isPy3:
@@ -169,6 +197,52 @@ class PandasConstraintCalculator(BaseConstraintCalculator):
         nn = self.df[colname].dropna()
         return all([type(v) is bool for i, v in nn.iteritems()])
 
+    def calc_field_profile(self, colname, type_, distinct=True,
+                           max_uniques=None):
+        # All of the statistics are computed from a single pass to
+        # find the non-null values, and (for strings and ints) a single
+        # hash-based pass to find the distinct values, rather than
+        # rescanning the whole column for each statistic separately.
+        # String lengths are computed over the column, so that the
+        # distinct values only need to be collected (and sorted) when
+        # there are few enough of them to be wanted. Beyond that, all
+        # that matters is whether the values are all distinct (for a
+        # no_duplicates constraint), so nunique is then only a lower
+        # bound unless they are.
+        c = self.df[colname]
+        nNonNull = int(c.count())
+        values = c if nNonNull == len(c) else c.dropna()
+        profile = {
+            'null_count': int(len(c) - nNonNull),
+            'non_null_count': nNonNull,
+        }
+        if type_ == 'string':
+            if nNonNull > 0:
+                L = string_lengths(values).dropna()
+                if len(L) > 0:
+                    profile['min_length'] = int(L.min())
+                    profile['max_length'] = int(L.max())
+                del L
+            if distinct:
+                limit = None if max_uniques is None else max_uniques + 1
+                uniqs = bounded_unique_values(values, limit)
+                if max_uniques is None or len(uniqs) <= max_uniques:
+                    profile['nunique'] = len(uniqs)
+                    profile['uniques'] = sorted(uniqs)
+                elif all_distinct(values):
+                    profile['nunique'] = nNonNull
+                else:
+                    profile['nunique'] = len(uniqs)
+        elif type_ == 'int' and distinct:
+            profile['nunique'] = len(values.unique())
+        if type_ != 'string' and nNonNull > 0:
+            profile['min'] = pandas_native_value(values.min())
+            profile['max'] = pandas_native_value(values.max())
+        return profile
+
+    def calc_distinct_sketch(self, colname):
+        return pandas_distinct_sketch(self.df[colname].dropna())
+
     def allowed_values_exclusions(self):
         # remarkably, Pandas returns various kinds of nulls as
         # unique values, despite not counting them with .nunique()
@@ -186,6 +260,38 @@ class PandasConstraintCalculator(BaseConstraintCalculator):
         if rexes is None:      # a null value is not considered
             return None        # to be an active constraint,
                                # so is always satisfied
+        combined = combine_rexes(rexes)
+        if combined is None:
+            return self.calc_rex_constraint_unvectorized(colname, rexes,
+                                                         detect=detect)
+
+        # Match all the unique values against a single alternation
+        # of the regular expressions, a block at a time, so that we can
+        # stop as soon as we find a failure if we're not detecting.
+        uniqs = pd.Series([native_definite(s)
+                           for s in self.df[colname].dropna().unique()],
+                          dtype=object)
+        failures = set()
+        for start in range(0, len(uniqs), REX_BLOCK_SIZE):
+            block = uniqs.iloc[start:start + REX_BLOCK_SIZE]
+            matched = block.str.match(combined).fillna(False).astype(bool)
+            unmatched = block[~matched.values]
+            if len(unmatched) > 0:
+                if DEBUG:
+                    for s in unmatched:
+                        print('*** Unmatched string: "%s"' % s)
+                if detect:
+                    failures.update(unmatched)
+                else:
+                    return True  # At least one string didn't match
+        if detect:
+            return failures
+        else:
+            return None
+
+    def calc_rex_constraint_unvectorized(self, colname, rexes, detect=False):
+        # Only used for regular expressions that can't be combined
+        # into a single alternation.
         rexes = [re.compile(r) for r in rexes]
         strings = [native_definite(s)
                    for s in self.df[colname].dropna().unique()]
@@ -315,7 +421,47 @@ class PandasConstraintDetector(BaseConstraintDetector):
 
         output_is_feather = (detect_outpath
                              and file_format(detect_outpath) == 'feather')
+        (out_df, df_to_save,
+         n_passing_records, n_failing_records) = self.detected_records(
+            for_output=bool(detect_outpath),
+            output_is_feather=output_is_feather,
+            detect_write_all=detect_write_all,
+            detect_per_constraint=detect_per_constraint,
+            detect_output_fields=detect_output_fields,
+            detect_index=detect_index,
+            detect_in_place=detect_in_place,
+            rownumber_is_index=rownumber_is_index,
+            boolean_ints=boolean_ints)
+        if detect_outpath:
+            save_df(df_to_save, detect_outpath, index=False)
+        return Detection(out_df, n_passing_records, n_failing_records)
+
+    def detected_records(self,
+                         for_output=True,
+                         output_is_feather=False,
+                         detect_write_all=False,
+                         detect_per_constraint=False,
+                         detect_output_fields=None,
+                         detect_index=False,
+                         detect_in_place=False,
+                         rownumber_is_index=True,
+                         boolean_ints=False,
+                         first_rownumber=1):
+        """
+        Construct the detection results from the per-constraint detection
+        fields accumulated so far.
+
+        Returns a tuple of four values:
 
+            - a DataFrame of detection results (with the n_failures field)
+            - the corresponding DataFrame to be written out (or None if
+              *for_output* is not set)
+            - the number of passing records
+            - the number of failing records
+
+        *first_rownumber* is the row number to be used for the first
+        record, when row numbers are added to the output.
+        """
         out_df = self.out_df
         add_index = detect_index or detect_output_fields is None
         if detect_output_fields is None:
@@ -324,11 +470,9 @@ class PandasConstraintDetector(BaseConstraintDetector):
             detect_output_fields = list(self.df)
 
         nfailname = 'n_failures'
-        nf = len(list(out_df))
-        fails = (nf - out_df.sum(axis=1).astype(float)
-                    - out_df.isnull().sum(axis=1).astype(float))
-        out_df[nfailname] = fails.astype(int)
-        n_failing_records = (fails > 0).astype(int).sum()
+        fails = failure_counts(out_df)
+        out_df[nfailname] = fails
+        n_failing_records = int((fails > 0).sum())
         n_passing_records = len(out_df) - n_failing_records
 
         if not detect_per_constraint:
@@ -347,7 +491,8 @@ class PandasConstraintDetector(BaseConstraintDetector):
                 else:
                     raise Exception('DataFrame has no column %s' % fname)
 
-        if detect_outpath:
+        df_to_save = None
+        if for_output:
             index_is_trivial = is_pd_index_trivial(out_df)
             if output_is_feather:
                 df_to_save = out_df
@@ -380,17 +525,93 @@ class PandasConstraintDetector(BaseConstraintDetector):
                     df_to_save.reset_index(inplace=True, drop=True)
                 else:
                     pair = (unique_column_name(df_to_save, 'RowNumber'),
-                            pd.RangeIndex(1, len(df_to_save)+1))
+                            pd.RangeIndex(first_rownumber,
+                                          first_rownumber + len(df_to_save)))
                     indexes.append(pair)
                 for name, index in reversed(indexes):
                     df_to_save.insert(0, name, index)
             if not detect_write_all:
                 df_to_save = df_to_save[df_to_save[nfailname] > 0]
-            save_df(df_to_save, detect_outpath, index=False)
 
         if not detect_write_all:
             out_df = out_df[out_df[nfailname] > 0]
-        return Detection(out_df, n_passing_records, n_failing_records)
+        return out_df, df_to_save, n_passing_records, n_failing_records
+
+
+class PandasStatisticsCache(object):
+    """
+    An opt-in cache of column statistics (min, max, null counts,
+    distinct values etc.), shared between verifiers, so that verifying
+    the same DataFrame against several sets of constraints only
+    calculates each statistic once.
+
+    Entries are keyed on the identity of the DataFrame, the column name
+    and a fingerprint of the column's content, so a column that has
+    been modified in place between verifications is recalculated
+    rather than reusing stale values. The least recently used columns
+    are evicted when the (estimated) memory used by the cached values
+    exceeds *max_bytes*.
+
+    Example usage::
+
+        from tdda.constraints.pd.constraints import PandasStatisticsCache
+
+        cache = PandasStatisticsCache()
+        strict = verify_df(df, 'strict.tdda', statistics_cache=cache)
+        loose = verify_df(df, 'loose.tdda', statistics_cache=cache)
+    """
+    def __init__(self, max_bytes=DEFAULT_STATISTICS_CACHE_BYTES):
+        self.max_bytes = max_bytes
+        self.entries = OrderedDict()    # key -> (values dict, size in bytes)
+        self.nbytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.entries)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.nbytes = 0
+
+    def key(self, df, colname):
+        """
+        Returns the cache key for column *colname* of *df*, or ``None``
+        if the column's content can't be fingerprinted (in which case
+        its statistics are not cached).
+        """
+        fingerprint = column_fingerprint(df[colname])
+        if fingerprint is None:
+            return None
+        return (id(df), colname, fingerprint)
+
+    def get(self, key, value, f):
+        """
+        Return the cached statistic *value* for the column with the
+        given *key*, calculating it with *f()* and caching it first,
+        if it is not already there.
+        """
+        with self.lock:
+            if key in self.entries and value in self.entries[key][0]:
+                self.entries[key] = self.entries.pop(key)
+                self.hits += 1
+                return self.entries[key][0][value]
+            self.misses += 1
+        result = f()
+        size = estimated_size(result)
+        with self.lock:
+            values, nbytes = self.entries.pop(key, ({}, 0))
+            if value not in values:
+                values[value] = result
+                nbytes += size
+                self.nbytes += size
+            self.entries[key] = (values, nbytes)
+            while self.nbytes > self.max_bytes and self.entries:
+                _, (_, evicted) = self.entries.popitem(last=False)
+                self.nbytes -= evicted
+        return result
 
 
 class PandasConstraintVerifier(PandasConstraintCalculator,
@@ -399,12 +620,35 @@ class PandasConstraintVerifier(PandasConstraintCalculator,
     """
     A :py:class:`PandasConstraintVerifier` object provides methods
     for verifying every type of constraint against a Pandas DataFrame.
+
+    If a :py:class:`PandasStatisticsCache` is provided as
+    *statistics_cache*, the column statistics are looked up in (and
+    saved to) that, rather than in a cache private to this verifier.
     """
-    def __init__(self, df, epsilon=None, type_checking=None):
+    def __init__(self, df, epsilon=None, type_checking=None,
+                 statistics_cache=None):
         PandasConstraintCalculator.__init__(self, df)
         PandasConstraintDetector.__init__(self, df)
         BaseConstraintVerifier.__init__(self, epsilon=epsilon,
                                         type_checking=type_checking)
+        self.statistics_cache = statistics_cache
+        self.statistics_keys = {}
+        self.int_bool_fields = set()    # int fields repaired to bool
+
+    def get_cached_value(self, value, colname, f):
+        if self.statistics_cache is None:
+            return BaseConstraintVerifier.get_cached_value(self, value,
+                                                           colname, f)
+        if colname not in self.statistics_keys:
+            # The key is only worked out when first needed, after any
+            # repairs to the field types.
+            self.statistics_keys[colname] = self.statistics_cache.key(self.df,
+                                                                      colname)
+        key = self.statistics_keys[colname]
+        if key is None:
+            return BaseConstraintVerifier.get_cached_value(self, value,
+                                                           colname, f)
+        return self.statistics_cache.get(key, value, lambda: f(colname))
 
     def repair_field_types(self, constraints):
         # We sometimes haven't inferred the field types correctly for
@@ -436,11 +680,14 @@ class PandasConstraintVerifier(PandasConstraintCalculator,
                             is_real = self.calc_non_integer_values_count(c) > 0
                         self.df.loc[ser.notnull(), c] = ser.astype(str)
                         if not is_real:
-                            self.df[c] = self.df[c].str.replace('.0', '')
+                            self.df[c] = self.df[c].str.replace(
+                                '.0', '', regex=False)
                 elif ctype == 'bool' and dtype == pd.np.dtype('int64'):
                     self.df[c] = ser.astype(bool)
+                    self.int_bool_fields.add(c)
                 elif ctype == 'bool' and dtype == pd.np.dtype('int32'):
                     self.df[c] = ser.astype(bool)
+                    self.int_bool_fields.add(c)
             except Exception as e:
                 print('%s: %s' % (e.__class__.__name__, str(e)))
                 pass
@@ -526,9 +773,360 @@ class PandasConstraintDiscoverer(PandasConstraintCalculator,
     A :py:class:`PandasConstraintDiscoverer` object is used to discover
     constraints on a Pandas DataFrame.
     """
-    def __init__(self, df, inc_rex=False):
+    def __init__(self, df, inc_rex=False, approx_distinct=False):
         PandasConstraintCalculator.__init__(self, df)
-        BaseConstraintDiscoverer.__init__(self, inc_rex=inc_rex)
+        BaseConstraintDiscoverer.__init__(self, inc_rex=inc_rex,
+                                          approx_distinct=approx_distinct)
+
+
+class PandasColumnStatistics:
+    """
+    A :py:class:`PandasColumnStatistics` object holds mergeable partial
+    statistics for a single column of a dataset: enough to verify the
+    constraints on that column without ever needing the whole column in
+    memory at once.
+
+    Statistics are computed for each chunk of a dataset separately, using
+    :py:meth:`from_chunk`, and then combined using :py:meth:`merge`.
+
+    Only the statistics needed by the column's constraints are kept.
+    Distinct values are summarised by the set of their 64-bit hashes,
+    rather than by the values themselves, and the only actual values
+    retained are those that violate allowed-values constraints (up to
+    :py:const:`MAX_VALUE_VIOLATIONS` of them) and regular-expression
+    constraints (the non-matching values).
+    """
+    def __init__(self):
+        self.types = []
+        self.empty_type = None
+        self.int_bools = False
+        self.null_count = 0
+        self.non_null_count = 0
+        self.min = None
+        self.max = None
+        self.string_min = None
+        self.string_max = None
+        self.min_length = None
+        self.max_length = None
+        self.non_integer_values_count = 0
+        self.all_non_nulls_boolean = True
+        self.distinct_hashes = None
+        self.values = None
+        self.rex_violations = None
+
+    @classmethod
+    def from_chunk(cls, calc, colname, field_constraints):
+        """
+        Compute the partial statistics for a column from a chunk of
+        a dataset.
+
+        *calc* is a :py:class:`PandasConstraintCalculator` for the chunk,
+        and *field_constraints* is the
+        :py:class:`~tdda.constraints.base.FieldConstraints` object for
+        the column, which determines which statistics are needed.
+        """
+        stats = cls()
+        kinds = field_constraints.constraints
+        type_ = calc.calc_tdda_type(colname)
+        stats.null_count = calc.calc_null_count(colname)
+        stats.non_null_count = calc.calc_non_null_count(colname)
+        if stats.non_null_count == 0:
+            # An all-null chunk tells us nothing about the column's type
+            stats.empty_type = type_
+            if 'allowed_values' in kinds:
+                stats.values = set()
+            if 'rex' in kinds:
+                stats.rex_violations = set()
+            if 'no_duplicates' in kinds:
+                stats.distinct_hashes = set()
+            return stats
+
+        stats.types = [type_]
+        # bools that were read as ints, and only repaired to bools because
+        # of the type constraint
+        stats.int_bools = (type_ == 'bool'
+                           and colname in getattr(calc, 'int_bool_fields', ()))
+        if 'type' in kinds:
+            if type_ == 'real':
+                stats.non_integer_values_count = (
+                    calc.calc_non_integer_values_count(colname))
+            stats.all_non_nulls_boolean = (
+                type_ == 'bool'
+                or (type_ == 'string'
+                    and calc.calc_all_non_nulls_boolean(colname)))
+        extremes = 'min' in kinds or 'max' in kinds or 'sign' in kinds
+        lengths = 'min_length' in kinds or 'max_length' in kinds
+        if extremes:
+            stats.min = calc.calc_min(colname)
+            stats.max = calc.calc_max(colname)
+        if type_ == 'string':
+            stats.string_min = stats.min
+            stats.string_max = stats.max
+            if lengths:
+                m = pandas_native_value(calc.calc_min_length(colname))
+                M = pandas_native_value(calc.calc_max_length(colname))
+                stats.min_length = None if pd.isnull(m) else int(m)
+                stats.max_length = None if pd.isnull(M) else int(M)
+        elif extremes or lengths:
+            # Other chunks might be read as strings, making the whole
+            # column a string column, so keep the values' string forms
+            strings = calc.df[colname].dropna().astype(str)
+            if extremes:
+                stats.string_min = strings.min()
+                stats.string_max = strings.max()
+            if lengths:
+                stats.min_length = int(strings.str.len().min())
+                stats.max_length = int(strings.str.len().max())
+        if 'no_duplicates' in kinds:
+            values = calc.df[colname].dropna()
+            stats.distinct_hashes = set(value_hashes(values, type_).tolist())
+        if 'allowed_values' in kinds:
+            allowed = kinds['allowed_values'].value
+            values = calc.calc_unique_values(colname, include_nulls=False)
+            stats.values = (set() if allowed is None
+                            else first_values(set(values) - set(allowed)))
+        if 'rex' in kinds:
+            stats.rex_violations = calc.calc_rex_constraint(colname,
+                                                            kinds['rex'],
+                                                            detect=True)
+        return stats
+
+    def merge(self, other):
+        """
+        Combine the partial statistics from another
+        :py:class:`PandasColumnStatistics` object into this one.
+
+        Returns this object, updated.
+        """
+        self.types.extend(t for t in other.types if t not in self.types)
+        self.int_bools = self.int_bools or other.int_bools
+        if self.empty_type is None:
+            self.empty_type = other.empty_type
+        self.null_count += other.null_count
+        self.non_null_count += other.non_null_count
+        self.string_min = merge_extreme(self.string_min, other.string_min, min)
+        self.string_max = merge_extreme(self.string_max, other.string_max, max)
+        if self.tdda_type() == 'string' and len(self.types) > 1:
+            # Widened to string: the extremes are of the string forms
+            self.min = self.string_min
+            self.max = self.string_max
+        else:
+            self.min = merge_extreme(self.min, other.min, min)
+            self.max = merge_extreme(self.max, other.max, max)
+        self.min_length = merge_extreme(self.min_length, other.min_length, min)
+        self.max_length = merge_extreme(self.max_length, other.max_length, max)
+        self.non_integer_values_count += other.non_integer_values_count
+        self.all_non_nulls_boolean = (self.all_non_nulls_boolean
+                                      and other.all_non_nulls_boolean)
+        self.distinct_hashes = merge_sets(self.distinct_hashes,
+                                          other.distinct_hashes)
+        self.values = merge_sets(self.values, other.values)
+        if self.values is not None:
+            self.values = first_values(self.values)
+        self.rex_violations = merge_sets(self.rex_violations,
+                                         other.rex_violations)
+        return self
+
+    def tdda_type(self):
+        """
+        The TDDA type of the column, as a whole.
+
+        Different chunks of a CSV file can be read as having different
+        types (for example, if some chunks happen not to contain any
+        non-integer values, or any nulls). Mixtures of ints and reals, and
+        ints with nulls in any chunk, are treated as reals, and any other
+        mixture is treated as string, since that is how the column would
+        have been read if it had been read all at once.
+
+        Chunks whose ints were repaired to bools (because of a bool type
+        constraint) count as ints when mixed with other types, or when
+        there are nulls, since the whole column would then have been read
+        as real, and not repaired.
+        """
+        types = set(self.types)
+        if self.int_bools and (len(types) > 1 or self.null_count > 0):
+            types = set('int' if t == 'bool' else t for t in types)
+        if not types:
+            return self.empty_type
+        elif types == set(['int']) and self.null_count > 0:
+            return 'real'
+        elif len(types) == 1:
+            return list(types)[0]
+        elif types == set(['int', 'real']):
+            return 'real'
+        else:
+            return 'string'
+
+
+class PandasStatisticsCalculator(PandasConstraintCalculator):
+    """
+    Implementation of the Constraint Calculator methods using
+    precomputed :py:class:`PandasColumnStatistics` for each column,
+    rather than a Pandas DataFrame.
+    """
+    def __init__(self, fieldnames, stats, nrecords):
+        PandasConstraintCalculator.__init__(self, None)
+        self.fieldnames = fieldnames
+        self.stats = stats
+        self.nrecords = nrecords
+
+    def get_column_names(self):
+        return self.fieldnames
+
+    def get_nrecords(self):
+        return self.nrecords
+
+    def calc_tdda_type(self, colname):
+        return self.stats[colname].tdda_type()
+
+    def calc_min(self, colname):
+        return self.stats[colname].min
+
+    def calc_max(self, colname):
+        return self.stats[colname].max
+
+    def calc_min_length(self, colname):
+        return self.stats[colname].min_length
+
+    def calc_max_length(self, colname):
+        return self.stats[colname].max_length
+
+    def calc_null_count(self, colname):
+        return self.stats[colname].null_count
+
+    def calc_non_null_count(self, colname):
+        return self.stats[colname].non_null_count
+
+    def calc_nunique(self, colname):
+        return len(self.stats[colname].distinct_hashes)
+
+    def calc_non_integer_values_count(self, colname):
+        return self.stats[colname].non_integer_values_count
+
+    def calc_all_non_nulls_boolean(self, colname):
+        return self.stats[colname].all_non_nulls_boolean
+
+    def calc_rex_constraint(self, colname, constraint, detect=False):
+        if constraint.value is None:
+            return None
+        violations = self.stats[colname].rex_violations
+        if detect:
+            return violations
+        else:
+            return True if violations else None
+
+
+class PandasStreamingConstraintVerifier(PandasStatisticsCalculator,
+                                        BaseConstraintVerifier):
+    """
+    A :py:class:`PandasStreamingConstraintVerifier` object provides
+    methods for verifying every type of constraint against a dataset
+    that has been summarised, chunk by chunk, into
+    :py:class:`PandasColumnStatistics` objects.
+    """
+    def __init__(self, fieldnames, stats, nrecords, epsilon=None,
+                 type_checking=None):
+        PandasStatisticsCalculator.__init__(self, fieldnames, stats, nrecords)
+        BaseConstraintVerifier.__init__(self, epsilon=epsilon,
+                                        type_checking=type_checking)
+
+    def verify_allowed_values_constraint(self, colname, constraint,
+                                         detect=False):
+        # Only the (first few) values that are not allowed are kept
+        if not self.column_exists(colname):
+            return False
+        return len(self.stats[colname].values) == 0
+
+
+class PandasChunkConstraintVerifier(PandasConstraintVerifier):
+    """
+    A :py:class:`PandasChunkConstraintVerifier` object verifies, and
+    detects failures for, one chunk of a larger dataset that is being
+    processed a chunk at a time.
+
+    The constraints that depend on the whole dataset, rather than on
+    individual records, are checked using the running *state* carried
+    over from the chunks already processed:
+
+        - a ``max_nulls`` constraint fails in a chunk once the total
+          number of nulls so far exceeds the maximum, and all the nulls
+          in that chunk are then marked as failures;
+
+        - a ``no_duplicates`` constraint marks values that are repeated
+          within the chunk, or that occurred in any earlier chunk.
+
+    Since earlier chunks have already been written by then, the first
+    occurrence of a value duplicated in a later chunk, and nulls within
+    the allowed number, are not marked as failures.
+
+    A chunk in which a column contains only nulls cannot violate that
+    column's type constraint (even though Pandas gives such a column a
+    numeric type). Similarly, a chunk in which a column is read as int
+    satisfies a real type constraint, because the same column would
+    have been read as real if the chunk had contained any nulls.
+    """
+    def __init__(self, df, state, epsilon=None, type_checking=None):
+        PandasConstraintVerifier.__init__(self, df, epsilon=epsilon,
+                                          type_checking=type_checking)
+        self.state = state
+
+    def column_state(self, colname):
+        if colname not in self.state:
+            self.state[colname] = {'null_count': 0, 'hashes': set()}
+        return self.state[colname]
+
+    def verify_tdda_type_constraint(self, colname, constraint, detect=False):
+        if self.column_exists(colname):
+            if self.get_non_null_count(colname) == 0:
+                return True
+            required_type = constraint.value
+            allowed_types = (required_type
+                             if type(required_type) in (list, tuple)
+                             else [required_type])
+            if 'real' in allowed_types and self.get_tdda_type(colname) == 'int':
+                return True
+        return PandasConstraintVerifier.verify_tdda_type_constraint(
+            self, colname, constraint, detect=detect)
+
+    def verify_max_nulls_constraint(self, colname, constraint, detect=False):
+        if not self.column_exists(colname):
+            return False
+
+        value = constraint.value
+        if self.is_null(value):
+            return True
+        state = self.column_state(colname)
+        state['null_count'] += self.get_null_count(colname)
+        result = state['null_count'] <= value
+
+        if detect and not result:
+            self.detect_max_nulls_constraint(colname, value)
+        return result
+
+    def verify_no_duplicates_constraint(self, colname, constraint,
+                                        detect=False):
+        if not self.column_exists(colname):
+            return False
+
+        value = constraint.value
+        if value is False or self.is_null(value):
+            return True
+
+        state = self.column_state(colname)
+        c = self.df[colname]
+        values = c.dropna()
+        hashes = value_hashes(values, self.get_tdda_type(colname))
+        dups = (values.duplicated(keep=False).values
+                | pd.Series(hashes).isin(state['hashes']).values)
+        state['hashes'].update(hashes.tolist())
+        result = not dups.any()
+
+        if detect and not result:
+            name = colname + DETECTION_FIELD_SUFFIXES['no_duplicates']
+            unique = pd.Series(True, index=c.index)
+            unique[values.index[dups]] = False
+            self.out_df[name] = detection_field(c, unique, default=True)
+        return result
 
 
 def pandas_types_compatible(x, y, colname=None):
@@ -559,6 +1157,140 @@ def pandas_coarse_type(x):
     return 'number' if t in ('bool', 'int', 'real') else t
 
 
+def string_lengths(values):
+    """
+    Returns a Series of the lengths (in characters) of the strings in a
+    Pandas Series, with nulls for any values that aren't strings.
+    """
+    if not isPy3:
+        return values.str.decode('UTF-8').str.len()
+    try:
+        # Much faster than .str.len() when all the values are strings
+        return pd.Series(np.fromiter(map(len, values.values), dtype=np.int64,
+                                     count=len(values)))
+    except TypeError:
+        return values.str.len()
+
+
+def bounded_unique_values(values, limit=None):
+    """
+    Returns a list of the distinct values in a Pandas Series (of
+    non-null values), in no particular order.
+
+    If *limit* is given, the values are examined in blocks (of increasing
+    size), stopping as soon as *limit* distinct values have been found,
+    so that at most *limit* values are returned. This avoids collecting
+    all of the distinct values of a column when only a few are wanted.
+    """
+    if limit is None:
+        return list(values.unique())
+    seen = set()
+    start = 0
+    size = UNIQUE_BLOCK_SIZE
+    while start < len(values) and len(seen) < limit:
+        seen.update(values.iloc[start:start + size].unique())
+        start += size
+        size *= 2
+    return list(seen)[:limit]
+
+
+def all_distinct(values):
+    """
+    Returns True if the values in a Pandas Series (of non-null values)
+    are all different.
+
+    Prefixes of the Series of increasing size (starting with
+    :py:const:`UNIQUE_BLOCK_SIZE` records, and growing fourfold) are
+    checked for repeated values, stopping as soon as one is found, so
+    that a column with duplicates is usually not read to the end, and
+    its distinct values are never collected.
+    """
+    end = min(UNIQUE_BLOCK_SIZE, len(values))
+    while end > 0:
+        if values.iloc[:end].duplicated().any():
+            return False
+        if end == len(values):
+            break
+        end = min(4 * end, len(values))
+    return True
+
+
+def pandas_distinct_sketch(values, precision=HLL_PRECISION):
+    """
+    Returns a :py:class:`~tdda.constraints.baseconstraints.HyperLogLog`
+    sketch of the (non-null) values in a Pandas Series, with the
+    register updates vectorized using numpy.
+
+    Sketches from different chunks of the same column can be merged.
+    """
+    sketch = HyperLogLog(precision)
+    if len(values) == 0:
+        return sketch
+    hashes = pd.util.hash_pandas_object(values, index=False,
+                                        categorize=False).values
+    nbits = 64 - precision
+    index = (hashes >> np.uint64(nbits)).astype(np.int64)
+    rest = hashes & np.uint64((1 << nbits) - 1)
+    rank = (nbits - bit_lengths(rest) + 1).astype(np.uint8)
+    highest = pd.Series(rank).groupby(index).max()
+    registers = np.zeros(sketch.m, dtype=np.uint8)
+    registers[highest.index.values] = highest.values
+    sketch.registers = bytearray(registers.tobytes())
+    return sketch
+
+
+def bit_lengths(x):
+    """
+    Returns the number of bits needed to represent each of the
+    (unsigned 64-bit) integers in the numpy array x, like int.bit_length.
+    """
+    with np.errstate(divide='ignore'):
+        logs = np.floor(np.log2(x.astype(np.float64)))
+    n = np.where(x == 0, 0, logs + 1).astype(np.int64)
+    # Conversion to float can round values just below a power of two
+    # up to it, overstating their length by one.
+    shifts = np.maximum(n - 1, 0).astype(np.uint64)
+    n[(n > 0) & ((x >> shifts) == 0)] -= 1
+    return n
+
+
+def column_fingerprint(column):
+    """
+    Returns a fingerprint of the content of a Pandas Series, consisting
+    of its dtype, its length and a (order-independent) combination of
+    the hashes of its values, or ``None`` if its values can't be hashed.
+    """
+    try:
+        hashes = pd.util.hash_pandas_object(column, index=False)
+    except TypeError:
+        return None
+    return (str(column.dtype), len(column),
+            int(hashes.values.sum(dtype=np.uint64)))
+
+
+def estimated_size(value):
+    """
+    Returns a rough estimate of the number of bytes used by a cached
+    statistic (including the items of a list or set of values).
+    """
+    size = sys.getsizeof(value)
+    if isinstance(value, (list, tuple, set, frozenset)):
+        size += sum(sys.getsizeof(v) for v in value)
+    return size
+
+
+def pandas_native_value(x):
+    """
+    Convert a value obtained from a pandas or numpy aggregation to the
+    corresponding native Python value (datetime, int, float etc).
+    """
+    if pandas_tdda_type(x) == 'date':
+        return x.to_pydatetime(warn=False)
+    elif hasattr(x, 'item'):
+        return x.item()
+    return x
+
+
 def pandas_tdda_type(x):
     """
     Returns the TDDA type of a column.
@@ -603,7 +1335,7 @@ def pandas_tdda_type(x):
 
 
 def verify_df(df, constraints_path, epsilon=None, type_checking=None,
-              report='all', **kwargs):
+              report='all', n_jobs=None, statistics_cache=None, **kwargs):
     """
     Verify that (i.e. check whether) the Pandas DataFrame provided
     satisfies the constraints in the JSON ``.tdda`` file provided.
@@ -684,6 +1416,31 @@ def verify_df(df, constraints_path, epsilon=None, type_checking=None,
                             If report is set to ``fields``, only fields for
                             which at least one constraint failed are shown.
 
+        *n_jobs*:
+                            The number of worker threads to use to
+                            verify the fields of the DataFrame in
+                            parallel. The workers all share the same
+                            DataFrame (there is no copying), and most
+                            of the work is done inside numpy and pandas
+                            operations, so wide DataFrames verify
+                            substantially faster using several workers.
+
+                            The default is ``None``, meaning that the
+                            fields are verified one at a time. The
+                            results are the same either way.
+
+        *statistics_cache*:
+                            A :py:class:`PandasStatisticsCache` in which
+                            to look up and save the column statistics
+                            used for the verification. Passing the same
+                            cache to several calls that verify the same
+                            DataFrame (e.g. against a strict and a loose
+                            set of constraints) avoids recalculating them.
+
+                            The default is ``None``, meaning that the
+                            statistics are only kept for the duration of
+                            this call.
+
     Returns:
 
         :py:class:`~PandasVerification` object.
@@ -717,19 +1474,91 @@ def verify_df(df, constraints_path, epsilon=None, type_checking=None,
 
     """
     pdv = PandasConstraintVerifier(df, epsilon=epsilon,
-                                   type_checking=type_checking)
+                                   type_checking=type_checking,
+                                   statistics_cache=statistics_cache)
     constraints = DatasetConstraints(loadpath=constraints_path)
     pdv.repair_field_types(constraints)
     return pdv.verify(constraints,
                       VerificationClass=PandasVerification,
-                      report=report, **kwargs)
+                      report=report, n_jobs=n_jobs, **kwargs)
+
+
+def verify_csv_chunked(csv_path, constraints_path, chunksize=None,
+                       epsilon=None, type_checking=None, report='all',
+                       **kwargs):
+    """
+    Verify that (i.e. check whether) the data in a CSV file satisfies
+    the constraints in the JSON ``.tdda`` file provided, reading the
+    file in chunks, so that files much larger than memory can be verified.
+
+    Mandatory Inputs:
+
+        *csv_path*:
+                            The path to a CSV file (or a file-like object).
+
+        *constraints_path*:
+                            The path to a JSON ``.tdda`` file containing
+                            constraints to be checked.
+
+    Optional Inputs:
+
+        *chunksize*:
+                            The number of records to read at a time.
+                            The default is :py:const:`DEFAULT_CHUNK_SIZE`.
+
+        *epsilon*, *type_checking*, *report*:
+                            As for :py:func:`verify_df`.
+
+    Each chunk is summarised into mergeable
+    :py:class:`PandasColumnStatistics` for each constrained column, and
+    the verification is then performed on the combined statistics, so
+    the peak memory used is determined by the chunk size, together with
+    the values kept for any ``no_duplicates`` and ``rex`` constraints.
+
+    A ``no_duplicates`` constraint is checked using a 64-bit hash of
+    every distinct value in its column, so the memory it needs grows
+    with the number of records in the file. Two different values with
+    the same hash are treated as duplicates, so such a constraint can
+    (very rarely) fail when it should pass. A ``rex`` constraint keeps
+    the distinct values that do not match it.
+
+    Returns:
+
+        :py:class:`~PandasVerification` object, as for :py:func:`verify_df`.
+    """
+    constraints = DatasetConstraints(loadpath=constraints_path)
+    fieldnames = None
+    nrecords = 0
+    stats = OrderedDict()
+    for chunk in default_csv_chunk_loader(csv_path,
+                                          chunksize or DEFAULT_CHUNK_SIZE):
+        if fieldnames is None:
+            fieldnames = list(chunk)
+        nrecords += len(chunk)
+        pdv = PandasConstraintVerifier(chunk, epsilon=epsilon,
+                                       type_checking=type_checking)
+        pdv.repair_field_types(constraints)
+        for name in fieldnames:
+            if name in constraints:
+                partial = PandasColumnStatistics.from_chunk(
+                    pdv, name, constraints[name])
+                if name in stats:
+                    stats[name].merge(partial)
+                else:
+                    stats[name] = partial
+    verifier = PandasStreamingConstraintVerifier(fieldnames or [], stats,
+                                                 nrecords, epsilon=epsilon,
+                                                 type_checking=type_checking)
+    return verifier.verify(constraints,
+                           VerificationClass=PandasVerification,
+                           report=report, **kwargs)
 
 
 def detect_df(df, constraints_path, epsilon=None, type_checking=None,
               outpath=None, write_all=False, per_constraint=False,
               output_fields=None, index=False, in_place=False,
               rownumber_is_index=True, boolean_ints=False, report='records',
-              **kwargs):
+              statistics_cache=None, **kwargs):
     """
     Check the records from the Pandas DataFrame provided, to detect
     records that fail any of the constraints in the JSON ``.tdda`` file
@@ -855,9 +1684,9 @@ def detect_df(df, constraints_path, epsilon=None, type_checking=None,
                             false), rather than as ``true`` and ``false``
                             values.
 
-    The *report* parameter from :py:func:`verify_df` can also be
-    used, in which case a verification report will also be produced in
-    addition to the detection results.
+    The *report* and *statistics_cache* parameters from
+    :py:func:`verify_df` can also be used; with *report*, a verification
+    report will also be produced in addition to the detection results.
 
     Returns:
 
@@ -880,7 +1709,8 @@ def detect_df(df, constraints_path, epsilon=None, type_checking=None,
 
     """
     pdv = PandasConstraintVerifier(df, epsilon=epsilon,
-                                   type_checking=type_checking)
+                                   type_checking=type_checking,
+                                   statistics_cache=statistics_cache)
     constraints = DatasetConstraints(loadpath=constraints_path)
     pdv.repair_field_types(constraints)
     return pdv.detect(constraints, VerificationClass=PandasDetection,
@@ -893,7 +1723,162 @@ def detect_df(df, constraints_path, epsilon=None, type_checking=None,
                       report=report, **kwargs)
 
 
-def discover_df(df, inc_rex=False, df_path=None):
+def detect_csv_chunked(csv_path, constraints_path, outpath=None,
+                       chunksize=None, epsilon=None, type_checking=None,
+                       write_all=False, per_constraint=False,
+                       output_fields=None, index=False, in_place=False,
+                       rownumber_is_index=False, boolean_ints=False,
+                       report='records', **kwargs):
+    """
+    Check the records in a CSV file against the constraints in the JSON
+    ``.tdda`` file provided, reading and checking the file in chunks, and
+    writing out details of the failing records for each chunk as soon as
+    it has been checked.
+
+    Mandatory Inputs:
+
+        *csv_path*:
+                            The path to a CSV file (or a file-like object).
+
+        *constraints_path*:
+                            The path to a JSON ``.tdda`` file containing
+                            constraints to be checked.
+
+    Optional Inputs:
+
+        *outpath*:
+                            The path to a ``.csv`` or ``.feather`` file
+                            to which to write the detection results.
+                            CSV output is appended to a chunk at a time;
+                            since the feather format does not support
+                            appending, feather output is accumulated
+                            and written at the end. If not set (or
+                            ``-``), the results are written to standard
+                            output as CSV.
+
+        *chunksize*:
+                            The number of records to read at a time.
+                            The default is :py:const:`DEFAULT_CHUNK_SIZE`.
+
+        Other inputs are as for :py:func:`detect_df`, except that
+        *in_place* and *rownumber_is_index* do not apply.
+
+    The results for the constraints that depend only on individual
+    records (everything except ``max_nulls`` and ``no_duplicates``)
+    are the same as for :py:func:`detect_df`. See
+    :py:class:`PandasChunkConstraintVerifier` for the handling of the
+    other two. With *per_constraint* set, there is a field for every
+    active constraint, so that all chunks write the same fields; in
+    chunks where nothing fails a constraint, its field is true except
+    for null values, which are null (as with :py:func:`detect_df`).
+
+    Returns:
+
+        :py:class:`~PandasDetection` object, with the verification results
+        and the numbers of passing and failing records. Since the detection
+        results are not kept in memory, its
+        :py:meth:`~PandasDetection.detected()` method returns ``None``.
+    """
+    constraints = DatasetConstraints(loadpath=constraints_path)
+    output_is_feather = (outpath not in (None, '-')
+                         and file_format(outpath) == 'feather')
+    to_stdout = outpath in (None, '-')
+    if not to_stdout and not output_is_feather and os.path.exists(outpath):
+        os.remove(outpath)
+
+    fieldnames = None
+    detection_fields = None
+    results = {}
+    state = {}
+    feather_parts = []
+    nrecords = n_failing_records = 0
+    for chunk in default_csv_chunk_loader(csv_path,
+                                          chunksize or DEFAULT_CHUNK_SIZE):
+        if fieldnames is None:
+            fieldnames = list(chunk)
+            allfields = [f for f in fieldnames if f in constraints]
+            allfields += [f for f in constraints.fields
+                          if f not in fieldnames]
+            detection_fields = OrderedDict(
+                (name + DETECTION_FIELD_SUFFIXES[c.kind], (name, c.kind))
+                for name in allfields
+                for c in constraints.fields[name]
+                if name in fieldnames
+                and c.kind in DETECTION_FIELD_SUFFIXES
+                and not (c.value is None or c.value is False)
+            )
+        pdv = PandasChunkConstraintVerifier(chunk, state, epsilon=epsilon,
+                                            type_checking=type_checking)
+        pdv.repair_field_types(constraints)
+        verifiers = pdv.verifiers()
+        for name in allfields:
+            field_results = results.setdefault(name, OrderedDict())
+            for c in constraints.fields[name]:
+                verifier = verifiers.get(c.kind)
+                if verifier:
+                    satisfied = bool(verifier(name, c, True))
+                    field_results[c.kind] = (field_results.get(c.kind, True)
+                                             and satisfied)
+                else:
+                    field_results[c.kind] = None
+
+        if per_constraint:
+            # Fields for constraints that nothing in this chunk failed,
+            # with nulls where detect_df would have them.
+            for name, (colname, kind) in detection_fields.items():
+                if name in pdv.out_df:
+                    continue
+                c = pdv.df[colname]
+                if kind == 'max_nulls':
+                    pdv.out_df[name] = True  # nulls within the limit
+                else:
+                    default = True if kind == 'no_duplicates' else None
+                    pdv.out_df[name] = detection_field(
+                        c, pd.Series(True, index=c.index), default=default)
+            pdv.out_df = pdv.out_df[list(detection_fields)]
+        (out_df, df_to_save, n_passing, n_failing) = pdv.detected_records(
+            output_is_feather=output_is_feather,
+            detect_write_all=write_all,
+            detect_per_constraint=per_constraint,
+            detect_output_fields=output_fields,
+            detect_index=index,
+            rownumber_is_index=False,
+            boolean_ints=boolean_ints,
+            first_rownumber=nrecords + 1)
+        if output_is_feather:
+            feather_parts.append(df_to_save)
+        elif to_stdout:
+            sys.stdout.write(default_csv_writer(df_to_save, None, index=False,
+                                                header=(nrecords == 0)))
+        elif len(df_to_save) > 0 or nrecords == 0:
+            default_csv_writer(df_to_save, outpath, index=False,
+                               mode='a', header=not os.path.exists(outpath))
+        nrecords += len(chunk)
+        n_failing_records += n_failing
+
+    if output_is_feather and feather_parts:
+        save_df(pd.concat(feather_parts, ignore_index=True), outpath)
+    n_passing_records = nrecords - n_failing_records
+    if n_failing_records == 0 and not write_all and not to_stdout:
+        if os.path.exists(outpath):
+            os.remove(outpath)
+
+    # The overall result for each constraint is the conjunction of its
+    # results for each chunk (which is the same as checking it on the
+    # whole dataset at once).
+    def chunk_result(name, constraint, detect):
+        return results[name][constraint.kind]
+
+    kinds = PandasConstraintVerifier(None).verifiers().keys()
+    chunk_verifiers = dict((kind, chunk_result) for kind in kinds)
+    return verify(constraints, fieldnames or [], chunk_verifiers,
+                  VerificationClass=PandasDetection,
+                  detected_records_writer=lambda **kw: Detection(
+                      None, n_passing_records, n_failing_records),
+                  detect=True, report=report, **kwargs)
+
+
+def discover_df(df, inc_rex=False, df_path=None, approx_distinct=False):
     """
     Automatically discover potentially useful constraints that characterize
     the Pandas DataFrame provided.
@@ -910,6 +1895,17 @@ def discover_df(df, inc_rex=False, df_path=None):
         *df_path*:
             The path from which the dataframe was loaded, if any.
 
+        *approx_distinct*:
+            If ``True``, estimate the number of distinct values in
+            string and integer fields using a HyperLogLog sketch,
+            only counting them exactly (and finding the actual values)
+            when the estimate is close enough to :py:const:`MAX_CATEGORIES`
+            or to the number of non-null values to affect the
+            ``allowed_values`` or ``no_duplicates`` constraints generated.
+            The constraints are the same as without it, but discovery
+            on high-cardinality string fields is much cheaper
+            (default: ``False``).
+
     Possible return values:
 
     -  :py:class:`~tdda.constraints.base.DatasetConstraints` object
@@ -1013,7 +2009,8 @@ def discover_df(df, inc_rex=False, df_path=None):
     for a slightly fuller example.
 
     """
-    disco = PandasConstraintDiscoverer(df, inc_rex=inc_rex)
+    disco = PandasConstraintDiscoverer(df, inc_rex=inc_rex,
+                                       approx_distinct=approx_distinct)
     constraints = disco.discover()
     if constraints:
         constraints.set_dates_user_host_creator()
@@ -1073,13 +2070,85 @@ def unique_column_name(df, name):
     return newname
 
 
+def value_hashes(values, type_):
+    """
+    Returns a numpy array of 64-bit hashes for a Series of (non-null)
+    values of the given TDDA type.
+
+    Numeric values are hashed as floats, so that (for example) 1 and 1.0
+    hash the same, even if read with different types in different chunks.
+    """
+    values = values.values
+    if type_ in ('bool', 'int', 'real'):
+        values = values.astype(np.float64)
+    return pd.util.hash_array(values)
+
+
+def merge_extreme(a, b, f):
+    """
+    Combine two partial minimum (or maximum) values, using the function
+    *f* (min or max), where either might be None (if there were no values).
+    """
+    if a is None:
+        return b
+    elif b is None:
+        return a
+    return f(a, b)
+
+
+def first_values(values, n=MAX_VALUE_VIOLATIONS):
+    """
+    Returns a set of at most *n* of the values in the set provided.
+    """
+    if len(values) <= n:
+        return values
+    return set(itertools.islice(values, n))
+
+
+def merge_sets(a, b):
+    """
+    Combine two partial sets, either of which might be None (if not being
+    collected).
+    """
+    if a is None:
+        return b
+    elif b is None:
+        return a
+    a.update(b)
+    return a
+
+
 def detection_field(column, expr, default=None):
     """
-    Construct a field for a detection result
+    Construct a field for a detection result.
+
+    The result is a nullable boolean array, with nulls (or *default*,
+    if specified) wherever *column* is null. With versions of Pandas
+    that don't have nullable booleans, it is an object array of
+    ``True``, ``False`` and ``NaN`` values instead.
+    """
+    nulls = np.asarray(pd.isnull(column), dtype=bool)
+    if BooleanArray is None:
+        default_value = (np.nan if default is None
+                                else (np.ones(len(column)) * default))
+        return np.where(nulls, default_value, expr.astype('O'))
+    flags = np.asarray(expr, dtype=bool)
+    if default is None:
+        return BooleanArray(flags, nulls)
+    else:
+        flags = np.where(nulls, bool(default), flags)
+        return BooleanArray(flags, np.zeros(len(flags), dtype=bool))
+
+
+def failure_counts(df):
+    """
+    Returns an array containing the number of detection fields in *df*
+    that are false (rather than true or null) for each record.
     """
-    default_value = (np.nan if default is None
-                            else (np.ones(len(column)) * default))
-    return np.where(pd.isnull(column), default_value, expr.astype('O'))
+    counts = np.zeros(len(df), dtype=int)
+    for name in list(df):
+        counts += np.asarray((df[name] == False).fillna(False), dtype=bool)
+    return counts
 
 
 def convert_output_types(df, boolean_ints):
@@ -1091,14 +2160,18 @@ def convert_output_types(df, boolean_ints):
     newdf = pd.DataFrame(index=df.index)
     trueval = '1' if boolean_ints else 'true'
     falseval = '0' if boolean_ints else 'false'
-    pandas_true_values = (True, pd.np.bool(True), pd.np.bool_(True))
-    pandas_false_values = (True, pd.np.bool(False), pd.np.bool_(False))
     for col in list(df):
         c = df[col]
-        if c.dtype in (pd.np.dtype('O'), pd.np.dtype(bool)):
-            newdf[col] = [(trueval if v in pandas_true_values
-                           else falseval if v in pandas_false_values
-                           else v) for v in c]
+        if c.dtype == np.dtype(bool):
+            newdf[col] = np.where(c.values, trueval, falseval)
+        elif BooleanArray is not None and isinstance(c.values, BooleanArray):
+            strings = np.where(np.asarray(c.fillna(False), dtype=bool),
+                               trueval, falseval).astype('O')
+            strings[np.asarray(c.isnull())] = np.nan
+            newdf[col] = strings
+        elif c.dtype == np.dtype('O'):
+            newdf[col] = c.mask(c.isin([True]), trueval).mask(c.isin([False]),
+                                                             falseval)
         else:
             newdf[col] = c
     return newdf
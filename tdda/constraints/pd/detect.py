@@ -25,6 +25,12 @@ Parameters:
   * name of output file (.csv or .feather) where detection results
     are to be written. Can be - (or missing) to write to standard output.
 
+Additional optional flags are:
+
+  * --chunksize N
+      Read and check a CSV input file N records at a time, rather than
+      all at once, writing out the failing records from each chunk as
+      soon as it has been checked.
 '''
 
 import os
@@ -49,11 +55,12 @@ except ImportError:
 
 from tdda import __version__
 from tdda.constraints.flags import detect_parser, detect_flags
-from tdda.constraints.pd.constraints import detect_df, load_df, file_format
+from tdda.constraints.pd.constraints import (detect_df, detect_csv_chunked,
+                                             load_df, file_format)
 
 
 def detect_df_from_file(df_path, constraints_path, outpath,
-                        verbose=True, **kwargs):
+                        verbose=True, chunksize=None, **kwargs):
     if df_path == '-' or df_path is None:
         df_path = StringIO(sys.stdin.read())
     if constraints_path is None:
@@ -65,10 +72,14 @@ def detect_df_from_file(df_path, constraints_path, outpath,
             print('No constraints file specified.', file=sys.stderr)
             sys.exit(1)
 
-    df = load_df(df_path)
     from_feather = file_format(df_path) == 'feather'
-    v = detect_df(df, constraints_path, outpath=outpath,
-                  rownumber_is_index=from_feather, **kwargs)
+    if chunksize and not from_feather:
+        v = detect_csv_chunked(df_path, constraints_path, outpath=outpath,
+                               chunksize=chunksize, **kwargs)
+    else:
+        df = load_df(df_path)
+        v = detect_df(df, constraints_path, outpath=outpath,
+                      rownumber_is_index=from_feather, **kwargs)
     if verbose and outpath is not None and outpath != '-':
         print(v)
     return v
@@ -81,6 +92,9 @@ def pd_detect_parser():
                         help='constraints file to verify against')
     parser.add_argument('outpath', nargs='?',
                         help='file to write detection results to')
+    parser.add_argument('--chunksize', type=int,
+                        help='number of records to read and check at a time '
+                             'from a CSV file')
     return parser
 
 
@@ -91,6 +105,8 @@ def pd_detect_params(args):
     params['df_path'] = flags.input
     params['constraints_path'] = flags.constraints
     params['outpath'] = flags.outpath
+    if flags.chunksize is not None:
+        params['chunksize'] = flags.chunksize
     return params
 
 
@@ -72,6 +72,9 @@ def pd_discover_parser():
     parser.add_argument('input', nargs=1, help='CSV or feather file')
     parser.add_argument('constraints', nargs='?',
                         help='name of constraints file to create')
+    parser.add_argument('--approx-distinct', action='store_true',
+                        help='estimate distinct counts with HyperLogLog, '
+                             'counting exactly only near thresholds')
     return parser
 
 
@@ -81,6 +84,7 @@ def pd_discover_params(args):
     flags = discover_flags(parser, args, params)
     params['df_path'] = flags.input[0] if flags.input else None
     params['constraints_path'] = flags.constraints
+    params['approx_distinct'] = flags.approx_distinct
     return params
 
 
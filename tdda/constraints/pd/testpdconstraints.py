@@ -45,7 +45,9 @@ from tdda.constraints.base import (
     AllowedValuesConstraint,
     MinLengthConstraint,
     MaxLengthConstraint,
+    RexConstraint,
     DatasetConstraints,
+    combine_rexes,
     Fields,
     FieldConstraints,
     verify,
@@ -54,11 +56,14 @@ from tdda.constraints.base import (
     fuzzy_less_than,
     fuzzy_greater_than,
 )
+from tdda.constraints.baseconstraints import HyperLogLog
 from tdda.constraints.console import main_with_argv
 
 from tdda.constraints.pd import constraints as pdc
 from tdda.constraints.pd.constraints import (load_df, verify_df,
-                                             discover_df, detect_df)
+                                             verify_csv_chunked,
+                                             discover_df, detect_df,
+                                             detect_csv_chunked)
 from tdda.constraints.pd.discover import discover_df_from_file
 from tdda.constraints.pd.verify import verify_df_from_file
 
@@ -796,6 +801,46 @@ class TestPandasIndividualConstraintVerifier(ReferenceTestCase):
             else:
                 cvt.verify_allowed_values_constraint(col, c_nothing).isFalse()
 
+    def test_verify_rex_constraint(self):
+        df = pd.DataFrame({
+            'ids': ['AB-12', 'CD-345', None, 'EF-6'],
+            'mixed': ['AB-12', '12', 'x', 'aa'],
+            'null': [None] * 4,
+        })
+        cvt = ConstraintVerificationTester(self, df)
+        c_ids = RexConstraint(['^[A-Z]{2}-[0-9]+$'])
+        c_alts = RexConstraint(['^[A-Z]+-[0-9]+$', '^[0-9]+$'])
+        c_backref = RexConstraint(['^(a)\\1$', '^[0-9]+$'])
+        c_flags = RexConstraint(['^[0-9]+$', '(?i)^X$'])
+
+        cvt.verify_rex_constraint('ids', c_ids).isTrue()
+        cvt.verify_rex_constraint('null', c_ids).isTrue()
+        cvt.verify_rex_constraint('mixed', c_ids).isFalse()
+        cvt.verify_rex_constraint('mixed', c_alts).isFalse()
+
+        # the vectorized matcher must find exactly the same violations as
+        # matching each regular expression separately
+        v = pdc.PandasConstraintVerifier(df)
+        for c in (c_ids, c_alts, c_backref, c_flags):
+            self.assertEqual(
+                v.calc_rex_constraint('mixed', c, detect=True),
+                v.calc_rex_constraint_unvectorized('mixed', c.value,
+                                                   detect=True))
+        self.assertEqual(v.calc_rex_constraint('mixed', c_alts, detect=True),
+                         set(['x', 'aa']))
+        self.assertEqual(v.calc_rex_constraint('mixed', c_backref,
+                                               detect=True),
+                         set(['AB-12', 'x']))
+
+        # inline flags would apply to the whole of a combined alternation
+        # (before Python 3.11), so such expressions are matched separately
+        self.assertIsNone(combine_rexes(['(?i)^X$', '^[a-z]+$']))
+        self.assertIsNone(combine_rexes(['^(?s:a.b)$']))
+        self.assertEqual(combine_rexes(['^(?:a)$', '^b$']),
+                         '(?:^(?:a)$)|(?:^b$)')
+        self.assertEqual(v.calc_rex_constraint('mixed', c_flags, detect=True),
+                         set(['AB-12', 'aa']))
+
 
 class TestPandasMultipleConstraintVerifier(ReferenceTestCase):
     def testFieldVerification(self):
@@ -959,6 +1004,150 @@ class TestPandasMultipleConstraintVerifier(ReferenceTestCase):
         vdf.sort_values('field', inplace=True)
         self.assertStringCorrect(vdf.to_string(), 'elements118rex.df')
 
+    def testElements118Parallel(self):
+        csv_path = os.path.join(TESTDATA_DIR, 'elements118.csv')
+        df = pd.read_csv(csv_path)
+        constraints_path = os.path.join(TESTDATA_DIR, 'elements92rex.tdda')
+        serial = verify_df(df, constraints_path)
+        v = verify_df(df, constraints_path, n_jobs=4)
+        self.assertEqual(v.passes, serial.passes)
+        self.assertEqual(v.failures, serial.failures)
+        self.assertEqual(list(v.fields.keys()), list(serial.fields.keys()))
+        self.assertEqual(v.to_dataframe().to_string(),
+                         serial.to_dataframe().to_string())
+
+    def testElements118StatisticsCache(self):
+        csv_path = os.path.join(TESTDATA_DIR, 'elements118.csv')
+        df = pd.read_csv(csv_path)
+        strict_path = os.path.join(TESTDATA_DIR, 'elements92.tdda')
+        loose_path = os.path.join(TESTDATA_DIR, 'elements118.tdda')
+        cache = pdc.PandasStatisticsCache()
+        for path in (strict_path, loose_path):
+            uncached = verify_df(df, path)
+            v = verify_df(df, path, statistics_cache=cache)
+            self.assertEqual(v.to_dataframe().to_string(),
+                             uncached.to_dataframe().to_string())
+        self.assertEqual(len(cache), len(df.columns))
+        self.assertTrue(cache.hits > 0)
+
+        # Modifying a column means its statistics are recalculated
+        df.loc[0, 'Z'] = 1000
+        v = verify_df(df, strict_path, statistics_cache=cache)
+        self.assertEqual(v.to_dataframe().to_string(),
+                         verify_df(df, strict_path).to_dataframe().to_string())
+        self.assertEqual(len(cache), len(df.columns) + 1)
+
+        # The memory cap is respected by evicting the oldest columns
+        small = pdc.PandasStatisticsCache(max_bytes=1000)
+        verify_df(df, strict_path, statistics_cache=small)
+        self.assertTrue(0 < len(small) < len(df.columns))
+        self.assertTrue(small.nbytes <= 1000)
+
+    def testElements118Chunked(self):
+        csv_path = os.path.join(TESTDATA_DIR, 'elements118.csv')
+        constraints_path = os.path.join(TESTDATA_DIR, 'elements92rex.tdda')
+        v = verify_csv_chunked(csv_path, constraints_path, chunksize=10,
+                               report='fields')
+        self.assertEqual(v.passes, 61)
+        self.assertEqual(v.failures, 17)
+        vdf = v.to_dataframe()
+        vdf.sort_values('field', inplace=True)
+        self.assertStringCorrect(vdf.to_string(), 'elements118rex.df')
+
+    def testDDDChunked(self):
+        # Chunks of a bool field with nulls are read as real, but null-free
+        # chunks are repaired to bool; together, they are real, as when
+        # the whole file is read
+        csv_path = os.path.join(TESTDATA_DIR, 'ddd.csv')
+        constraints_path = os.path.join(TESTDATA_DIR, 'ddd.tdda')
+        whole = verify_df_from_file(csv_path, constraints_path,
+                                    verbose=False)
+        self.assertEqual((whole.passes, whole.failures), (60, 1))
+        expected = whole.to_dataframe().to_string()
+        for chunksize in (1, 2, 3, 4, 7):
+            v = verify_csv_chunked(csv_path, constraints_path,
+                                   chunksize=chunksize)
+            self.assertEqual(v.to_dataframe().to_string(), expected)
+
+    def testMergeColumnStatistics(self):
+        constraints = FieldConstraints('a', [TypeConstraint('int'),
+                                             MinConstraint(0),
+                                             NoDuplicatesConstraint()])
+        chunks = [pd.DataFrame({'a': [3, 1]}),
+                  pd.DataFrame({'a': [None, None]}),
+                  pd.DataFrame({'a': [2.5, 1.0, None]})]
+        stats = [pdc.PandasColumnStatistics.from_chunk(
+                    pdc.PandasConstraintCalculator(df), 'a', constraints)
+                 for df in chunks]
+        merged = stats[0].merge(stats[1]).merge(stats[2])
+        self.assertEqual(merged.tdda_type(), 'real')
+        self.assertEqual(merged.null_count, 3)
+        self.assertEqual(merged.non_null_count, 4)
+        self.assertEqual((merged.min, merged.max), (1, 3))
+        self.assertEqual(merged.non_integer_values_count, 1)
+        self.assertEqual(len(merged.distinct_hashes), 3)  # 1 == 1.0
+
+    def testMergeWidenedColumnStatistics(self):
+        # A column read as int in one chunk and string in another is a
+        # string column, with extremes and lengths of the string forms
+        constraints = FieldConstraints('a', [MinConstraint('0'),
+                                             MaxConstraint('z'),
+                                             MinLengthConstraint(1),
+                                             MaxLengthConstraint(3)])
+        chunks = [pd.DataFrame({'a': [5, 2000]}),
+                  pd.DataFrame({'a': ['abc', 'x']})]
+        stats = [pdc.PandasColumnStatistics.from_chunk(
+                    pdc.PandasConstraintCalculator(df), 'a', constraints)
+                 for df in chunks]
+        merged = stats[0].merge(stats[1])
+        self.assertEqual(merged.tdda_type(), 'string')
+        self.assertEqual((merged.min, merged.max), ('2000', 'x'))
+        self.assertEqual((merged.min_length, merged.max_length), (1, 4))
+
+    def testAllowedValuesViolationsCapped(self):
+        constraints = FieldConstraints('a', [AllowedValuesConstraint(['x'])])
+        # 60 distinct values that are not allowed, 15 in each chunk
+        chunks = [pd.DataFrame({'a': ['x', None]
+                                     + ['v%d' % i for i in range(k, k + 15)]})
+                  for k in range(0, 60, 15)]
+        stats = [pdc.PandasColumnStatistics.from_chunk(
+                    pdc.PandasConstraintCalculator(df), 'a', constraints)
+                 for df in chunks]
+        self.assertEqual(len(stats[0].values), 15)
+        merged = stats[0]
+        for s in stats[1:]:
+            merged = merged.merge(s)
+        self.assertEqual(len(merged.values), pdc.MAX_VALUE_VIOLATIONS)
+        self.assertNotIn('x', merged.values)
+
+        passing = pdc.PandasColumnStatistics.from_chunk(
+            pdc.PandasConstraintCalculator(pd.DataFrame({'a': ['x', None]})),
+            'a', constraints)
+        self.assertEqual(passing.values, set())
+        for (s, expected) in ((merged, False), (passing, True)):
+            verifier = pdc.PandasStreamingConstraintVerifier(['a'], {'a': s},
+                                                             64)
+            self.assertEqual(verifier.verify_allowed_values_constraint(
+                'a', constraints.constraints['allowed_values']), expected)
+
+    def testIntWithLeadingNullsChunked(self):
+        # Only the first chunk has nulls, so the other chunk is read as
+        # int, but the whole column is read as real.
+        csv_path = os.path.join(self.tmp_dir, 'leading_nulls.csv')
+        df = pd.DataFrame({'a': [None] * 5 + list(range(1, 6)),
+                           's': ['x'] * 5 + [str(i * 10) for i in range(5)]})
+        df.to_csv(csv_path, index=False)
+        df = pd.read_csv(csv_path)
+        constraints_path = os.path.join(self.tmp_dir, 'leading_nulls.tdda')
+        with open(constraints_path, 'w') as f:
+            f.write(discover_df(df).to_json())
+        expected = verify_df(df, constraints_path).to_dataframe().to_string()
+        for chunksize in (1, 3, 5):
+            v = verify_csv_chunked(csv_path, constraints_path,
+                                   chunksize=chunksize)
+            self.assertEqual(v.failures, 0)
+            self.assertEqual(v.to_dataframe().to_string(), expected)
+
 
 class TestPandasDataFrameConstraints(ReferenceTestCase):
     def testDDD_df(self):
@@ -1123,6 +1312,103 @@ class TestPandasMultipleConstraintDetector(ReferenceTestCase):
         ddf = v.detected()
         self.assertStringCorrect(ddf.to_string(), 'elements118rex_detect.df')
 
+    def testDetectElements118rexChunkedToFile(self):
+        csv_path = os.path.join(TESTDATA_DIR, 'elements118.csv')
+        constraints_path = os.path.join(TESTDATA_DIR, 'elements92rex.tdda')
+        detectfile = os.path.join(self.tmp_dir,
+                                  'elements118rex_detect_chunked.csv')
+        v = detect_csv_chunked(csv_path, constraints_path, chunksize=1000,
+                               report='fields', outpath=detectfile,
+                               output_fields=['Z'])
+        self.assertEqual(v.passes, 61)
+        self.assertEqual(v.failures, 17)
+        self.assertEqual(v.detection.n_failing_records, 27)
+        self.assertTextFileCorrect(detectfile, 'elements118rex_detect.csv')
+
+        # With smaller chunks, the verification results are the same, but
+        # the first null in the MeltingPoint fields (which is within the
+        # max_nulls limit of 1 when it is read) is no longer reported.
+        v = detect_csv_chunked(csv_path, constraints_path, chunksize=10,
+                               report='fields', outpath=detectfile,
+                               output_fields=['Z'])
+        self.assertEqual(v.passes, 61)
+        self.assertEqual(v.failures, 17)
+        self.assertEqual(v.detection.n_failing_records, 26)
+        self.assertIsNone(v.detected())
+
+    def testDetectionFieldsOutput(self):
+        c = pd.Series([1, 5, np.nan, 9])
+        df = pd.DataFrame({
+            'c_max_ok': pdc.detection_field(c, c <= 5),
+            'c_nodups_ok': pdc.detection_field(c, c > 0, default=True),
+            'c_nonnull_ok': pd.notnull(c),
+            'c': c,
+        })
+        self.assertEqual(list(pdc.failure_counts(df[['c_max_ok',
+                                                    'c_nodups_ok',
+                                                    'c_nonnull_ok']])),
+                         [0, 0, 1, 1])
+        for boolean_ints, t, f in ((False, 'true', 'false'),
+                                   (True, '1', '0')):
+            out = pdc.convert_output_types(df, boolean_ints)
+            self.assertEqual(list(out['c_max_ok'].fillna('')),
+                             [t, t, '', f])
+            self.assertEqual(list(out['c_nodups_ok']), [t, t, t, t])
+            self.assertEqual(list(out['c_nonnull_ok']), [t, t, f, t])
+            self.assertEqual(out['c'].dtype, c.dtype)
+
+    def testDetectDuplicatesChunked(self):
+        csv_path = os.path.join(self.tmp_dir, 'dups.csv')
+        pd.DataFrame({'a': [1, 2, 3, 2, 1, 4, 4]}).to_csv(csv_path,
+                                                           index=False)
+        constraints_path = os.path.join(self.tmp_dir, 'dups.tdda')
+        constraints = DatasetConstraints([
+            FieldConstraints('a', [TypeConstraint('int'),
+                                   NoDuplicatesConstraint()])
+        ])
+        with open(constraints_path, 'w') as f:
+            f.write(constraints.to_json())
+        detectfile = os.path.join(self.tmp_dir, 'dups_detect.csv')
+        v = detect_csv_chunked(csv_path, constraints_path, chunksize=3,
+                               outpath=detectfile)
+        self.assertEqual(v.failures, 1)
+        # Repeats of values from earlier chunks are reported, but the
+        # earlier occurrences themselves have already been written out.
+        self.assertEqual(v.detection.n_failing_records, 3)
+        ddf = pd.read_csv(detectfile)
+        self.assertEqual(list(ddf['RowNumber']), [4, 5, 7])
+
+    def testDetectPerConstraintChunkedNulls(self):
+        # Fields for constraints that pass in a chunk have nulls for null
+        # values, as they do in the whole-frame output
+        csv_path = os.path.join(self.tmp_dir, 'nulls.csv')
+        pd.DataFrame({'a': [1, None, 5, None, 20, None, 3, 4]}).to_csv(
+            csv_path, index=False)
+        constraints_path = os.path.join(self.tmp_dir, 'nulls.tdda')
+        constraints = DatasetConstraints([
+            FieldConstraints('a', [TypeConstraint('real'),
+                                   MinConstraint(0),
+                                   MaxConstraint(10)])
+        ])
+        with open(constraints_path, 'w') as f:
+            f.write(constraints.to_json())
+        wholefile = os.path.join(self.tmp_dir, 'nulls_detect.csv')
+        chunkedfile = os.path.join(self.tmp_dir, 'nulls_detect_chunked.csv')
+        detect_df(pd.read_csv(csv_path), constraints_path,
+                  outpath=wholefile, per_constraint=True, write_all=True,
+                  output_fields=['a'])
+        detect_csv_chunked(csv_path, constraints_path, outpath=chunkedfile,
+                           chunksize=2, per_constraint=True, write_all=True,
+                           output_fields=['a'])
+        fields = ['a', 'a_max_ok', 'n_failures']
+        whole = pd.read_csv(wholefile)
+        chunked = pd.read_csv(chunkedfile)
+        self.assertNotIn('a_min_ok', whole)
+        self.assertEqual(chunked[fields].to_string(),
+                         whole[fields].to_string())
+        self.assertEqual(list(chunked['a_min_ok'].isnull()),
+                         list(chunked['a'].isnull()))
+
     def testDetectElements118_csv_to_csv(self):
         self.detectElements('csv', 'csv')
 
@@ -1193,6 +1479,118 @@ class TestPandasMultipleConstraintGeneration(ReferenceTestCase):
     def testConstraintGenerationWithRex(self):
         self.constraintsGenerationTest(inc_rex=True)
 
+    def testFieldProfile(self):
+        df = pd.DataFrame({
+            'i': [3, 1, None, 1, 2],
+            's': ['ab', None, 'a', 'αβγ', 'a'],
+            'n': [None] * 5,
+        })
+        disco = pdc.PandasConstraintDiscoverer(df)
+        self.assertEqual(disco.calc_field_profile('i', 'real'),
+                         {'null_count': 1, 'non_null_count': 4,
+                          'min': 1.0, 'max': 3.0})
+        self.assertEqual(disco.calc_field_profile('s', 'string'),
+                         {'null_count': 1, 'non_null_count': 4,
+                          'nunique': 3, 'uniques': ['a', 'ab', 'αβγ'],
+                          'min_length': 1, 'max_length': 3})
+        self.assertEqual(disco.calc_field_profile('n', 'string'),
+                         {'null_count': 5, 'non_null_count': 0,
+                          'nunique': 0, 'uniques': []})
+
+        # With max_uniques, the distinct values are only collected
+        # if there are few enough of them (and otherwise, nunique is
+        # only a lower bound, since 's' has duplicates)
+        self.assertEqual(disco.calc_field_profile('s', 'string',
+                                                  max_uniques=2),
+                         {'null_count': 1, 'non_null_count': 4,
+                          'nunique': 3,
+                          'min_length': 1, 'max_length': 3})
+        self.assertEqual(disco.calc_field_profile('s', 'string',
+                                                  max_uniques=3)['uniques'],
+                         ['a', 'ab', 'αβγ'])
+
+        # The profile must agree with the individual calculations
+        for col in ('i', 's'):
+            type_ = disco.calc_tdda_type(col)
+            profile = disco.calc_field_profile(col, type_)
+            self.assertEqual(profile['null_count'],
+                             disco.calc_null_count(col))
+            self.assertEqual(profile['non_null_count'],
+                             disco.calc_non_null_count(col))
+
+    def testBoundedUniqueValues(self):
+        values = pd.Series(['v%d' % (i % 3000) for i in range(100000)])
+        self.assertEqual(len(pdc.bounded_unique_values(values)), 3000)
+        few = pdc.bounded_unique_values(values, 21)
+        self.assertEqual(len(few), 21)
+        self.assertTrue(set(few) <= set(values))
+        self.assertEqual(sorted(pdc.bounded_unique_values(values[:20], 21)),
+                         sorted(set(values[:20])))
+
+    def testAllDistinct(self):
+        distinct = pd.Series(['v%d' % i for i in range(10000)])
+        self.assertTrue(pdc.all_distinct(distinct))
+        self.assertTrue(pdc.all_distinct(distinct[:0]))
+        self.assertFalse(pdc.all_distinct(
+            pd.concat([distinct, pd.Series(['v9999'])], ignore_index=True)))
+
+        # Beyond max_uniques, a profile's nunique is exact only if the
+        # values are all distinct (which is all no_duplicates needs)
+        df = pd.DataFrame({'d': distinct,
+                           'r': ['v%d' % (i % 5000) for i in range(10000)]})
+        disco = pdc.PandasConstraintDiscoverer(df)
+        d = disco.calc_field_profile('d', 'string', max_uniques=20)
+        self.assertEqual(d['nunique'], 10000)
+        self.assertNotIn('uniques', d)
+        r = disco.calc_field_profile('r', 'string', max_uniques=20)
+        self.assertEqual(r['nunique'], 21)
+        self.assertEqual(discover_df(df).to_dict()['fields']['d']
+                                                   ['no_duplicates'], True)
+        self.assertNotIn('no_duplicates',
+                         discover_df(df).to_dict()['fields']['r'])
+
+    def testDistinctSketch(self):
+        values = pd.Series(['id%d' % (i % 5000) for i in range(20000)])
+        sketch = pdc.pandas_distinct_sketch(values)
+        low, high = sketch.bounds()
+        self.assertTrue(low < 5000 < high)
+        self.assertTrue(high - low < 500)
+
+        # Vectorized sketches agree with the pure Python ones, and can
+        # be merged across chunks
+        hashes = pd.util.hash_pandas_object(values, index=False).values
+        expected = HyperLogLog()
+        expected.update(int(h) for h in hashes)
+        self.assertEqual(sketch.registers, expected.registers)
+        merged = pdc.pandas_distinct_sketch(values[:7000])
+        merged.merge(pdc.pandas_distinct_sketch(values[7000:]))
+        self.assertEqual(merged.registers, sketch.registers)
+
+    def testApproxDistinctDiscovery(self):
+        n = 3000
+        df = pd.DataFrame({
+            'many': ['m%d' % (i % 1000) for i in range(n)],
+            'unique': ['u%d' % i for i in range(n)],
+            'cats': ['c%d' % (i % 20) for i in range(n)],
+            'ints': [i // 2 for i in range(n)],
+        })
+        disco = pdc.PandasConstraintDiscoverer(df, approx_distinct=True)
+        self.assertEqual(disco.approximate_nunique('cats', 'string'), None)
+        self.assertEqual(disco.approximate_nunique('unique', 'string'), None)
+        self.assertTrue(abs(disco.approximate_nunique('many', 'string')
+                            - 1000) < 50)
+        self.assertTrue(abs(disco.approximate_nunique('ints', 'int')
+                            - 1500) < 75)
+        approx = discover_df(df, approx_distinct=True)
+        self.assertEqual(approx.to_dict()['fields'],
+                         discover_df(df).to_dict()['fields'])
+
+        csv_path = os.path.join(TESTDATA_DIR, 'elements92.csv')
+        df = pd.read_csv(csv_path)
+        approx = discover_df(df, approx_distinct=True)
+        self.assertEqual(approx.to_dict()['fields'],
+                         discover_df(df).to_dict()['fields'])
+
     def constraintsGenerationTest(self, inc_rex=False):
         csv_path = os.path.join(TESTDATA_DIR, 'elements92.csv')
         df = pd.read_csv(csv_path)
@@ -1319,6 +1717,22 @@ class CommandLineHelper:
                                                 'Constraints passing: 60\n'
                                                 'Constraints failing: 1'))
 
+    def testVerifyE118ParallelCmd(self):
+        argv = ['tdda', 'verify', self.e118csv, self.e92tdda_correct,
+                '--jobs', '4']
+        result = self.execute_command(argv)
+        self.assertTrue(result.strip().endswith('SUMMARY:\n\n'
+                                                'Constraints passing: 57\n'
+                                                'Constraints failing: 15'))
+
+    def testVerifyE118ChunkedCmd(self):
+        argv = ['tdda', 'verify', self.e118csv, self.e92tdda_correct,
+                '--chunksize', '20']
+        result = self.execute_command(argv)
+        self.assertTrue(result.strip().endswith('SUMMARY:\n\n'
+                                                'Constraints passing: 57\n'
+                                                'Constraints failing: 15'))
+
     def testVerifyEpsilon(self):
         argv = ['tdda', 'verify', self.e118csv, self.e92tdda_correct,
                 '--fields']
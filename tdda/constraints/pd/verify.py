@@ -25,6 +25,13 @@ Parameters:
 If no constraints file is provided, a file with the same path as the
 input file, with a .tdda extension will be tried.
 
+Additional optional flags are:
+
+  * --jobs N
+      Verify the fields in parallel, using N worker threads.
+  * --chunksize N
+      Read a CSV input file N records at a time, rather than all at once,
+      so that files larger than memory can be verified.
 '''
 
 import os
@@ -49,10 +56,12 @@ except ImportError:
 
 from tdda import __version__
 from tdda.constraints.flags import verify_parser, verify_flags
-from tdda.constraints.pd.constraints import verify_df, load_df
+from tdda.constraints.pd.constraints import (verify_df, verify_csv_chunked,
+                                             load_df, file_format)
 
 
-def verify_df_from_file(df_path, constraints_path, verbose=True, **kwargs):
+def verify_df_from_file(df_path, constraints_path, verbose=True,
+                        chunksize=None, **kwargs):
     if df_path == '-' or df_path is None:
         df_path = StringIO(sys.stdin.read())
     if constraints_path is None:
@@ -64,8 +73,12 @@ def verify_df_from_file(df_path, constraints_path, verbose=True, **kwargs):
             print('No constraints file specified.', file=sys.stderr)
             sys.exit(1)
 
-    df = load_df(df_path)
-    v = verify_df(df, constraints_path, **kwargs)
+    if chunksize and file_format(df_path) == 'csv':
+        v = verify_csv_chunked(df_path, constraints_path,
+                               chunksize=chunksize, **kwargs)
+    else:
+        df = load_df(df_path)
+        v = verify_df(df, constraints_path, **kwargs)
     if verbose:
         print(v)
     return v
@@ -76,6 +89,12 @@ def pd_verify_parser():
     parser.add_argument('input', nargs=1, help='CSV or feather file')
     parser.add_argument('constraints', nargs='?',
                         help='constraints file to verify against')
+    parser.add_argument('-j', '--jobs', type=int,
+                        help='number of worker threads to use to verify '
+                             'fields in parallel')
+    parser.add_argument('--chunksize', type=int,
+                        help='number of records to read at a time from '
+                             'a CSV file')
     return parser
 
 
@@ -85,6 +104,10 @@ def pd_verify_params(args):
     flags = verify_flags(parser, args, params)
     params['df_path'] = flags.input[0] if flags.input else None
     params['constraints_path'] = flags.constraints
+    if flags.jobs is not None:
+        params['n_jobs'] = flags.jobs
+    if flags.chunksize is not None:
+        params['chunksize'] = flags.chunksize
     return params
 
 
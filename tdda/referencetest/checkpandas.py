@@ -407,6 +407,56 @@ def default_csv_loader(csvfile, **kwargs):
         - na_values             are the empty string, ``"NaN"``, and ``"NULL"``
         - keep_default_na       is ``False``
     """
+    options = default_csv_options(**kwargs)
+
+    try:
+        df = pd.read_csv(csvfile, **options)
+    except pd.errors.ParserError:
+        # Pandas CSV reader gets confused by stutter-quoted text that
+        # also includes escapechars. So try again, with no escapechar.
+        del options['escapechar']
+        df = pd.read_csv(csvfile, **options)
+
+    if options.get('infer_datetime_format'):
+        df = infer_datetime_columns(df)
+    return df
+
+
+def default_csv_chunk_loader(csvfile, chunksize, **kwargs):
+    """
+    Generator for reading a csv file in chunks of (at most) *chunksize*
+    rows, yielding a pandas DataFrame for each chunk.
+
+    This uses the same defaults as :py:func:`default_csv_loader`, and
+    infers datetime columns in the same way, separately for each chunk.
+    It retries without an escapechar if the reader fails on the first
+    chunk, but a parser failure later in the file is raised, since
+    earlier chunks have already been consumed by then.
+    """
+    options = default_csv_options(**kwargs)
+    options['chunksize'] = chunksize
+    try:
+        reader = pd.read_csv(csvfile, **options)
+        chunk = next(reader, None)
+    except pd.errors.ParserError:
+        del options['escapechar']
+        if hasattr(csvfile, 'seek'):
+            csvfile.seek(0)
+        reader = pd.read_csv(csvfile, **options)
+        chunk = next(reader, None)
+    while chunk is not None:
+        if options.get('infer_datetime_format'):
+            chunk = infer_datetime_columns(chunk)
+        yield chunk
+        chunk = next(reader, None)
+
+
+def default_csv_options(**kwargs):
+    """
+    The default options for pd.read_csv(), used by
+    :py:func:`default_csv_loader`, updated with any keyword arguments
+    provided.
+    """
     options = {
         'index_col': None,
         'infer_datetime_format': True,
@@ -417,33 +467,30 @@ def default_csv_loader(csvfile, **kwargs):
         'keep_default_na': False,
     }
     options.update(kwargs)
+    return options
 
-    try:
-        df = pd.read_csv(csvfile, **options)
-    except pd.errors.ParserError:
-        # Pandas CSV reader gets confused by stutter-quoted text that
-        # also includes escapechars. So try again, with no escapechar.
-        del options['escapechar']
-        df = pd.read_csv(csvfile, **options)
 
+def infer_datetime_columns(df):
+    """
+    Returns a copy of the DataFrame, with any string columns whose
+    values can all be safely converted to datetimes converted.
+    """
     # the reader won't have inferred any datetime columns (even though we
     # told it to), because we didn't explicitly tell it the column names
     # in advance. so.... we'll do it by hand (looking at string columns, and
     # seeing if we can convert them safely to datetimes).
-    if options.get('infer_datetime_format'):
-        colnames = df.columns.tolist()
-        for c in colnames:
-            if df[c].dtype == pd.np.dtype('O'):
-                try:
-                    datecol = pd.to_datetime(df[c])
-                    if datecol.dtype == pd.np.dtype('datetime64[ns]'):
-                        df[c] = datecol
-                except Exception as e:
-                    pass
-        ndf = pd.DataFrame()
-        for c in colnames:
-            ndf[c] = df[c]
-
+    colnames = df.columns.tolist()
+    for c in colnames:
+        if df[c].dtype == pd.np.dtype('O'):
+            try:
+                datecol = pd.to_datetime(df[c])
+                if datecol.dtype == pd.np.dtype('datetime64[ns]'):
+                    df[c] = datecol
+            except Exception as e:
+                pass
+    ndf = pd.DataFrame()
+    for c in colnames:
+        ndf[c] = df[c]
     return ndf
 
 
@@ -45,6 +45,18 @@ FLAGS are optional flags. Currently::
 
   -flf, --fixed     Use fixed length fragments
 
+  -s N, --sample N  If there are more than N distinct strings, find the
+                    regular expressions from a sample of about N of them,
+                    stratified by length and character classes, adding
+                    in any strings that the results do not match, and
+                    repeating.
+
+  --seed N          Seed for the random sampling (so that the results
+                    are repeatable). Default 1597.
+
+  -j N, --jobs N    Refine the patterns for different kinds of strings
+                    in up to N processes in parallel.
+
 Python API
 ----------
 
@@ -59,6 +71,8 @@ from __future__ import print_function
 from __future__ import absolute_import
 from __future__ import unicode_literals
 
+import copy
+import multiprocessing
 import random
 import re
 import string
@@ -67,10 +81,16 @@ import sys
 from collections import Counter, defaultdict, namedtuple, OrderedDict
 from pprint import pprint
 
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
 from tdda import __version__
 
 str_type = unicode if sys.version_info[0] < 3 else str
 bytes_type = str if sys.version_info[0] < 3 else bytes
+unicode_chr = unichr if sys.version_info[0] < 3 else chr
 
 USAGE = re.sub(r'^(.*)Python API.*$', '', __doc__.replace('Usage::', 'Usage:'))
 
@@ -94,21 +114,20 @@ MAX_PATTERNS = None
 MIN_DIFF_STRINGS_PER_PATTERN = 1
 MIN_STRINGS_PER_PATTERN = 1
 
-USE_SAMPLING = False
+SAMPLE_SEED = 1597  # Default seed for sampled extraction
 
 RE_FLAGS = re.UNICODE | re.DOTALL
 
 
 class SIZE(object):
-    if USE_SAMPLING:
-        DO_ALL = 100            # Use all examples up to this many
-    else:
-        DO_ALL = 100000000      # Use all examples up to this many
-    DO_ALL_EXCEPTIONS = 4000    # Add in all failyres up to this many
-    N_PER_LENGTH = 64           # When sampling, use this many
+    DO_ALL_EXCEPTIONS = 4000    # Add in all failures up to this many
+    N_PER_LENGTH = 64           # When sampling, use at least this many
                                 # of each length
-    MAX_SAMPLED_ATTEMPTS = 2    # Give up and use all after this many
-                                # sampled attempts
+    N_CANDIDATES = 4            # When sampling, stratify by signature
+                                # a random selection of this many times
+                                # the number wanted of each length
+    MAX_SAMPLED_ATTEMPTS = 2    # Give up and use all failures after this
+                                # many sampled attempts
 
     MAX_PUNC_IN_GROUP = 5
     MAX_STRINGS_IN_GROUP = 10
@@ -164,6 +183,26 @@ class Category(object):
         self.re_multiple = poss_term_cre(re_string + '+')
 
 
+class CharClasses(dict):
+    """
+    Mapping from character ordinals to category codes, for use as a
+    translation table (with unicode.translate), so that strings can
+    be classified in bulk.
+
+    The codes for ASCII characters are computed up front, and those for
+    any other characters, using classify, on first use.
+    """
+    def __init__(self, classify):
+        dict.__init__(self)
+        self.classify = classify
+        for i in range(128):
+            self[i] = classify(unicode_chr(i))
+
+    def __missing__(self, i):
+        code = self[i] = self.classify(unicode_chr(i))
+        return code
+
+
 UNICHRS = True  # controls whether to include a unicode letter class
 UNIC = 'Ḉ'  # K
 COARSEST_ALPHANUMERIC_CODE = UNIC if UNICHRS else 'C'
@@ -236,6 +275,33 @@ class Categories(object):
             ['UAlphaNumeric'] if UNICHRS else []
 
         )
+        self.coarse_codes = CharClasses(self.coarse_class)
+        self.fine_codes = CharClasses(self.fine_class)
+
+    def coarse_class(self, c):
+        """
+        Classify character into one of the coarse categories
+        """
+        for cat in self.SpecificCoarseCats:
+            if re.match(cat.re_single, c):
+                return cat.code
+        assert re.match(self.Other.re_single, c)
+        return self.Other.code
+
+    def fine_class(self, c):
+        """
+        Map a character in coarse class 'C' (AlphaNumeric) to a fine class.
+        """
+        if c.isdigit():
+            return self.Digit.code
+        elif 'a' <= c <= 'z':
+            return self.letter.code
+        elif 'A' <= c <= 'Z':
+            return self.LETTER.code
+        elif c in self.extra_letters or not UNICHRS:
+            return self.LETTER_.code
+        else:
+            return self.ULetter_.code
 
     def Punctuation(self, el_re):
         specials = re.compile(r'[A-Za-z0-9\s%s]' % el_re, RE_FLAGS)
@@ -320,16 +386,28 @@ class Extractor(object):
                  max_patterns=MAX_PATTERNS,
                  min_diff_strings_per_pattern=MIN_DIFF_STRINGS_PER_PATTERN,
                  min_strings_per_pattern=MIN_STRINGS_PER_PATTERN,
+                 sample=None, seed=SAMPLE_SEED, n_jobs=None,
                  verbose=VERBOSITY):
         """
         Set class attributes and clean input strings.
         Also performs exraction unless extract=False.
+
+        If n_jobs is set (to more than 1), the patterns for examples with
+        different coarse signatures are refined in up to that many
+        processes in parallel.
+
+        If sample is set, and there are more distinct examples than that,
+        extraction uses a sample of (about) that many of them, and then
+        adds in any examples not matched by the results, and repeats
+        (see sampled_extract). The sample is chosen using a random number
+        generator seeded with seed, so is repeatable.
         """
         self.verbose = verbose
         self.example_freqs = Counter()      # Each string stored only once;
                                             # but multiplicity stored
-        if USE_SAMPLING:
-            self.by_length = defaultdict(list)  # Also store examples by length
+        self.sample_size = sample
+        self.seed = seed
+        self.n_jobs = n_jobs
         self.n_stripped = 0                 # Number that required stripping
         self.n_empties = 0                  # Number of empty string found
         self.n_nulls = 0                    # Number of nulls found
@@ -340,6 +418,7 @@ class Extractor(object):
         self.tag = tag                      # Returned tagged (grouped) RE
         self.clean(examples)                # Fill in previous attributes
         self.results = None
+        self.signature_index = None         # Examples keyed on signature
         self.warnings = []
         self.n_too_many_groups = 0
         self.Cats = Categories(self.thin_extras(extra_letters),
@@ -360,34 +439,45 @@ class Extractor(object):
         if len(self.example_freqs) == 0:
             self.results = None
 
-        if len(self.example_freqs) <= SIZE.DO_ALL:
+        if (self.sample_size is None
+                or len(self.example_freqs) <= self.sample_size):
             self.results = self.batch_extract(self.example_freqs.keys())
-        else:  # Future poss optimization; not really used for now.
-            examples = self.sample(SIZE.N_PER_LENGTH)
-            attempt = 1
-            failures = []
-            while attempt <= SIZE.MAX_SAMPLED_ATTEMPTS + 1:
-                if self.verbose:
-                    print('Pass %d' % attempt)
-                    print('Examples: %s ... %s' % (examples[:5],
-                                                   examples[-5:]))
-                self.results = self.batch_extract(examples)
-                failures = self.find_non_matches()
-                if self.verbose:
-                    print('REs:', self.results.rex)
-                    print('Failures (%d): %s' % (len(failures),
-                                                 failures[:5]))
-                if len(failures) == 0:
-                    break
-                elif (len(failures) <= SIZE.DO_ALL_EXCEPTIONS
-                      or attempt > SIZE.MAX_SAMPLED_ATTEMPTS):
-                    examples.extend(failures)
-                else:
-                    examples.extend(random.sample(failures,
-                                                  SIZE.DO_ALL_EXCEPTIONS))
-                attempt += 1
+        else:
+            self.sampled_extract()
         self.add_warnings()
 
+    def sampled_extract(self):
+        """
+        Perform the extraction on a sample of the examples, then add in
+        (up to SIZE.DO_ALL_EXCEPTIONS of) the examples that the results
+        fail to match, and repeat, until all the examples are matched.
+        After SIZE.MAX_SAMPLED_ATTEMPTS, all the failures are added in.
+        """
+        rng = random.Random(self.seed)
+        examples = self.sample(self.sample_size, rng)
+        attempt = 1
+        failures = []
+        while attempt <= SIZE.MAX_SAMPLED_ATTEMPTS + 1:
+            if self.verbose:
+                print('Pass %d' % attempt)
+                print('Examples: %s ... %s' % (examples[:5],
+                                               examples[-5:]))
+            self.results = self.batch_extract(examples)
+            failures = self.find_non_matches()
+            if self.verbose:
+                print('REs:', self.results.rex)
+                print('Failures (%d): %s' % (len(failures),
+                                             failures[:5]))
+            if len(failures) == 0:
+                break
+            elif (len(failures) <= SIZE.DO_ALL_EXCEPTIONS
+                  or attempt >= SIZE.MAX_SAMPLED_ATTEMPTS):
+                examples.extend(failures)
+            else:
+                examples.extend(rng.sample(failures,
+                                           SIZE.DO_ALL_EXCEPTIONS))
+            attempt += 1
+
     def add_warnings(self):
         if self.n_too_many_groups:
             self.warnings.append('%d string%s assigned to .{m,n} for needing '
@@ -441,11 +531,10 @@ class Extractor(object):
 
         vrles = to_vrles(rle_freqs.keys())
         vrle_freqs = Counter()
-        refined = []
         for r in vrles:
             vrle_freqs[r] += 1
-            grouped = self.refine_groups(r, self.example_freqs)
-            refined.append(grouped)
+        self.signature_index = self.partition(examples, rles)
+        refined = self.refine_all(vrles, self.signature_index)
         merged = self.merge_patterns(refined)
         if self.specialize:
             merged = self.specialize_patterns(merged)
@@ -455,6 +544,77 @@ class Extractor(object):
                               merged, mergedrex, mergedfrags,
                               extractor=self)
 
+    def partition(self, examples, rles):
+        """
+        Partition examples by the signatures of their (coarse) run-length
+        encodings, rles, returning a dictionary of lists of examples,
+        keyed on signature.
+        """
+        partitions = OrderedDict()
+        for (x, rle) in zip(examples, rles):
+            sig = signature(rle)
+            if sig in partitions:
+                partitions[sig].append(x)
+            else:
+                partitions[sig] = [x]
+        return partitions
+
+    def signature_examples(self, vrle, partitions):
+        """
+        Return the examples, from the partitions (see partition), that can
+        match the VRLE given.
+
+        Usually, these are just the examples with the same signature as the
+        VRLE, but the Other class's regular expression also matches
+        non-ASCII alphanumerics, so a VRLE including Other can also match
+        examples whose signatures have alphanumerics in place of (or
+        merged with) its Other runs. For these, the candidate signatures
+        are found with a regular expression over signatures. VRLEs with
+        the Any class can match anything.
+        """
+        sig = signature(vrle)
+        if CODE.ANY in sig:
+            return [x for xs in partitions.values() for x in xs]
+        other = self.Cats.Other.code
+        if other not in sig:
+            return partitions.get(sig, [])
+        alnum = re.escape(COARSEST_ALPHANUMERIC_CODE)
+        parts = []
+        for code in sig:
+            if code == COARSEST_ALPHANUMERIC_CODE:
+                parts.append(alnum + '?')
+            elif code == other:
+                parts.append('[%s%s]*' % (alnum, re.escape(other)))
+            else:
+                parts.append(re.escape(code))
+        sig_re = cre('^%s$' % ''.join(parts))
+        return [x for (s, xs) in partitions.items() if re.match(sig_re, s)
+                  for x in xs]
+
+    def refine_all(self, vrles, partitions):
+        """
+        Refine each of the VRLEs, using only the examples (from
+        partitions) that can match it (see signature_examples).
+
+        If n_jobs is more than 1, the VRLEs are refined in a pool of
+        (up to) that many processes.
+        """
+        tasks = [(r, self.signature_examples(r, partitions)) for r in vrles]
+        n_jobs = min(self.n_jobs or 1, len(tasks))
+        if n_jobs <= 1:
+            return [self.refine_groups(r, x) for (r, x) in tasks]
+        worker = copy.copy(self)
+        worker.example_freqs = Counter()
+        worker.signature_index = None
+        worker.results = None
+        pool = multiprocessing.Pool(n_jobs, initializer=set_refiner,
+                                    initargs=(worker,))
+        try:
+            return pool.map(refine_task, tasks)
+        finally:
+            pool.close()
+            pool.join()
+
     def specialize(self, patterns):
         """
         Check all the catpure groups in each patterns and simplify any
@@ -466,6 +626,8 @@ class Extractor(object):
         """
         Classify each character in a string into one of the coarse categories
         """
+        if isinstance(s, str_type):
+            return s.translate(self.Cats.coarse_codes)
         return ''.join(self.coarse_classify_char(c) for c in s)
 
 
@@ -473,12 +635,7 @@ class Extractor(object):
         """
         Classify character into one of the coarse categories
         """
-        Cats = self.Cats
-        for cat in Cats.SpecificCoarseCats:
-            if re.match(cat.re_single, c):
-                return cat.code
-        assert re.match(Cats.Other.re_single, c)
-        return Cats.Other.code
+        return self.Cats.coarse_codes[ord(c)]
 
 
     def run_length_encode_coarse_classes(self, s):
@@ -656,39 +813,70 @@ class Extractor(object):
     def similarity(self, p, q):
         return 1
 
-    def sample(self, nPerLength):
+    def sample(self, n, rng):
         """
-        Sample strings for potentially faster induction.
-        Only used if over a hundred million distinct strings are given.
-        For now.
+        Sample (about n) strings for faster induction, using the
+        random number generator rng.
+
+        The same number of strings is sampled of each length (at least
+        SIZE.N_PER_LENGTH), or all of them, for lengths with fewer.
+        Within each length, the sample is spread as evenly as possible
+        across the coarse signatures (sequences of coarse character
+        classes) of a random selection of SIZE.N_CANDIDATES times as
+        many strings, so that rarer forms are still represented.
         """
-        lengths = self.by_length.keys()
-        lengths.sort()
+        by_length = defaultdict(list)
+        for x in self.example_freqs:
+            by_length[len(x)].append(x)
+        per_length = max(SIZE.N_PER_LENGTH, n // len(by_length))
         examples = []
-        for L in lengths:
-            x = self.by_length[L]
-            if len(self.by_length[L]) <= nPerLength:
+        for L in sorted(by_length):
+            x = by_length[L]
+            if len(x) <= per_length:
                 examples.extend(x)
-            else:
-                examples.extend(random.sample(x, nPerLength))
+                continue
+            candidates = rng.sample(x, min(len(x),
+                                           per_length * SIZE.N_CANDIDATES))
+            by_signature = OrderedDict()
+            for c in candidates:
+                sig = signature(self.run_length_encode_coarse_classes(c))
+                by_signature.setdefault(sig, []).append(c)
+            groups = list(by_signature.values())
+            chosen = []
+            i = 0
+            while len(chosen) < per_length:  # one from each signature
+                for g in groups:             # in turn
+                    if i < len(g):
+                        chosen.append(g[i])
+                        if len(chosen) == per_length:
+                            break
+                i += 1
+            examples.extend(chosen)
         return examples
 
     def find_non_matches(self):
         """
         Returns all example strings that do not match any of the regular
         expressions in results.
+
+        The regular expressions are combined into a single alternation
+        (where possible), so that each example is only matched once.
         """
-        failures = self.example_freqs.keys()
-        if self.results:
-            for r in self.results.rex:
-                cr = cre(r)
-                i = len(failures) - 1
-                while i >= 0:
-                    f = failures[i]
-                    if re.match(cr, f):
-                        del failures[i]
-                    i -= 1
-        return failures
+        examples = list(self.example_freqs.keys())
+        if not self.results or not self.results.rex:
+            return examples
+        try:
+            matchers = [re.compile('|'.join('(?:%s)' % r
+                                            for r in self.results.rex),
+                                   RE_FLAGS).match]
+        except (re.error, AssertionError, OverflowError):
+            # too many groups, or repeated group names
+            matchers = [cre(r).match for r in self.results.rex]
+        if len(matchers) == 1:
+            match = matchers[0]
+            return [x for x in examples if match(x) is None]
+        return [x for x in examples
+                if all(match(x) is None for match in matchers)]
 
     def pattern_matches(self):
         compiled = [cre(r) for r in self.results.rex]
@@ -839,30 +1027,8 @@ class Extractor(object):
                                    # Either 'cos not coarse class C
                                    # Or because previously found wanting...
 
-        rlefc = []      # run-length encoded list of fine classes
-        rlec = []       # run-length encoded list of characters
-        last_fc = None  # last fine class
-        last_c = None   # last character
-
-        for c in s:
-            fc = self.fine_class(c)
-            if fc == last_fc:
-                nfc += 1
-            else:
-                if last_fc:
-                    rlefc.append((last_fc, nfc))
-                last_fc = fc
-                nfc = 1
-            if c == last_c:
-                nc += 1
-            else:
-                if last_c:
-                    rlec.append((last_c, nc))
-                last_c = c
-                nc = 1
-        if last_c:  # i.e. there were any; probably always the case
-            rlefc.append((last_fc, nfc))
-            rlec.append((last_c, nc))
+        rlefc = run_length_encode(self.fine_classify(s))  # fine classes
+        rlec = run_length_encode(s)                         # characters
 
         v = self.variableLengthFrags
         return (expand_or_falsify_vrle(rlefc, rlefc_in, variableLength=v),
@@ -870,21 +1036,20 @@ class Extractor(object):
                                        variableLength=v))
 
 
+    def fine_classify(self, s):
+        """
+        Map each character in a string of characters in coarse class 'C'
+        (AlphaNumeric) to its fine class.
+        """
+        if isinstance(s, str_type):
+            return s.translate(self.Cats.fine_codes)
+        return ''.join(self.fine_class(c) for c in s)
+
     def fine_class(self, c):
         """
         Map a character in coarse class 'C' (AlphaNumeric) to a fine class.
         """
-        cats = self.Cats
-        if c.isdigit():
-            return cats.Digit.code
-        elif 'a' <= c <= 'z':
-            return cats.letter.code
-        elif 'A' <= c <= 'Z':
-            return cats.LETTER.code
-        elif c in cats.extra_letters or not UNICHRS:
-            return cats.LETTER_.code
-        else:
-            return cats.ULetter_.code
+        return self.Cats.fine_codes[ord(c)]
 
     def fragment2re(self, fragment, tagged=False, as_re=True):
         (c, m, M) = fragment[:3]
@@ -1059,6 +1224,26 @@ class Extractor(object):
         return str_type(self.results or 'No results (yet)')
 
 
+REFINER = None  # Extractor used by refine_task in pool processes
+
+
+def set_refiner(extractor):
+    """
+    Pool process initializer, setting the Extractor used by refine_task.
+    """
+    global REFINER
+    REFINER = extractor
+
+
+def refine_task(task):
+    """
+    Refine a VRLE against a list of examples, given as a (vrle, examples)
+    pair, in a pool process.
+    """
+    (vrle, examples) = task
+    return REFINER.refine_groups(vrle, examples)
+
+
 def rex_coverage(patterns, example_freqs, dedup=False):
     """
     Given a list of regular expressions and a dictionary of examples
@@ -1113,9 +1298,9 @@ def rex_full_incremental_coverage(patterns, example_freqs, dedup=False,
             excluding duplicates
     """
     patterns, indexes = terminate_patterns_and_sort(patterns)
-    matrix, deduped = coverage_matrices(patterns, example_freqs)
-    return matrices2incremental_coverage(patterns, matrix, deduped, indexes,
-                                         example_freqs, dedup=dedup,)
+    matches, freqs = coverage_matrices(patterns, example_freqs)
+    return matrices2incremental_coverage(patterns, matches, freqs, indexes,
+                                         dedup=dedup)
 
 
 def terminate_patterns_and_sort(patterns):
@@ -1209,59 +1394,112 @@ def rex_incremental_coverage(patterns, example_freqs, dedup=False, debug=False):
 
 
 def coverage_matrices(patterns, example_freqs):
-    # Compute the 2 coverage matrices:
-    #   matrix:  1 row per example, with a count of number of matches
-    #   deduped: 1 row per example, with a boolean where it matches
+    """
+    Computes the coverage matrices for a list of (terminated) regular
+    expressions and a dictionary of examples and their frequencies:
 
-    matrix = []
-    deduped = []  # deduped version of same
-    rexes = [re.compile(p, RE_FLAGS) for p in patterns]
-    for (x, n) in example_freqs.items():
-        row = [n if re.match(r, x) else 0 for r in rexes]
-        matrix.append(row)
-        deduped.append([1 if r else 0 for r in row])
-    return matrix, deduped
+        ``matches``:
+            a boolean matrix, with a row per pattern and a column
+            per example, which is true where the pattern matches
+            the example
 
+        ``freqs``:
+            a vector of the frequencies of the examples.
 
-def matrices2incremental_coverage(patterns, matrix, deduped, indexes,
-                                  example_freqs, dedup=False):
+    These are numpy arrays if numpy is available, and lists otherwise.
+    """
+    examples = list(example_freqs.keys())
+    rexes = [re.compile(p, RE_FLAGS) for p in patterns]
+    if np is None:
+        matches = [[r.match(x) is not None for x in examples] for r in rexes]
+        freqs = [example_freqs[x] for x in examples]
+    else:
+        matches = np.zeros((len(rexes), len(examples)), dtype=bool)
+        for p, r in enumerate(rexes):
+            match = r.match
+            matches[p] = np.fromiter((match(x) is not None for x in examples),
+                                     dtype=bool, count=len(examples))
+        freqs = np.fromiter((example_freqs[x] for x in examples),
+                            dtype=np.int64, count=len(examples))
+    return matches, freqs
+
+
+def matrices2incremental_coverage(patterns, matches, freqs, indexes,
+                                  dedup=False):
     """
     Find patterns, in order of # of matches, and pull out freqs.
-    Then set overlapping matches to zero and repeat.
+    Then remove the examples matched from the totals and repeat.
     Returns ordered dict, sorted by incremental match rate,
     with number of (previously unaccounted for) strings matched.
+
+    The totals for each pattern are maintained incrementally, by
+    subtracting the examples matched by each pattern chosen,
+    so that each example is only subtracted once.
     """
+    if np is None:
+        return matrices2incremental_coverage_lists(patterns, matches, freqs,
+                                                   indexes, dedup=dedup)
     results = OrderedDict()
-    sort_matrix = deduped if dedup else matrix
-    np = len(patterns)
-    zeros = [0] * np
-    pattern_freqs = [sum(matrix[i][r] for i, x in enumerate(example_freqs))
-                     for r in range(np)]
-    pattern_uniqs = [sum(deduped[i][r] for i, x in enumerate(example_freqs))
-                     for r in range(np)]
-    while len(results) < np:
-        totals = [sum(row[i] for row in matrix) for i in range(np)]
-        uniq_totals = [sum(row[i] for row in deduped) for i in range(np)]
-        M, uM = max(totals), max(uniq_totals)
-        if dedup:
-            sort_totals = uniq_totals
-            target = uM
-        else:
-            sort_totals = totals
-            target = M
+    npatterns = len(patterns)
+    pattern_freqs = matches.dot(freqs)
+    pattern_uniqs = matches.sum(axis=1)
+    totals = pattern_freqs.copy()
+    uniq_totals = pattern_uniqs.copy()
+    remaining = np.ones(len(freqs), dtype=bool)
+    chosen = np.zeros(npatterns, dtype=bool)
+    while len(results) < npatterns:
+        sort_totals = uniq_totals if dedup else totals
+        p = int(np.argmax(np.where(chosen, -1, sort_totals)))  # first max
+        results[patterns[p]] = Coverage(n=int(pattern_freqs[p]),
+                                        n_uniq=int(pattern_uniqs[p]),
+                                        incr=int(totals[p]),
+                                        incr_uniq=int(uniq_totals[p]),
+                                        index=indexes[p])
+        chosen[p] = True
+        covered = remaining & matches[p]
+        if covered.any():
+            rows = matches[:, covered]
+            totals -= rows.dot(freqs[covered])
+            uniq_totals -= rows.sum(axis=1)
+            remaining &= ~covered
+    return results
+
+
+def matrices2incremental_coverage_lists(patterns, matches, freqs, indexes,
+                                        dedup=False):
+    """
+    Pure python version of matrices2incremental_coverage,
+    used when numpy is not available.
+    """
+    results = OrderedDict()
+    npatterns = len(patterns)
+    pattern_freqs = [sum(f for (m, f) in zip(row, freqs) if m)
+                     for row in matches]
+    pattern_uniqs = [sum(1 for m in row if m) for row in matches]
+    totals = list(pattern_freqs)
+    uniq_totals = list(pattern_uniqs)
+    remaining = set(range(len(freqs)))
+    chosen = set()
+    while len(results) < npatterns:
+        sort_totals = uniq_totals if dedup else totals
+        target = max(sort_totals[q] for q in range(npatterns)
+                     if q not in chosen)
         p = 0  # index of pattern
-        while sort_totals[p] < target:
+        while p in chosen or sort_totals[p] < target:
             p += 1
-        rex = patterns[p]
-        results[rex] = Coverage(n=pattern_freqs[p],
-                                n_uniq=pattern_uniqs[p],
-                                incr=totals[p],
-                                incr_uniq=uniq_totals[p],
-                                index=indexes[p])
-        for i, x in enumerate(example_freqs):
-            if matrix[i][p]:
-                matrix[i] = zeros
-                deduped[i] = zeros
+        results[patterns[p]] = Coverage(n=pattern_freqs[p],
+                                        n_uniq=pattern_uniqs[p],
+                                        incr=totals[p],
+                                        incr_uniq=uniq_totals[p],
+                                        index=indexes[p])
+        chosen.add(p)
+        covered = [i for i in remaining if matches[p][i]]
+        for i in covered:
+            for q in range(npatterns):
+                if matches[q][i]:
+                    totals[q] -= freqs[i]
+                    uniq_totals[q] -= 1
+            remaining.discard(i)
     return results
 
 
@@ -1454,6 +1692,7 @@ def extract(examples, tag=False, encoding=None, as_object=False,
             max_patterns=MAX_PATTERNS,
             min_diff_strings_per_pattern=MIN_DIFF_STRINGS_PER_PATTERN,
             min_strings_per_pattern=MIN_STRINGS_PER_PATTERN,
+            sample=None, seed=SAMPLE_SEED, n_jobs=None,
             verbose=VERBOSITY):
     """
     Extract regular expression(s) from examples and return them.
@@ -1467,6 +1706,15 @@ def extract(examples, tag=False, encoding=None, as_object=False,
     If as_object is set, the extractor object is returned,
     with results in .results.rex; otherwise, a list of regular
     expressions, as unicode strings is returned.
+
+    If sample is set, and there are more distinct examples than that,
+    the regular expressions are found from a (repeatable, given seed)
+    sample of about that many of them, extended with any examples that
+    they fail to match (see Extractor.sampled_extract).
+
+    If n_jobs is set (to more than 1), the patterns for examples with
+    different coarse signatures are refined in up to that many processes
+    in parallel.
     """
     if encoding:
         if isinstance(examples, dict):
@@ -1479,6 +1727,7 @@ def extract(examples, tag=False, encoding=None, as_object=False,
                   max_patterns = max_patterns,
                   min_diff_strings_per_pattern = min_diff_strings_per_pattern,
                   min_strings_per_pattern = min_strings_per_pattern,
+                  sample=sample, seed=seed, n_jobs=n_jobs,
                   verbose=verbose)
     return r if as_object else r.results.rex
 
@@ -1706,7 +1955,11 @@ def get_params(args):
         'tag': None,
         'verbose': 0,
         'variableLengthFrags': False,
+        'sample': None,
+        'seed': SAMPLE_SEED,
+        'n_jobs': None,
     }
+    args = iter(args)
     for a in args:
         if a.startswith('-'):
             if a == '-':
@@ -1732,6 +1985,14 @@ def get_params(args):
                 params['variableLengthFrags'] = True
             elif a in ('-flf', '--fixed'):
                 params['variableLengthFrags'] = False
+            elif a in ('-s', '--sample', '--seed', '-j', '--jobs'):
+                name = ('seed' if a == '--seed'
+                        else 'n_jobs' if a in ('-j', '--jobs')
+                        else 'sample')
+                try:
+                    params[name] = int(next(args))
+                except (StopIteration, ValueError):
+                    raise Exception(USAGE)
             elif a in ('-?', '--help'):
                 print(USAGE)
                 sys.exit(0)
@@ -467,6 +467,14 @@ class TestHelperMethods(unittest.TestCase):
         self.assertEqual(x.coarse_classify('2016-01-02T10:11:12\a+0300z'),
                                            CtoUC('CCCC.CC.CCCCC.CC.CC*.CCCCC'))
 
+    def test_unicode_classification(self):
+        x = self.x
+        self.assertEqual(x.coarse_classify(u'\xe9t\xe9 \u20ac2'),
+                         CtoUC(u'CCC *C'))
+        self.assertEqual(x.Cats.coarse_codes[0xe9], C)  # cached
+        self.assertEqual(x.fine_classify(u'aZ9\xe9\xb2'), u'aAD\u1e42D')
+        self.assertEqual(x.fine_class(u'\xe9'), u'\u1e42')
+
     def test_run_length_encoding(self):
         self.assertEqual(run_length_encode(''), ())
 
@@ -1220,6 +1228,80 @@ class TestExtraction(unittest.TestCase):
         ))
         self.assertEqual(results, expected)
 
+    def test_sampled_extraction(self):
+        examples = (['AB-%04d' % i for i in range(2000)]
+                    + ['%d' % (i * 7919) for i in range(3000)]
+                    + ['zz@zz'])
+        full = rexpy.extract(examples)
+        x = Extractor(examples, sample=200)
+        self.assertEqual(x.results.rex, full)
+        self.assertEqual(x.find_non_matches(), [])
+        self.assertLess(len(x.results.rles), len(examples))
+        self.assertEqual(rexpy.extract(examples, sample=200), full)
+
+        # sampling is repeatable, and stratified by length
+        rng1 = rexpy.random.Random(1)
+        rng2 = rexpy.random.Random(1)
+        sample = x.sample(200, rng1)
+        self.assertEqual(x.sample(200, rng2), sample)
+        self.assertIn('zz@zz', sample)
+        self.assertEqual(sorted(set(len(e) for e in sample)),
+                         sorted(set(len(e) for e in examples)))
+
+    def test_sample_params(self):
+        params = rexpy.get_params(['--sample', '1000', '--seed', '3', 'in'])
+        self.assertEqual(params['sample'], 1000)
+        self.assertEqual(params['seed'], 3)
+        self.assertEqual(params['in_path'], 'in')
+
+    def test_partitioned_refinement(self):
+        examples = ['AB-%04d' % i for i in range(20)] + ['12', 'a b']
+        x = Extractor(examples, extract=False)
+        rles = [x.run_length_encode_coarse_classes(e) for e in examples]
+        partitions = x.partition(examples, rles)
+        self.assertEqual(sorted(x for xs in partitions.values() for x in xs),
+                         sorted(examples))
+        self.assertEqual(partitions[u'\u1e08'], ['12'])
+        self.assertEqual(partitions[u'\u1e08 \u1e08'], ['a b'])
+        self.assertEqual(len(partitions[u'\u1e08.\u1e08']), 20)
+
+        full = rexpy.extract(examples)
+        self.assertEqual(full, ['^12$', '^a b$', '^AB\\-\\d{4}$'])
+        self.assertEqual(rexpy.extract(examples, n_jobs=2), full)
+
+    def test_signature_examples(self):
+        examples = [u'ab', u'\xe9\xe9', u'a\u20ac', u'\u20ac\u20ac',
+                    u'a.b', u'a b']
+        x = Extractor(examples, extract=False)
+        rles = [x.run_length_encode_coarse_classes(e) for e in examples]
+        partitions = x.partition(examples, rles)
+        C = rexpy.COARSEST_ALPHANUMERIC_CODE
+        self.assertEqual(x.signature_examples([(C, 2, 2)], partitions),
+                         [u'ab', u'\xe9\xe9'])
+        # Other also matches non-ASCII alphanumerics
+        self.assertEqual(x.signature_examples([(C, 1, 1), ('*', 1, 1)],
+                                              partitions),
+                         [u'ab', u'\xe9\xe9', u'a\u20ac', u'\u20ac\u20ac'])
+        self.assertEqual(x.signature_examples([('.', 1, 1)], partitions), [])
+        x.extract()
+        self.assertEqual(sorted(x.signature_index), sorted(set(partitions)))
+
+    def test_jobs_param(self):
+        params = rexpy.get_params(['-j', '4', 'in'])
+        self.assertEqual(params['n_jobs'], 4)
+        self.assertEqual(rexpy.get_params(['in'])['n_jobs'], None)
+
+    def test_incremental_coverage_redundant_patterns(self):
+        # patterns that match nothing not already matched
+        # come last, with no incremental coverage
+        freqs = {'a': 1, 'b': 2}
+        od = rexpy.rex_incremental_coverage(['a', 'b', '.', 'c'], freqs)
+        self.assertEqual(od, OrderedDict((('^.$', 3), ('^a$', 0),
+                                          ('^b$', 0), ('^c$', 0))))
+        od = rexpy.rex_incremental_coverage(['a', 'b', '.', 'c'], freqs,
+                                            dedup=True)
+        self.assertEqual(list(od.values()), [2, 0, 0, 0])
+
     def test_full_incremental_coverage_urls2(self):
         x = Extractor(self.urls2, variableLengthFrags=False)
         od = x.full_incremental_coverage()